@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer to determine the directories of persistent application data and store it.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import json
+import os
+import sys
+from typing import Any, Optional
+
+
+# -----------------------------------------------------------------------------
+# Directory Getters
+# -----------------------------------------------------------------------------
+def get_cache_dir() -> str:
+    r"""Get the directory for cached data of syncer and create it if necessary.
+
+    On Windows, this is ``%LOCALAPPDATA%\syncer``, otherwise
+    ``$XDG_CACHE_HOME/syncer`` resp. ``~/.cache/syncer``.
+
+    Returns:
+        Returns the absolute path of the cache directory.
+    """
+    if sys.platform == 'win32':
+        base_dir = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:
+        base_dir = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    cache_dir = os.path.join(base_dir, "syncer")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+# -----------------------------------------------------------------------------
+# JSON Files
+# -----------------------------------------------------------------------------
+def load_json(filename: str) -> Any:
+    """Load the content of a JSON file.
+
+    Args:
+        filename (str): The JSON file.
+
+    Returns:
+        Returns the decoded content.
+
+    Raises:
+        OSError:    If the file can't be read.
+        ValueError: If the file does not contain valid JSON.
+    """
+    with open(filename, 'r', encoding='UTF-8') as file_handle:
+        return json.load(file_handle)
+
+
+def save_json(filename: str, data: Any, indent: Optional[int] = None) -> None:
+    """Save data to a JSON file atomically.
+
+    The data is written to a temporary file next to the file, which then
+    replaces the file, so that the file is never left half written. The
+    directory of the file is created if necessary.
+
+    Args:
+        filename (str): The JSON file.
+        data (obj):     The data to save.
+        indent (int):   The indentation of the JSON output or None for a compact output.
+
+    Raises:
+        OSError: If the file can't be written.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w', encoding='UTF-8') as file_handle:
+        json.dump(data, file_handle, indent=indent)
+    os.replace(tmp_filename, filename)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
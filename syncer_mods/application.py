@@ -16,6 +16,7 @@ Copyright:
 # -----------------------------------------------------------------------------
 # Module Import
 # -----------------------------------------------------------------------------
+import sqlite3
 import sys
 
 from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSlot
@@ -24,11 +25,14 @@ from PyQt5.QtWidgets import QAction, QDialog, QMenu, QMessageBox, QSystemTrayIco
 from syncer_mods.about_dialog import AboutDialog
 from syncer_mods.autostart_linux import create_linux_autostart, remove_linux_autostart
 from syncer_mods.autostart_windows import create_windows_autostart, remove_windows_autostart
+from syncer_mods.file_watcher import FileWatcher
+from syncer_mods.history_dialog import HistoryDialog
 from syncer_mods.icons import get_default_icon, get_warning_icon
+from syncer_mods.qt_synchronizer import QtSynchronizer
 from syncer_mods.rotating_status_icon import RotatingStatusIcon
+from syncer_mods.scheduler import SyncScheduler
 from syncer_mods.settings import Settings
 from syncer_mods.settings_dialog import SettingsDialog
-from syncer_mods.synchronizer import Synchronizer
 
 
 # -----------------------------------------------------------------------------
@@ -54,31 +58,17 @@ class Application(QObject):
         self.tray.setIcon(self.default_icon)
         self.tray.setVisible(True)
 
-        self.menu = QMenu()
-        self.action_sync = QAction("Synchronize")
-        self.action_sync.triggered.connect(self.synchronize)
-        self.menu.addAction(self.action_sync)
-
-        self.action_settings = QAction("Settings")
-        self.action_settings.triggered.connect(self.show_settings)
-        self.menu.addAction(self.action_settings)
-
-        self.action_about = QAction("About")
-        self.action_about.triggered.connect(self.show_about)
-        self.menu.addAction(self.action_about)
-
-        self.action_quit = QAction("Quit")
-        self.action_quit.triggered.connect(qapp.quit)
-        self.menu.addAction(self.action_quit)
+        self._create_menu(qapp)
 
         # Create the synchronizer worker
         self.settings = Settings()
-        self.synchronizer = Synchronizer(self.settings)
+        self.synchronizer = QtSynchronizer(self.settings)
         self.synchronizer_thread = QThread()
         self.synchronizer.moveToThread(self.synchronizer_thread)
         self.synchronizer_thread.started.connect(self.synchronizer.run)
         self.synchronizer.finished.connect(self.synchronizer_thread.quit)
         self.synchronizer.error.connect(self.synchronizer_thread.quit)
+        qapp.aboutToQuit.connect(self.shutdown)
 
         # Indicate running synchronization by rotating the status icon
         self.rotating_status_icon = RotatingStatusIcon(self.tray)
@@ -86,12 +76,57 @@ class Application(QObject):
         self.synchronizer.finished.connect(self.on_synchronizer_finished)
         self.synchronizer.error.connect(self.on_synchronizer_error)
 
+        # Synchronize automatically on modifications of the local files
+        self.sync_pending = False
+        self.user_initiated = False
+        self.file_watcher = FileWatcher()
+        self.file_watcher.changed.connect(self.on_sync_requested)
+        self.synchronizer_thread.finished.connect(self.on_synchronizer_thread_finished)
+        self.apply_watch_settings()
+
+        # Synchronize periodically
+        self.scheduler = SyncScheduler()
+        self.scheduler.due.connect(self.on_sync_requested)
+        self.apply_scheduler_settings()
+
         self.tray.setContextMenu(self.menu)
         self.tray.activated.connect(self.tray_activated)
 
         if self.settings.get_value("sync_on_start"):
             QTimer.singleShot(1000, self.synchronize)
 
+    def _create_menu(self, qapp) -> None:
+        """Create the context menu of the tray icon.
+
+        Args:
+            qapp (obj): The QApplication object.
+        """
+        self.menu = QMenu()
+        self.action_sync = QAction("Synchronize")
+        self.action_sync.triggered.connect(self.synchronize)
+        self.menu.addAction(self.action_sync)
+
+        self.action_cancel = QAction("Cancel")
+        self.action_cancel.setEnabled(False)
+        self.action_cancel.triggered.connect(self.cancel)
+        self.menu.addAction(self.action_cancel)
+
+        self.action_settings = QAction("Settings")
+        self.action_settings.triggered.connect(self.show_settings)
+        self.menu.addAction(self.action_settings)
+
+        self.action_history = QAction("History")
+        self.action_history.triggered.connect(self.show_history)
+        self.menu.addAction(self.action_history)
+
+        self.action_about = QAction("About")
+        self.action_about.triggered.connect(self.show_about)
+        self.menu.addAction(self.action_about)
+
+        self.action_quit = QAction("Quit")
+        self.action_quit.triggered.connect(qapp.quit)
+        self.menu.addAction(self.action_quit)
+
     @pyqtSlot(QSystemTrayIcon.ActivationReason)
     def tray_activated(self, activation_reason):
         """Detect clicks and double clicks."""
@@ -113,6 +148,38 @@ class Application(QObject):
                     create_windows_autostart()
                 else:
                     remove_windows_autostart()
+            self.apply_watch_settings()
+            self.apply_scheduler_settings()
+
+    def apply_watch_settings(self) -> None:
+        """Start or stop watching the local files according to the settings."""
+        self.file_watcher.debounce_secs = self.settings.get_value("watch_debounce_secs")
+        self.file_watcher.quiet_secs = self.settings.get_value("watch_quiet_secs")
+        if self.settings.get_value("watch_local_file"):
+            self.file_watcher.set_files([profile.local_file
+                                         for profile in self.settings.get_profiles()])
+        else:
+            self.file_watcher.set_files([])
+
+    def apply_scheduler_settings(self) -> None:
+        """Start or stop the periodic synchronization according to the settings."""
+        self.scheduler.min_secs = self.settings.get_value("periodic_sync_min_minutes") * 60.0
+        self.scheduler.max_secs = self.settings.get_value("periodic_sync_max_minutes") * 60.0
+        if self.settings.get_value("periodic_sync"):
+            self.scheduler.start()
+        else:
+            self.scheduler.stop()
+
+    @pyqtSlot()
+    def show_history(self) -> None:
+        """Show the history dialog."""
+        try:
+            dialog = HistoryDialog(self.synchronizer.journal)
+        except sqlite3.Error as journal_error:
+            QMessageBox.critical(None, "Syncer had an error",  # type: ignore
+                                 f"Can't read the journal: {journal_error}")
+            return
+        dialog.exec_()
 
     @pyqtSlot()
     def show_about(self) -> None:
@@ -122,18 +189,96 @@ class Application(QObject):
 
     @pyqtSlot()
     def synchronize(self) -> None:
-        """Perform the synchronization."""
+        """Perform the synchronization requested by the user."""
+        self._start_synchronization(True)
+
+    def _start_synchronization(self, user_initiated: bool) -> None:
+        """Start the synchronizer thread.
+
+        Args:
+            user_initiated (bool): Whether the user requested the synchronization.
+                                   Only errors of those are shown in a dialog.
+        """
         if not self.synchronizer_thread.isRunning():
+            self.user_initiated = user_initiated
             self.synchronizer_thread.start()
         else:
             print("ERROR: Synchronizer thread already running!")
 
+    @pyqtSlot()
+    def cancel(self) -> None:
+        """Cancel the running synchronization and a pending one."""
+        self.sync_pending = False
+        if self.synchronizer_thread.isRunning():
+            self.synchronizer.cancel()
+
+    @pyqtSlot()
+    def shutdown(self) -> None:
+        """Cancel the synchronization and stop the rclone daemon before syncer quits.
+
+        The thread of the synchronizer has no running event loop anymore, so the
+        synchronizer is closed directly once its thread finished.
+        """
+        self.cancel()
+        self.synchronizer_thread.quit()
+        self.synchronizer_thread.wait()
+        self.synchronizer.close()
+
+    @pyqtSlot()
+    def on_sync_requested(self) -> None:
+        """Synchronize after a modification of a local file or when the schedule is due."""
+        if self.synchronizer_thread.isRunning():
+            self.sync_pending = True
+        else:
+            self._start_synchronization(False)
+
+    @pyqtSlot()
+    def on_synchronizer_thread_finished(self) -> None:
+        """Start a synchronization requested while the last one was running."""
+        if self.sync_pending:
+            self.sync_pending = False
+            self._start_synchronization(False)
+
+    def _get_tooltip(self, message: str) -> str:
+        """Get the tooltip showing the message, the latency and the next periodic sync."""
+        lines = [message]
+        try:
+            stats = self.synchronizer.journal.get_latency_stats()
+        except sqlite3.Error:
+            stats = None
+        if stats is not None:
+            lines.append(stats.get_description())
+        description = self.scheduler.get_description()
+        if description:
+            lines.append(description)
+        return "\n".join(lines)
+
     @pyqtSlot()
     def on_synchronizer_started(self) -> None:
         """Handle the start of the synchronization."""
         self.action_sync.setEnabled(False)
+        self.action_cancel.setEnabled(True)
         self.rotating_status_icon.start()
         self.tray.setToolTip("Synchronizing...")
+        self.file_watcher.sync_started()
+
+    def _update_file_watcher(self, success: bool) -> None:
+        """Take the successfully synchronized files as synchronized by the file watcher.
+
+        Args:
+            success (bool): Whether the synchronization succeeded. If not and
+                            no results are available, all files count as failed.
+        """
+        results = self.synchronizer.last_results
+        if not success and not results:
+            failed_files = [profile.local_file for profile in self.settings.get_profiles()]
+        else:
+            failed_files = [result.profile.local_file for result in results
+                            if result.error is not None]
+        self.file_watcher.synchronized(
+            failed_files=failed_files,
+            replaced_files=[result.profile.local_file for result in results
+                            if result.error is None and result.direction == "remote"])
 
     @pyqtSlot(str)
     def on_synchronizer_finished(self, message: str) -> None:
@@ -144,21 +289,35 @@ class Application(QObject):
         """
         self.rotating_status_icon.stop()
         self.rotating_status_icon.wait()
-        self.tray.setToolTip(message)
         self.action_sync.setEnabled(True)
+        self.action_cancel.setEnabled(False)
+        self._update_file_watcher(True)
+        self.scheduler.update(self.synchronizer.last_results)
+        self.tray.setToolTip(self._get_tooltip(message))
 
     @pyqtSlot(str)
     def on_synchronizer_error(self, message: str) -> None:
         """React to an error during synchronization.
 
+        The error of a synchronization requested by the user is shown in a dialog.
+        Automatic synchronizations show a notification of the tray icon instead,
+        so that they do not interrupt the user.
+
         Args:
             message (str): The message to show.
         """
         self.rotating_status_icon.stop()
         self.rotating_status_icon.wait()
+        self.action_cancel.setEnabled(False)
         self.tray.setIcon(self.warning_icon)
-        self.tray.setToolTip(message)
-        QMessageBox.critical(None, "Syncer had an error", message)  # type: ignore
+        self._update_file_watcher(False)
+        self.scheduler.update(self.synchronizer.last_results)
+        self.tray.setToolTip(self._get_tooltip(message))
+        if self.user_initiated:
+            QMessageBox.critical(None, "Syncer had an error", message)  # type: ignore
+        else:
+            self.tray.showMessage("Syncer had an error", message,
+                                  QSystemTrayIcon.Warning)  # type: ignore
         self.action_sync.setEnabled(True)
 
 
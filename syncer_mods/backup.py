@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer to keep backups of local files replaced by a synchronization.
+
+The backups are named ``<file>.bak``, ``<file>.bak.1``, ``<file>.bak.2`` and so
+on, with ``<file>.bak`` being the most recent one. The most recent backup is a
+hardlink to the local file, which is then replaced by the downloaded file, so
+no data is copied. Only if the filesystem does not support hardlinks, the file
+is copied instead.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import shutil
+
+
+# -----------------------------------------------------------------------------
+# Functions
+# -----------------------------------------------------------------------------
+def get_backup_filename(filename: str, index: int) -> str:
+    """Get the name of a backup.
+
+    Args:
+        filename (str): The local file.
+        index (int):    The index of the backup with 0 being the most recent one.
+
+    Returns:
+        Returns the name of the backup file.
+    """
+    if index == 0:
+        return f"{filename}.bak"
+    return f"{filename}.bak.{index}"
+
+
+def rotate_backups(filename: str, count: int) -> None:
+    """Shift the existing backups by one and delete the ones exceeding the count.
+
+    After the call, the name of the most recent backup is free.
+
+    Args:
+        filename (str): The local file.
+        count (int):    The number of backups to keep including the new one.
+    """
+    index = max(0, count - 1)
+    while os.path.exists(get_backup_filename(filename, index)):
+        os.unlink(get_backup_filename(filename, index))
+        index += 1
+
+    for index in range(count - 2, -1, -1):
+        backup_filename = get_backup_filename(filename, index)
+        if os.path.exists(backup_filename):
+            os.replace(backup_filename, get_backup_filename(filename, index + 1))
+
+
+def create_backup(filename: str, count: int) -> None:
+    """Keep the current version of a file as the most recent backup.
+
+    The backup is a hardlink, so the file must be replaced by a new one (e.g.,
+    using os.replace()) instead of being modified in place afterwards.
+
+    Args:
+        filename (str): The local file.
+        count (int):    The number of backups to keep. If zero, all backups are deleted.
+    """
+    rotate_backups(filename, count)
+    if count < 1 or not os.path.exists(filename):
+        return
+
+    backup_filename = get_backup_filename(filename, 0)
+    try:
+        os.link(filename, backup_filename)
+    except OSError:
+        shutil.copy2(filename, backup_filename)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,531 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer to store the remote file as content-defined chunks.
+
+Instead of the file itself, the remote directory contains a manifest
+``<name>.manifest.json`` and the directory ``<name>.chunks`` holding the
+chunks of the file named by their SHA-256 hash. The chunk boundaries are
+determined by a gear-based rolling hash of the content, so that a
+modification of the file only changes the chunks around the modified data.
+Only new chunks are transferred in either direction.
+
+Note that the chunking runs in pure Python at roughly 5 to 7 MiB/s, so it
+is only performed if a file was synchronized before and has changed since
+then or has to be transferred. The md5 hash of the file is computed in the
+same pass. The manifest of the last chunking is stored locally, so an
+unchanged file is not chunked again and of a modified file only the part
+starting at the first modified chunk is scanned. The throughput of these
+cases is measured by ``tests/benchmarks/bench_chunking.py``.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import subprocess
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .app_dirs import get_cache_dir, load_json, save_json
+from .hash_cache import get_cache_key
+from .rclone import (RcloneExitError, SynchronizerError, check_call, check_output,
+                     get_exit_code_error)
+from .transfer import TransferParams
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+DEFAULT_AVG_CHUNK_SIZE = 1024 * 1024
+MANIFEST_VERSION = 1
+
+# Maximum number of bytes of chunks staged in a temporary directory before
+# they are uploaded.
+UPLOAD_BATCH_SIZE = 256 * 1024 * 1024
+
+# Random but fixed 64-bit values for every byte value used by the gear hash.
+GEAR = [int.from_bytes(hashlib.md5(bytes([value])).digest()[:8], "big") for value in range(256)]
+
+
+# -----------------------------------------------------------------------------
+# Data Classes
+# -----------------------------------------------------------------------------
+@dataclass
+class Manifest:
+    """Description of a file stored as chunks."""
+
+    size: int
+    md5: str
+    modtime: datetime
+    chunks: List[Tuple[str, int]] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        """Convert the manifest to JSON."""
+        return json.dumps({"version": MANIFEST_VERSION,
+                           "size": self.size,
+                           "md5": self.md5,
+                           "modtime": self.modtime.isoformat(),
+                           "chunks": self.chunks})
+
+    @staticmethod
+    def from_json(data: str) -> "Manifest":
+        """Create a manifest from JSON.
+
+        Raises:
+            KeyError, TypeError, ValueError: If the data is not a valid manifest.
+        """
+        content = json.loads(data)
+        if content["version"] != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version {content['version']}")
+        return Manifest(size=int(content["size"]),
+                        md5=str(content["md5"]),
+                        modtime=datetime.fromisoformat(content["modtime"]),
+                        chunks=[(str(digest), int(length)) for digest, length in content["chunks"]])
+
+
+# -----------------------------------------------------------------------------
+# Chunking
+# -----------------------------------------------------------------------------
+def _find_boundary(data, pos: int, limit: int, mask: int) -> int:
+    """Find the end of a chunk by scanning the data from pos up to limit."""
+    gear = GEAR
+    rolling_hash = 0
+    # Iterating over a slice avoids an indexed access of the data for every byte
+    for idx, byte in enumerate(data[pos:limit], pos):
+        rolling_hash = ((rolling_hash << 1) + gear[byte]) & 0xFFFFFFFFFFFFFFFF
+        if not rolling_hash & mask:
+            return idx + 1
+    return limit
+
+
+def _count_unchanged_chunks(view: memoryview, previous: Manifest) -> int:
+    """Count the leading chunks of a previous manifest that are unchanged in the data.
+
+    The boundary of a chunk depends only on its own content, so a chunk with an
+    unchanged content at the same offset still ends at the same boundary. This
+    does not hold for the last chunk, which might have been cut by the end of
+    the file.
+    """
+    offset = 0
+    for count, (digest, length) in enumerate(previous.chunks[:-1]):
+        if offset + length > len(view) or \
+                hashlib.sha256(view[offset:offset + length]).hexdigest() != digest:
+            return count
+        offset += length
+    return max(0, len(previous.chunks) - 1)
+
+
+def _chunk_data(data, bits: int,
+                previous: Optional[Manifest]) -> Tuple[str, List[Tuple[str, int]], List[int]]:
+    """Split the data into chunks and return the tuple (md5, chunks, offsets)."""
+    mask = ((1 << bits) - 1) << (64 - bits)
+    file_md5 = hashlib.md5()
+    chunks: List[Tuple[str, int]] = []
+    offsets: List[int] = []
+    view = memoryview(data)
+    try:
+        start = 0
+        if previous is not None:
+            for digest, length in previous.chunks[:_count_unchanged_chunks(view, previous)]:
+                file_md5.update(view[start:start + length])
+                chunks.append((digest, length))
+                offsets.append(start)
+                start += length
+
+        while start < len(data):
+            end = _find_boundary(data, start + (1 << bits) // 4,
+                                 min(start + (4 << bits), len(data)), mask)
+            file_md5.update(view[start:end])
+            chunks.append((hashlib.sha256(view[start:end]).hexdigest(), end - start))
+            offsets.append(start)
+            start = end
+    finally:
+        view.release()
+    return file_md5.hexdigest(), chunks, offsets
+
+
+def chunk_file(filename: str, avg_size: int = DEFAULT_AVG_CHUNK_SIZE,
+               previous: Optional[Manifest] = None) -> Tuple[Manifest, List[int]]:
+    """Split a file into content-defined chunks.
+
+    Args:
+        filename (str): The file to split.
+        avg_size (int): The average chunk size. It is rounded to a power of two.
+                        The minimum chunk size is a quarter, the maximum four times
+                        the average size.
+        previous (obj): An earlier manifest of the file created with the same average
+                        chunk size. Its unchanged leading chunks are not scanned again.
+
+    Returns:
+        Returns the tuple (manifest, offsets) with the offsets of each chunk in the file.
+    """
+    bits = max(6, avg_size.bit_length() - 1)
+
+    stat_result = os.stat(filename)
+    file_md5 = hashlib.md5().hexdigest()
+    chunks: List[Tuple[str, int]] = []
+    offsets: List[int] = []
+    with open(filename, "rb") as file_handle:
+        if stat_result.st_size > 0:
+            with mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                file_md5, chunks, offsets = _chunk_data(data, bits, previous)
+
+    modtime = datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc)
+    return Manifest(stat_result.st_size, file_md5, modtime, chunks), offsets
+
+
+def _get_offsets(manifest: Manifest) -> Iterator[Tuple[str, int, int]]:
+    """Iterate over the tuples (digest, offset, length) of all chunks of a manifest."""
+    offset = 0
+    for digest, length in manifest.chunks:
+        yield digest, offset, length
+        offset += length
+
+
+# -----------------------------------------------------------------------------
+# Local Manifest Cache
+# -----------------------------------------------------------------------------
+def _get_local_manifest_filename(local_file: str) -> str:
+    """Get the file storing the manifest of the last synchronization of a local file."""
+    path_hash = hashlib.sha1(os.path.abspath(local_file).encode()).hexdigest()
+    return os.path.join(get_cache_dir(), "manifests", f"{path_hash}.json")
+
+
+def load_local_manifest(local_file: str, unchanged_only: bool = True) -> Optional[Manifest]:
+    """Get the manifest of the last synchronization of a local file.
+
+    Args:
+        local_file (str):      The local file.
+        unchanged_only (bool): If set, the manifest is returned only if the local file is
+                               unchanged since then.
+
+    Returns:
+        Returns the manifest or None if it is unknown or outdated.
+    """
+    try:
+        content = load_json(_get_local_manifest_filename(local_file))
+        if unchanged_only and content["key"] != get_cache_key(os.stat(local_file)):
+            return None
+        return Manifest.from_json(content["manifest"])
+    except (OSError, KeyError, TypeError, ValueError):
+        return None
+
+
+def save_local_manifest(local_file: str, manifest: Manifest) -> None:
+    """Store the manifest of the local file after a synchronization.
+
+    Args:
+        local_file (str): The local file.
+        manifest (obj):   The manifest describing the current content of the local file.
+    """
+    filename = _get_local_manifest_filename(local_file)
+    try:
+        save_json(filename, {"key": get_cache_key(os.stat(local_file)),
+                             "manifest": manifest.to_json()})
+    except OSError as os_error:
+        print(f"WARNING: Can't save manifest of {local_file}: {os_error}")
+
+
+# -----------------------------------------------------------------------------
+# Chunk Store Class
+# -----------------------------------------------------------------------------
+class ChunkStore:
+    """Remote storage of a file as content-defined chunks."""
+
+    def __init__(self, rclone: str, remote_file: str, avg_size: int = DEFAULT_AVG_CHUNK_SIZE,
+                 call: Optional[Callable[..., Any]] = None):
+        """Construct a new instance.
+
+        Args:
+            rclone (str):      Path to the rclone binary.
+            remote_file (str): Identifier of the remote file. The manifest and the
+                               chunks are stored next to it.
+            avg_size (int):    The average chunk size.
+            call (func):       Function called as ``call(func, *args)`` to perform each
+                               rclone call, e.g., to retry it on transient errors.
+        """
+        self.rclone = rclone
+        self.avg_size = avg_size
+        self.manifest_file = f"{remote_file}.manifest.json"
+        self.chunks_dir = f"{remote_file}.chunks"
+        self.call = call if call is not None else lambda func, *args: func(*args)
+        self.transfer_flags: List[str] = []
+
+    def set_transfer_params(self, params: TransferParams) -> None:
+        """Set the parameters of rclone used to transfer the chunks.
+
+        Args:
+            params (obj): The transfer parameters.
+        """
+        self.transfer_flags = params.get_rclone_flags()
+
+    def get_manifest(self) -> Optional[Manifest]:
+        """Get the manifest of the remote file.
+
+        Returns:
+            Returns the manifest or None if the remote file was not stored yet.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        data = self.call(self._read_manifest)
+        if data is None or not data.strip():
+            return None
+
+        try:
+            return Manifest.from_json(data)
+        except (KeyError, TypeError, ValueError) as parse_error:
+            raise SynchronizerError(
+                f"Invalid remote manifest {self.manifest_file}: {parse_error}") from None
+
+    def get_local_manifest(self, local_file: str) -> Optional[Manifest]:
+        """Get the manifest of the local file.
+
+        The file is chunked only if it changed since its manifest was stored, and
+        then the unchanged leading chunks of the stored manifest are not scanned
+        again. The new manifest is stored, so a subsequent call does not chunk the
+        file again.
+
+        Args:
+            local_file (str): The local file.
+
+        Returns:
+            Returns the manifest or None if the local file does not exist.
+        """
+        manifest = load_local_manifest(local_file)
+        if manifest is None:
+            try:
+                manifest, _ = chunk_file(local_file, self.avg_size,
+                                         load_local_manifest(local_file, unchanged_only=False))
+            except FileNotFoundError:
+                return None
+            save_local_manifest(local_file, manifest)
+        return manifest
+
+    def get_local_md5(self, local_file: str) -> Optional[str]:
+        """Get the md5 hash of the local file computed while chunking it.
+
+        Args:
+            local_file (str): The local file.
+
+        Returns:
+            Returns the hex digest or None if the local file does not exist.
+        """
+        manifest = self.get_local_manifest(local_file)
+        return manifest.md5 if manifest is not None else None
+
+    def upload(self, local_file: str, remote_manifest: Optional[Manifest]) -> int:
+        """Upload the chunks of the local file missing on the remote and the new manifest.
+
+        Args:
+            local_file (str):      The local file.
+            remote_manifest (obj): The current manifest of the remote or None.
+
+        Returns:
+            Returns the number of bytes transferred.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        manifest = self.get_local_manifest(local_file)
+        if manifest is None:
+            raise SynchronizerError(f"Local file {local_file} does not exist!")
+        remote_chunks = {digest for digest, _ in remote_manifest.chunks} \
+            if remote_manifest is not None else set()
+
+        missing: Dict[str, Tuple[int, int]] = {}
+        for digest, offset, length in _get_offsets(manifest):
+            if digest not in remote_chunks and digest not in missing:
+                missing[digest] = (offset, length)
+
+        with TemporaryDirectory(dir=os.path.dirname(os.path.abspath(local_file)),
+                                prefix=".syncer-") as tmp_dir:
+            transferred = self._upload_missing_chunks(local_file, missing, tmp_dir)
+
+            manifest_filename = os.path.join(tmp_dir, "manifest.json")
+            manifest_json = manifest.to_json()
+            with open(manifest_filename, "w", encoding="UTF-8") as file_handle:
+                file_handle.write(manifest_json)
+            self._call_rclone([self.rclone, "copyto", manifest_filename, self.manifest_file])
+            transferred += len(manifest_json)
+
+            if remote_manifest is not None:
+                self._delete_unreferenced_chunks(remote_manifest, manifest, tmp_dir)
+
+        save_local_manifest(local_file, manifest)
+        return transferred
+
+    def download(self, local_file: str, manifest: Manifest,
+                 backup: Optional[Callable[[], None]] = None) -> int:
+        """Download the chunks missing locally and rebuild the local file.
+
+        The new file is written to a temporary file in the same directory and
+        replaces the local file only after its checksum was verified.
+
+        Args:
+            local_file (str): The local file.
+            manifest (obj):   The manifest of the remote file.
+            backup (func):    Function called right before the local file is replaced.
+
+        Returns:
+            Returns the number of bytes transferred.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        local_chunks: Dict[str, Tuple[int, int]] = {}
+        local_manifest = self.get_local_manifest(local_file)
+        if local_manifest is not None:
+            for digest, offset, length in _get_offsets(local_manifest):
+                local_chunks.setdefault(digest, (offset, length))
+
+        missing = sorted({digest for digest, _ in manifest.chunks if digest not in local_chunks})
+        local_dir = os.path.dirname(os.path.abspath(local_file))
+        with TemporaryDirectory(dir=local_dir, prefix=".syncer-") as tmp_dir:
+            chunks_dir = os.path.join(tmp_dir, "chunks")
+            os.makedirs(chunks_dir)
+            transferred = self._download_chunks(missing, chunks_dir, tmp_dir)
+
+            new_file = os.path.join(tmp_dir, "rebuilt")
+            self._rebuild(local_file, local_chunks, chunks_dir, manifest, new_file)
+            os.utime(new_file, (manifest.modtime.timestamp(),) * 2)
+            if backup is not None:
+                backup()
+            os.replace(new_file, local_file)
+
+        save_local_manifest(local_file, manifest)
+        return transferred
+
+    def _rebuild(self, local_file: str, local_chunks: Dict[str, Tuple[int, int]],
+                 chunks_dir: str, manifest: Manifest, new_file: str) -> None:
+        """Assemble the new file from local and downloaded chunks and verify it."""
+        file_md5 = hashlib.md5()
+        with ExitStack() as stack:
+            local_handle = stack.enter_context(open(local_file, "rb")) if local_chunks else None
+            output_handle = stack.enter_context(open(new_file, "wb"))
+            for digest, length in manifest.chunks:
+                if local_handle is not None and digest in local_chunks:
+                    local_handle.seek(local_chunks[digest][0])
+                    data = local_handle.read(length)
+                else:
+                    with open(os.path.join(chunks_dir, digest), "rb") as chunk_handle:
+                        data = chunk_handle.read()
+                if len(data) != length or hashlib.sha256(data).hexdigest() != digest:
+                    raise SynchronizerError(f"Chunk {digest} of {local_file} is corrupted!")
+                file_md5.update(data)
+                output_handle.write(data)
+
+        if file_md5.hexdigest() != manifest.md5:
+            raise SynchronizerError(f"Checksum mismatch of rebuilt file {local_file}!")
+
+    def _upload_missing_chunks(self, local_file: str, missing: Dict[str, Tuple[int, int]],
+                               tmp_dir: str) -> int:
+        """Upload the missing chunks in batches limited by UPLOAD_BATCH_SIZE."""
+        transferred = 0
+        batch: Dict[str, Tuple[int, int]] = {}
+        batch_size = 0
+        for digest, (offset, length) in missing.items():
+            batch[digest] = (offset, length)
+            batch_size += length
+            if batch_size >= UPLOAD_BATCH_SIZE:
+                self._upload_chunks(local_file, batch, tmp_dir)
+                transferred += batch_size
+                batch, batch_size = {}, 0
+        if batch:
+            self._upload_chunks(local_file, batch, tmp_dir)
+            transferred += batch_size
+        return transferred
+
+    def _download_chunks(self, missing: List[str], chunks_dir: str, tmp_dir: str) -> int:
+        """Download the missing chunks into chunks_dir and return the number of bytes."""
+        if not missing:
+            return 0
+        files_from = os.path.join(tmp_dir, "files-from.txt")
+        with open(files_from, "w", encoding="UTF-8") as file_handle:
+            file_handle.write("\n".join(missing) + "\n")
+        self._call_rclone([self.rclone, "copy", *self.transfer_flags, "--files-from", files_from,
+                           self.chunks_dir, chunks_dir])
+        return sum(os.path.getsize(os.path.join(chunks_dir, digest)) for digest in missing)
+
+    def _upload_chunks(self, local_file: str, batch: Dict[str, Tuple[int, int]],
+                       tmp_dir: str) -> None:
+        """Stage a batch of chunks in a temporary directory and upload them."""
+        chunks_dir = os.path.join(tmp_dir, "chunks")
+        os.makedirs(chunks_dir, exist_ok=True)
+        with open(local_file, "rb") as file_handle:
+            for digest, (offset, length) in batch.items():
+                file_handle.seek(offset)
+                with open(os.path.join(chunks_dir, digest), "wb") as chunk_handle:
+                    chunk_handle.write(file_handle.read(length))
+        self._call_rclone([self.rclone, "copy", *self.transfer_flags, chunks_dir, self.chunks_dir])
+        shutil.rmtree(chunks_dir)
+
+    def _delete_unreferenced_chunks(self, old_manifest: Manifest, new_manifest: Manifest,
+                                    tmp_dir: str) -> None:
+        """Delete the chunks of the old manifest that are not used anymore."""
+        used_chunks = {digest for digest, _ in new_manifest.chunks}
+        unused_chunks = sorted({digest for digest, _ in old_manifest.chunks} - used_chunks)
+        if not unused_chunks:
+            return
+
+        files_from = os.path.join(tmp_dir, "unused-chunks.txt")
+        with open(files_from, "w", encoding="UTF-8") as file_handle:
+            file_handle.write("\n".join(unused_chunks) + "\n")
+        try:
+            self._call_rclone([self.rclone, "delete", "--files-from", files_from,
+                               self.chunks_dir])
+        except SynchronizerError as synchronizer_error:
+            # Unused chunks only waste space on the remote
+            print(f"WARNING: Can't delete unused chunks: {synchronizer_error}")
+
+    def _read_manifest(self) -> Optional[str]:
+        """Read the remote manifest and return None if it does not exist."""
+        try:
+            return check_output([self.rclone, "cat", self.manifest_file])
+        except subprocess.CalledProcessError as call_error:
+            if call_error.returncode in [3, 4]:
+                return None
+            raise RcloneExitError(
+                f"Can't read remote manifest {self.manifest_file}: RClone returned exit code "
+                f"{call_error.returncode}!", call_error.returncode) from None
+        except FileNotFoundError:
+            raise SynchronizerError(
+                f"Specified rclone binary {self.rclone} does not exist! "
+                "Please check your settings!") from None
+
+    def _call_rclone(self, cmd: List[str]) -> None:
+        """Call rclone using the call function."""
+        self.call(self._run_rclone, cmd)
+
+    def _run_rclone(self, cmd: List[str]) -> None:
+        """Call rclone and convert errors into a SynchronizerError."""
+        try:
+            check_call(cmd)
+        except subprocess.CalledProcessError as call_error:
+            raise get_exit_code_error(call_error.returncode) from None
+        except FileNotFoundError:
+            raise SynchronizerError(
+                f"Specified rclone binary {self.rclone} does not exist! "
+                "Please check your settings!") from None
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer providing the command line interface without Qt.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import argparse
+import signal
+import sys
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+from .settings import Settings
+from .sync_interval import format_interval, get_next_interval
+from .sync_result import SyncListener
+from .synchronizer import Synchronizer
+
+
+# -----------------------------------------------------------------------------
+# Listener Class
+# -----------------------------------------------------------------------------
+class PrintListener(SyncListener):
+    """Print the results of the synchronization."""
+
+    def __init__(self, timestamps: bool = False):
+        """Construct a new instance.
+
+        Args:
+            timestamps (bool): If set, prefix every message by the current time.
+        """
+        self.timestamps = timestamps
+
+    def _print(self, message: str, error: bool = False) -> None:
+        """Print a message to stdout or stderr."""
+        if self.timestamps:
+            message = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} {message}"
+        print(message, file=sys.stderr if error else sys.stdout, flush=True)
+
+    def on_finished(self, message: str) -> None:
+        """Print the result."""
+        self._print(message)
+
+    def on_error(self, message: str) -> None:
+        """Print the result to stderr."""
+        self._print(message, error=True)
+
+
+# -----------------------------------------------------------------------------
+# Commands
+# -----------------------------------------------------------------------------
+def sync_once(synchronizer: Synchronizer) -> int:
+    """Synchronize all files once.
+
+    Returns:
+        Returns the exit code, i.e., 0 on success and 1 on errors.
+    """
+    results = synchronizer.run()
+    if not results or any(result.error is not None for result in results):
+        return 1
+    return 0
+
+
+def show_status(synchronizer: Synchronizer) -> int:
+    """Show the state of all files without transferring them.
+
+    Returns:
+        Returns the exit code, i.e., 0 if all files are synchronized, 1 on
+        errors and 2 if at least one file needs to be synchronized.
+    """
+    results = synchronizer.run(dry_run=True)
+    if not results or any(result.error is not None for result in results):
+        return 1
+    if any(result.direction is not None for result in results):
+        return 2
+    return 0
+
+
+def run_daemon(synchronizer: Synchronizer, min_secs: float, max_secs: float,
+               stop_event: threading.Event) -> int:
+    """Synchronize periodically until the stop event is set.
+
+    The interval is adapted to the results as in the periodic synchronization
+    of the tray application.
+
+    Returns:
+        Returns the exit code 0.
+    """
+    interval_secs = min_secs
+    while not stop_event.is_set():
+        results = synchronizer.run()
+        interval_secs = get_next_interval(interval_secs, results, min_secs, max_secs)
+        print(f"Next synchronization in {format_interval(interval_secs)}", flush=True)
+        stop_event.wait(interval_secs)
+    return 0
+
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="syncer",
+        description="Synchronize files with rclone remotes without the tray icon.")
+    parser.add_argument("--config", default=None,
+                        help="JSON file with the settings. By default, the settings "
+                        "of the tray application are used, which requires PyQt5.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("sync-once", help="Synchronize all files once.")
+    daemon_parser = subparsers.add_parser("daemon", help="Synchronize periodically.")
+    daemon_parser.add_argument("--min-interval", type=float, default=None,
+                               help="Minimum interval in minutes. Default: From the settings.")
+    daemon_parser.add_argument("--max-interval", type=float, default=None,
+                               help="Maximum interval in minutes. Default: From the settings.")
+    subparsers.add_parser("status", help="Show which files need to be synchronized.")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command line interface.
+
+    Args:
+        argv (list): The command line arguments without the program name.
+
+    Returns:
+        Returns the exit code.
+    """
+    args = get_parser().parse_args(argv)
+    try:
+        settings = Settings(args.config)
+    except ImportError:
+        print("ERROR: PyQt5 is required to read the settings of the tray application. "
+              "Please specify a settings file using --config.", file=sys.stderr)
+        return 1
+
+    synchronizer = Synchronizer(settings, PrintListener(timestamps=args.command == "daemon"))
+    try:
+        if args.command == "sync-once":
+            return sync_once(synchronizer)
+        if args.command == "status":
+            return show_status(synchronizer)
+
+        stop_event = threading.Event()
+
+        def stop(_signum, _frame):
+            stop_event.set()
+            synchronizer.cancel()
+
+        signal.signal(signal.SIGTERM, stop)
+        min_minutes = args.min_interval if args.min_interval is not None \
+            else settings.get_value("periodic_sync_min_minutes")
+        max_minutes = args.max_interval if args.max_interval is not None \
+            else settings.get_value("periodic_sync_max_minutes")
+        try:
+            return run_daemon(synchronizer, min_minutes * 60.0,
+                              max(min_minutes, max_minutes) * 60.0, stop_event)
+        except KeyboardInterrupt:
+            return 0
+    finally:
+        synchronizer.close()
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer to watch the local files for modifications.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal, pyqtSlot
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def get_signature(filename: str) -> Optional[Tuple[int, int, int]]:
+    """Get a signature of a file that changes whenever the file is modified or replaced.
+
+    Args:
+        filename (str): The file.
+
+    Returns:
+        Returns the tuple (mtime_ns, size, inode) or None if the file does not exist.
+    """
+    try:
+        stat_result = os.stat(filename)
+    except OSError:
+        return None
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+
+# -----------------------------------------------------------------------------
+# File Watcher Class
+# -----------------------------------------------------------------------------
+class FileWatcher(QObject):
+    """Watch files and signal their modification after a debounce time.
+
+    Besides the files, their directories are watched as well. Editors saving
+    by writing a temporary file and renaming it over the original replace the
+    watched file, which ends the watch of the file itself. Such a replacement
+    is detected by the directory watch and the file is watched again.
+
+    Every event restarts the debounce timer, so that the signal ``changed`` is
+    emitted once after the modifications have settled. Within the quiet period
+    following a synchronization, the signal is delayed until the quiet period
+    is over. The signal is only emitted if the signature of a watched file
+    differs from the one at the last successful synchronization. The
+    signatures are taken when a synchronization starts, so modifications
+    during the synchronization trigger another one. Files replaced by the
+    synchronization take their signature at its end instead, so the
+    replacement does not trigger another synchronization.
+    """
+
+    changed = pyqtSignal()
+
+    def __init__(self, debounce_secs: float = 5.0, quiet_secs: float = 30.0):
+        """Construct a new instance.
+
+        Args:
+            debounce_secs (float): Time in seconds without any events before
+                                   the signal ``changed`` is emitted.
+            quiet_secs (float):    Time in seconds after a synchronization in
+                                   which the signal ``changed`` is not emitted.
+        """
+        super().__init__()
+        self.debounce_secs = debounce_secs
+        self.quiet_secs = quiet_secs
+        self.quiet_until = 0.0
+        self.signatures: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        self.started_signatures: Optional[Dict[str, Optional[Tuple[int, int, int]]]] = None
+
+        self.watcher = QFileSystemWatcher()
+        self.watcher.fileChanged.connect(self.on_path_changed)
+        self.watcher.directoryChanged.connect(self.on_path_changed)
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.on_timeout)
+
+    def set_files(self, filenames: List[str]) -> None:
+        """Set the files to watch. An empty list stops the watching.
+
+        Args:
+            filenames (list): List of local files.
+        """
+        self.timer.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+
+        self.signatures = {os.path.abspath(filename): None for filename in filenames}
+        directories = {os.path.dirname(filename) for filename in self.signatures}
+        existing_directories = [directory for directory in directories
+                                if os.path.isdir(directory)]
+        if existing_directories:
+            self.watcher.addPaths(existing_directories)
+        self._watch_files()
+        self.started_signatures = None
+        self.synchronized()
+
+    def sync_started(self) -> None:
+        """Take the signatures of the files at the start of a synchronization."""
+        self.started_signatures = {filename: get_signature(filename)
+                                   for filename in self.signatures}
+
+    def synchronized(self, failed_files: Optional[List[str]] = None,
+                     replaced_files: Optional[List[str]] = None) -> None:
+        """Take the state of the files at the start of the synchronization as synchronized.
+
+        Without a call of sync_started() before, the current state is taken.
+        In addition, the quiet period is started.
+
+        Args:
+            failed_files (list):   The files not synchronized due to an error.
+                                   They keep their previous signature, so the
+                                   next modification triggers a synchronization.
+            replaced_files (list): The files replaced by the synchronization,
+                                   which take their current signature.
+        """
+        failed = {os.path.abspath(filename) for filename in failed_files or []}
+        replaced = {os.path.abspath(filename) for filename in replaced_files or []}
+        started_signatures = self.started_signatures or {}
+        for filename in self.signatures:
+            if filename in failed:
+                continue
+            if filename in replaced or filename not in started_signatures:
+                self.signatures[filename] = get_signature(filename)
+            else:
+                self.signatures[filename] = started_signatures[filename]
+        self.started_signatures = None
+        self.quiet_until = time.monotonic() + self.quiet_secs
+
+    def get_modified_files(self) -> List[str]:
+        """Get the files modified since the last synchronization."""
+        return [filename for filename, signature in self.signatures.items()
+                if get_signature(filename) != signature]
+
+    def _watch_files(self) -> None:
+        """Watch all existing files not watched yet, e.g., after they were replaced."""
+        watched_files = set(self.watcher.files())
+        missing_files = [filename for filename in self.signatures
+                         if filename not in watched_files and os.path.exists(filename)]
+        if missing_files:
+            self.watcher.addPaths(missing_files)
+
+    @pyqtSlot(str)
+    def on_path_changed(self, _path: str) -> None:
+        """Handle a modification of a watched file or directory."""
+        self._watch_files()
+        self.timer.start(int(self.debounce_secs * 1000))
+
+    @pyqtSlot()
+    def on_timeout(self) -> None:
+        """Emit the signal ``changed`` if the quiet period is over and a file was modified."""
+        remaining_secs = self.quiet_until - time.monotonic()
+        if remaining_secs > 0.0:
+            self.timer.start(int(remaining_secs * 1000) + 1)
+            return
+
+        self._watch_files()
+        if self.get_modified_files():
+            self.changed.emit()
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
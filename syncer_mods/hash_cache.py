@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer providing a persistent cache of local file hashes.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from .app_dirs import get_cache_dir, load_json, save_json
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+# Files modified less than this number of seconds before hashing are not cached,
+# as a later modification within the timestamp granularity of the file system
+# would not change the cache key.
+RACY_MTIME_SECS = 2.0
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def get_cache_key(stat_result: os.stat_result) -> str:
+    """Get the cache key of a file.
+
+    Args:
+        stat_result (obj): The result of os.stat() of the file.
+
+    Returns:
+        Returns the key build from device, inode, size and modification time.
+    """
+    return (f"{stat_result.st_dev}:{stat_result.st_ino}:"
+            f"{stat_result.st_size}:{stat_result.st_mtime_ns}")
+
+
+def _as_dict(hash_type: str, digest: Optional[str]) -> Optional[Dict[str, str]]:
+    """Get a single hex digest as the dictionary returned by HashCache.get_hashes()."""
+    return {hash_type: digest} if digest is not None else None
+
+
+# -----------------------------------------------------------------------------
+# Class
+# -----------------------------------------------------------------------------
+class HashCache:
+    """Persistent LRU cache of file hashes keyed by (device, inode, size, mtime_ns).
+
+    The cache can be used by multiple threads concurrently.
+    """
+
+    def __init__(self, filename: Optional[str] = None, max_entries: int = 256):
+        """Construct a new instance and load the cache file.
+
+        Args:
+            filename (str):    The cache file. If set to None, the file
+                               ``hash_cache.json`` in the cache directory is used.
+            max_entries (int): The maximum number of entries to keep.
+        """
+        if filename is None:
+            filename = os.path.join(get_cache_dir(), "hash_cache.json")
+        self.filename = filename
+        self.max_entries = max(1, max_entries)
+        self.entries: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._modified = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def lookup(self, filename: str, hash_type: str = "md5") -> Optional[str]:
+        """Get the cached hash of a file.
+
+        Args:
+            filename (str):  The file to look up.
+            hash_type (str): The type of the hash.
+
+        Returns:
+            Returns the cached hex digest or None if the file is unknown, has
+            changed since it was hashed or does not exist.
+        """
+        try:
+            key = get_cache_key(os.stat(filename))
+        except OSError:
+            return None
+
+        with self._lock:
+            hashes = self.entries.get(key)
+            if hashes is None or hash_type not in hashes:
+                return None
+            # The new order is saved only with the next stored entry, so a hit
+            # does not rewrite the cache file
+            self.entries.move_to_end(key)
+            return hashes[hash_type]
+
+    def store(self, stat_result: os.stat_result, digest: str, hash_type: str = "md5") -> None:
+        """Store the hash of a file.
+
+        Args:
+            stat_result (obj): The result of os.stat() of the file before it was hashed.
+            digest (str):      The hex digest of the file.
+            hash_type (str):   The type of the hash.
+        """
+        if time.time() - stat_result.st_mtime < RACY_MTIME_SECS:
+            return
+
+        key = get_cache_key(stat_result)
+        with self._lock:
+            self.entries.setdefault(key, {})[hash_type] = digest
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._modified = True
+
+    def get_hash(self, filename: str, hash_func: Callable[[str], Optional[str]],
+                 hash_type: str = "md5") -> Optional[str]:
+        """Get the hash of a file and calculate it only if the cache entry is invalid.
+
+        Args:
+            filename (str):  The file to get the hash of.
+            hash_func (obj): Function calculating the hex digest of a file.
+            hash_type (str): The type of the hash calculated by hash_func.
+
+        Returns:
+            Returns the hex digest or None if the file does not exist.
+        """
+        digests = self.get_hashes(
+            filename, lambda name, _hash_types: _as_dict(hash_type, hash_func(name)), [hash_type])
+        return digests[hash_type] if digests is not None else None
+
+    def get_hashes(self, filename: str,
+                   hash_func: Callable[[str, List[str]], Optional[Dict[str, str]]],
+                   hash_types: List[str]) -> Optional[Dict[str, str]]:
+        """Get several hashes of a file and calculate the missing ones in a single call.
+
+        Args:
+            filename (str):    The file to get the hashes of.
+            hash_func (obj):   Function calculating the hex digests of a file for
+                               a list of hash types.
+            hash_types (list): The types of the hashes.
+
+        Returns:
+            Returns the hex digests by hash type or None if the file does not exist.
+        """
+        digests = {hash_type: self.lookup(filename, hash_type) for hash_type in hash_types}
+        missing = [hash_type for hash_type, digest in digests.items() if digest is None]
+        if not missing:
+            return {hash_type: str(digest) for hash_type, digest in digests.items()}
+
+        try:
+            stat_before = os.stat(filename)
+        except OSError:
+            return hash_func(filename, hash_types)
+
+        calculated = hash_func(filename, missing)
+        if calculated is None:
+            return None
+        try:
+            stat_after = os.stat(filename)
+        except OSError:
+            stat_after = None
+        # Only cache the hashes if the file was not modified while hashing it
+        if stat_after is not None and get_cache_key(stat_before) == get_cache_key(stat_after):
+            for hash_type, digest in calculated.items():
+                self.store(stat_before, digest, hash_type)
+        elif len(missing) < len(hash_types):
+            # The cached hashes might not match the modified file
+            return hash_func(filename, hash_types)
+        result = {hash_type: digest for hash_type, digest in digests.items() if digest is not None}
+        result.update(calculated)
+        return result
+
+    def save(self) -> None:
+        """Save the cache file if it was modified."""
+        with self._lock:
+            if not self._modified:
+                return
+
+            save_json(self.filename, list(self.entries.items()))
+            self._modified = False
+
+    def _load(self) -> None:
+        """Load the cache file. A missing or corrupted file results in an empty cache."""
+        self.entries.clear()
+        try:
+            for key, hashes in load_json(self.filename):
+                self.entries[str(key)] = dict(hashes)
+        except (OSError, ValueError, TypeError):
+            self.entries.clear()
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
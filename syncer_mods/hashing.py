@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer to calculate the hashes of local files.
+
+Several strategies to read the file are supported, as their throughput
+depends on the machine. Use ``tests/benchmarks/bench_hashing.py`` to compare
+them.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import hashlib
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+# Supported strategies. "auto" uses hashlib.file_digest() if available and
+# "readinto" otherwise.
+STRATEGIES = ["auto", "file_digest", "readinto", "mmap"]
+
+# Hash types of rclone that can be calculated locally, in the order of preference
+HASH_TYPES = ["md5", "sha1", "sha256", "quickxor"]
+
+QUICKXOR_WIDTH_BYTES = 20
+QUICKXOR_SHIFT = 11
+
+# Local fingerprint of a file, see tree_hash_file()
+TREE_HASH_TYPE = "tree"
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+
+# Sampled pre-check of a file, see sample_hash_file()
+SAMPLE_HASH_TYPE = "sample"
+DEFAULT_SAMPLE_SIZE = 64 * 1024
+
+
+# -----------------------------------------------------------------------------
+# Hash Classes
+# -----------------------------------------------------------------------------
+class QuickXorHash:
+    """The QuickXorHash of OneDrive with the interface of the hashlib objects.
+
+    Each byte at position i is rotated by 11 * i bits into a 160 bit state,
+    which is XOR-ed with the length of the data at the end. As the rotation
+    repeats every 160 bytes, the bytes at positions with the same remainder
+    are XOR-ed first using big integer operations.
+    """
+
+    name = "quickxor"
+
+    def __init__(self) -> None:
+        """Construct a new instance."""
+        self._columns = 0
+        self._length = 0
+
+    def update(self, data: Any) -> None:
+        """Add the data to the hash.
+
+        Args:
+            data (obj): A bytes-like object.
+        """
+        data = memoryview(data).cast("B")
+        if not data:
+            return
+        # Each row consists of one byte per bit of the state
+        width = QUICKXOR_WIDTH_BYTES * 8
+        padding = -len(data) % width
+        value = int.from_bytes(data, "little")
+        num_rows = (len(data) + padding) // width
+        # Fold the rows onto each other until a single row of 160 columns is left
+        while num_rows > 1:
+            half = (num_rows + 1) // 2
+            shift = half * width * 8
+            value = (value & ((1 << shift) - 1)) ^ (value >> shift)
+            num_rows = half
+        offset = self._length % width
+        value = ((value << (offset * 8)) | (value >> ((width - offset) * 8))) \
+            & ((1 << (width * 8)) - 1)
+        self._columns ^= value
+        self._length += len(data)
+
+    def digest(self) -> bytes:
+        """Get the digest of the data added so far."""
+        width_bits = QUICKXOR_WIDTH_BYTES * 8
+        mask = (1 << width_bits) - 1
+        state = 0
+        for column in range(width_bits):
+            value = (self._columns >> (column * 8)) & 0xff
+            if value:
+                bits = (column * QUICKXOR_SHIFT) % width_bits
+                state ^= ((value << bits) | (value >> (width_bits - bits))) & mask
+        state ^= (self._length & 0xffffffffffffffff) << (width_bits - 64)
+        return state.to_bytes(QUICKXOR_WIDTH_BYTES, "little")
+
+    def hexdigest(self) -> str:
+        """Get the digest of the data added so far as a hex string."""
+        return self.digest().hex()
+
+
+class _MultiHash:
+    """Update several hash objects at once."""
+
+    def __init__(self, hashes: Dict[str, Any]) -> None:
+        """Construct a new instance."""
+        self.hashes = hashes
+
+    def update(self, data: Any) -> None:
+        """Add the data to all hashes."""
+        for file_hash in self.hashes.values():
+            file_hash.update(data)
+
+
+# -----------------------------------------------------------------------------
+# Strategies
+# -----------------------------------------------------------------------------
+def _hash_readinto(file_handle: BinaryIO, file_hash, block_size: int,
+                   check: Optional[Callable[[], None]] = None) -> None:
+    """Update the hash by reading the file into a single reusable buffer."""
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    while True:
+        if check is not None:
+            check()
+        size = file_handle.readinto(buffer)  # type: ignore
+        if not size:
+            break
+        file_hash.update(view[:size])
+
+
+def _hash_mmap(file_handle: BinaryIO, file_hash, block_size: int,
+               check: Optional[Callable[[], None]] = None) -> None:
+    """Update the hash by mapping the file into memory."""
+    file_size = os.fstat(file_handle.fileno()).st_size
+    if file_size == 0:
+        return
+    with mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        view = memoryview(mapped_file)
+        try:
+            for offset in range(0, file_size, block_size):
+                if check is not None:
+                    check()
+                file_hash.update(view[offset:offset + block_size])
+        finally:
+            view.release()
+
+
+# -----------------------------------------------------------------------------
+# Functions
+# -----------------------------------------------------------------------------
+def has_file_digest() -> bool:
+    """Check if hashlib.file_digest() is available (Python 3.11 and newer)."""
+    return hasattr(hashlib, "file_digest")
+
+
+def new_hash(hash_type: str) -> Any:
+    """Create a new hash object.
+
+    Args:
+        hash_type (str): The name of the hash as used by rclone, i.e., ``quickxor``,
+                         or by hashlib.new().
+
+    Returns:
+        Returns the hash object providing the methods update() and hexdigest().
+
+    Raises:
+        ValueError: If the hash type is unknown.
+    """
+    if hash_type == "quickxor":
+        return QuickXorHash()
+    return hashlib.new(hash_type)
+
+
+def select_hash_type(remote_hash_types: List[str]) -> Optional[str]:
+    """Select the preferred hash type supported by the remote and computable locally.
+
+    Args:
+        remote_hash_types (list): The hash types supported by the remote.
+
+    Returns:
+        Returns the first entry of HASH_TYPES supported by the remote or None.
+    """
+    for hash_type in HASH_TYPES:
+        if hash_type in remote_hash_types:
+            return hash_type
+    return None
+
+
+def hash_file(filename: str, hash_type: str = "md5", block_size: int = DEFAULT_BLOCK_SIZE,
+              strategy: str = "auto") -> Optional[str]:
+    """Calculate the hash of a file and return its hex digest.
+
+    Args:
+        filename (str):   File to calculate the hash of.
+        hash_type (str):  The name of the hash algorithm, see new_hash().
+        block_size (int): The number of bytes processed at once. Ignored by the
+                          strategy "file_digest".
+        strategy (str):   The strategy to read the file, see STRATEGIES.
+
+    Returns:
+        Returns the hex digest or None if the file does not exist.
+
+    Raises:
+        ValueError: If the strategy or the hash type is unknown or not available.
+    """
+    digests = hash_file_multi(filename, [hash_type], block_size, strategy)
+    return digests[hash_type] if digests is not None else None
+
+
+def hash_file_multi(filename: str, hash_types: List[str], block_size: int = DEFAULT_BLOCK_SIZE,
+                    strategy: str = "auto",
+                    check: Optional[Callable[[], None]] = None) -> Optional[Dict[str, str]]:
+    """Calculate several hashes of a file reading it only once.
+
+    Args:
+        filename (str):   File to calculate the hashes of.
+        hash_types (list): The names of the hash algorithms, see new_hash().
+        block_size (int): The number of bytes processed at once. Ignored by the
+                          strategy "file_digest".
+        strategy (str):   The strategy to read the file, see STRATEGIES. The strategy
+                          "file_digest" supports a single hash type of hashlib only
+                          and falls back to "readinto" otherwise.
+        check (func):     Function called before each block is hashed. It can abort
+                          the hashing by raising an exception. As the strategy
+                          "file_digest" can't be interrupted, it falls back to
+                          "readinto" if a check function is given.
+
+    Returns:
+        Returns the hex digests by hash type or None if the file does not exist.
+
+    Raises:
+        ValueError: If the strategy or a hash type is unknown or not available.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown hashing strategy {strategy}!")
+    if strategy == "file_digest" and not has_file_digest():
+        raise ValueError("Hashing strategy file_digest requires Python 3.11 or newer!")
+    hashes = {hash_type: new_hash(hash_type) for hash_type in hash_types}
+    if strategy in ["auto", "file_digest"]:
+        use_file_digest = has_file_digest() and len(hash_types) == 1 \
+            and hash_types[0] != "quickxor" and check is None
+        strategy = "file_digest" if use_file_digest else "readinto"
+
+    try:
+        file_handle = open(filename, "rb")  # pylint: disable=consider-using-with
+    except FileNotFoundError:
+        return None
+
+    with file_handle:
+        if strategy == "file_digest":
+            hash_type = hash_types[0]
+            return {hash_type: hashlib.file_digest(file_handle,  # type: ignore
+                                                   hash_type).hexdigest()}
+
+        if strategy == "mmap":
+            _hash_mmap(file_handle, _MultiHash(hashes), max(1, block_size), check)
+        else:
+            _hash_readinto(file_handle, _MultiHash(hashes), max(1, block_size), check)
+        return {hash_type: file_hash.hexdigest() for hash_type, file_hash in hashes.items()}
+
+
+def _hash_segment(filename: str, offset: int, length: int, block_size: int) -> bytes:
+    """Calculate the digest of a segment of a file using its own file handle."""
+    segment_hash = hashlib.blake2b(digest_size=32)
+    buffer = bytearray(max(1, min(block_size, length)))
+    view = memoryview(buffer)
+    with open(filename, "rb") as file_handle:
+        file_handle.seek(offset)
+        remaining = length
+        while remaining > 0:
+            size = file_handle.readinto(view[:min(remaining, len(buffer))])  # type: ignore
+            if not size:
+                break
+            segment_hash.update(view[:size])
+            remaining -= size
+    return segment_hash.digest()
+
+
+def tree_hash_file(filename: str, segment_size: int = DEFAULT_SEGMENT_SIZE,
+                   max_workers: int = 0, block_size: int = DEFAULT_BLOCK_SIZE) -> Optional[str]:
+    """Calculate a fingerprint of a file by hashing its segments in parallel.
+
+    The segments are hashed using BLAKE2b by a pool of threads, as hashlib
+    releases the GIL while hashing, and the digests of the segments are hashed
+    again together with the file size and the segment size. The fingerprint is
+    meant to detect local modifications only, no remote supports it.
+
+    Args:
+        filename (str):     File to calculate the fingerprint of.
+        segment_size (int): The size of the segments hashed in parallel.
+        max_workers (int):  The maximum number of threads or 0 to use one
+                            thread per CPU.
+        block_size (int):   The number of bytes processed at once.
+
+    Returns:
+        Returns the hex digest or None if the file does not exist.
+    """
+    segment_size = max(1, segment_size)
+    try:
+        file_size = os.stat(filename).st_size
+        offsets = range(0, file_size, segment_size)
+        num_workers = max(1, min(max_workers or os.cpu_count() or 1, len(offsets)))
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            digests = list(executor.map(
+                lambda offset: _hash_segment(filename, offset,
+                                             min(segment_size, file_size - offset), block_size),
+                offsets))
+    except FileNotFoundError:
+        return None
+
+    tree_hash = hashlib.blake2b(f"{file_size}:{segment_size}:".encode(), digest_size=32)
+    for digest in digests:
+        tree_hash.update(digest)
+    return tree_hash.hexdigest()
+
+
+def sample_hash_file(filename: str, num_samples: int,
+                     sample_size: int = DEFAULT_SAMPLE_SIZE) -> Optional[str]:
+    """Calculate a cheap fingerprint of a file from its size and some sampled blocks.
+
+    The head, the tail and ``num_samples`` blocks evenly spread in between are
+    hashed. Different fingerprints prove that the file changed, while equal
+    fingerprints do not prove that it is unchanged.
+
+    Args:
+        filename (str):    File to calculate the fingerprint of.
+        num_samples (int): The number of blocks sampled between head and tail.
+        sample_size (int): The size of each sampled block.
+
+    Returns:
+        Returns the hex digest or None if the file does not exist.
+    """
+    try:
+        file_handle = open(filename, "rb")  # pylint: disable=consider-using-with
+    except FileNotFoundError:
+        return None
+
+    with file_handle:
+        file_size = os.fstat(file_handle.fileno()).st_size
+        sample_hash = hashlib.blake2b(f"{file_size}:{num_samples}:{sample_size}:".encode(),
+                                      digest_size=32)
+        last_offset = max(0, file_size - sample_size)
+        for offset in sorted({last_offset * index // (num_samples + 1)
+                              for index in range(num_samples + 2)}):
+            file_handle.seek(offset)
+            sample_hash.update(file_handle.read(sample_size))
+    return sample_hash.hexdigest()
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer to provide a dialog showing the journal of synchronizations.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+from datetime import datetime
+from typing import Any, Dict
+
+from PyQt5.QtWidgets import QDialog, QTableWidgetItem
+
+from .history_dialog_ui import Ui_HistoryDialog
+from .journal import SyncJournal, format_duration
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def format_size(size: int) -> str:
+    """Format a number of bytes as a human readable string."""
+    value = float(size)
+    for unit in ["B", "KiB", "MiB"]:
+        if value < 1024.0:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024.0
+    return f"{value:.1f} GiB"
+
+
+def get_result_text(entry: Dict[str, Any]) -> str:
+    """Get the result column of a journal entry."""
+    if entry["error"] is not None:
+        return f"Error: {entry['error']}"
+    if entry["direction"] is None:
+        return "In sync"
+    text = "Upload" if entry["direction"] == "local" else "Download"
+    return f"{text} (dry run)" if entry["dry_run"] else text
+
+
+# -----------------------------------------------------------------------------
+# Dialog
+# -----------------------------------------------------------------------------
+class HistoryDialog(QDialog):
+    """Provide a dialog to display the most recent synchronizations and their latency."""
+
+    def __init__(self, journal: SyncJournal, limit: int = 200) -> None:
+        """Construct a new instance.
+
+        Args:
+            journal (obj): The journal to show.
+            limit (int):   The maximum number of entries to show.
+        """
+        super().__init__()
+
+        self.gui = Ui_HistoryDialog()
+        self.gui.setupUi(self)
+
+        entries = journal.get_entries(limit)
+        self.gui.historyTable.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            self._set_row(row, entry)
+        self.gui.historyTable.resizeColumnsToContents()
+
+        remote_files = sorted({entry["remote_file"] for entry in entries})
+        stats_lines = []
+        for remote_file in remote_files:
+            stats = journal.get_latency_stats(limit, remote_file)
+            if stats is not None:
+                stats_lines.append(f"{remote_file}: {stats.get_description()} "
+                                   f"({stats.count} synchronizations)")
+        if stats_lines:
+            self.gui.statsLabel.setText("\n".join(stats_lines))
+
+    def _set_row(self, row: int, entry: Dict[str, Any]) -> None:
+        """Show a journal entry in a row of the table."""
+        phases = ", ".join(f"{phase} {format_duration(secs)}"
+                           for phase, secs in entry["timings"].items())
+        texts = [datetime.fromtimestamp(entry["start_time"]).strftime("%Y-%m-%d %H:%M:%S"),
+                 os.path.basename(entry["local_file"]),
+                 get_result_text(entry),
+                 format_duration(entry["duration_secs"]),
+                 format_size(entry["bytes_transferred"]),
+                 entry["hash_type"] or "",
+                 phases]
+        tooltips = {1: f"{entry['local_file']} - {entry['remote_file']}",
+                    5: f"Local: {entry['local_md5']}\nRemote: {entry['remote_md5']}"}
+        for column, text in enumerate(texts):
+            item = QTableWidgetItem(text)
+            item.setToolTip(tooltips.get(column, text))
+            self.gui.historyTable.setItem(row, column, item)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer providing the persistent journal of all synchronizations.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import json
+import math
+import os
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .app_dirs import get_cache_dir
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+DEFAULT_MAX_ENTRIES = 10000
+COLUMNS = ["start_time", "local_file", "remote_file", "direction", "dry_run", "error",
+           "duration_secs", "bytes_transferred", "hash_type", "local_md5", "remote_md5",
+           "timings"]
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def get_percentile(values: List[float], fraction: float) -> float:
+    """Get a percentile of the values using the nearest-rank method.
+
+    Args:
+        values (list):    The values. Must not be empty.
+        fraction (float): The percentile as a fraction, e.g., 0.95.
+
+    Returns:
+        Returns the smallest value that is greater or equal to the given
+        fraction of all values.
+    """
+    sorted_values = sorted(values)
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def format_duration(secs: float) -> str:
+    """Format a duration as a human readable string.
+
+    Args:
+        secs (float): The duration in seconds.
+
+    Returns:
+        Returns the duration in milliseconds or seconds.
+    """
+    if secs < 1.0:
+        return f"{secs * 1000:.0f} ms"
+    return f"{secs:.1f} s"
+
+
+# -----------------------------------------------------------------------------
+# Data Classes
+# -----------------------------------------------------------------------------
+@dataclass
+class LatencyStats:
+    """Latency statistics of the journal."""
+
+    count: int
+    last_secs: float
+    p50_secs: float
+    p95_secs: float
+
+    def get_description(self) -> str:
+        """Get a human readable description of the statistics."""
+        return (f"Last sync {format_duration(self.last_secs)}, "
+                f"p50 {format_duration(self.p50_secs)}, p95 {format_duration(self.p95_secs)}")
+
+
+# -----------------------------------------------------------------------------
+# Class
+# -----------------------------------------------------------------------------
+class SyncJournal:
+    """Persistent journal of all synchronizations in an SQLite database.
+
+    Every call opens its own connection, so instances can be used by multiple
+    threads and processes concurrently. The journal keeps the most recent
+    ``max_entries`` entries only.
+    """
+
+    def __init__(self, filename: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Construct a new instance.
+
+        Args:
+            filename (str):    The database file or None to use the default file
+                               in the cache directory.
+            max_entries (int): The maximum number of entries to keep.
+        """
+        self.filename = filename if filename is not None \
+            else os.path.join(get_cache_dir(), "journal.sqlite3")
+        self.max_entries = max_entries
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database and create or migrate the table if necessary.
+
+        Databases written before the hash type was recorded get the column
+        ``hash_type``. Their entries contain md5 hashes only.
+        """
+        connection = sqlite3.connect(self.filename, timeout=10.0)
+        with connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS syncs ("
+                               "id INTEGER PRIMARY KEY AUTOINCREMENT, start_time REAL, "
+                               "local_file TEXT, remote_file TEXT, direction TEXT, "
+                               "dry_run INTEGER, error TEXT, duration_secs REAL, "
+                               "bytes_transferred INTEGER, hash_type TEXT, local_md5 TEXT, "
+                               "remote_md5 TEXT, timings TEXT)")
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(syncs)")]
+            if "hash_type" not in columns:
+                connection.execute("ALTER TABLE syncs ADD COLUMN hash_type TEXT DEFAULT 'md5'")
+            connection.execute("CREATE INDEX IF NOT EXISTS syncs_remote_file "
+                               "ON syncs (remote_file, id)")
+        return connection
+
+    def add(self, records: List[Dict[str, Any]]) -> None:
+        """Add entries to the journal and remove the oldest ones exceeding the limit.
+
+        Args:
+            records (list): The records of the results as returned by
+                            SyncResult.get_record().
+
+        Raises:
+            sqlite3.Error: If the database can't be written.
+        """
+        rows = [tuple(json.dumps(record[column]) if column == "timings" else record[column]
+                      for column in COLUMNS)
+                for record in records]
+        with closing(self._connect()) as connection:
+            with connection:
+                connection.executemany(f"INSERT INTO syncs ({', '.join(COLUMNS)}) "
+                                       f"VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+                connection.execute("DELETE FROM syncs "
+                                   "WHERE id <= (SELECT MAX(id) FROM syncs) - ?",
+                                   (self.max_entries,))
+
+    def get_entries(self, limit: int = 100,
+                    remote_file: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get the most recent entries.
+
+        Args:
+            limit (int):       The maximum number of entries.
+            remote_file (str): If given, only the entries of this remote file are returned.
+
+        Returns:
+            Returns the records of the entries, newest first.
+
+        Raises:
+            sqlite3.Error: If the database can't be read.
+        """
+        query = f"SELECT {', '.join(COLUMNS)} FROM syncs"
+        params: List[Any] = []
+        if remote_file is not None:
+            query += " WHERE remote_file = ?"
+            params.append(remote_file)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        with closing(self._connect()) as connection:
+            rows = connection.execute(query, params).fetchall()
+        entries = []
+        for row in rows:
+            entry = dict(zip(COLUMNS, row))
+            entry["dry_run"] = bool(entry["dry_run"])
+            entry["timings"] = json.loads(entry["timings"])
+            entries.append(entry)
+        return entries
+
+    def get_latency_stats(self, limit: int = 100,
+                          remote_file: Optional[str] = None) -> Optional[LatencyStats]:
+        """Get the latency statistics of the most recent successful synchronizations.
+
+        Dry runs and synchronizations with errors are not taken into account.
+
+        Args:
+            limit (int):       The maximum number of entries to evaluate.
+            remote_file (str): If given, only the entries of this remote file are evaluated.
+
+        Returns:
+            Returns the statistics or None if there are no entries.
+
+        Raises:
+            sqlite3.Error: If the database can't be read.
+        """
+        durations = [entry["duration_secs"]
+                     for entry in self.get_entries(limit, remote_file)
+                     if not entry["dry_run"] and entry["error"] is None]
+        if not durations:
+            return None
+        return LatencyStats(len(durations), durations[0],
+                            get_percentile(durations, 0.5), get_percentile(durations, 0.95))
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer providing the timing instrumentation and the metrics export.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+PHASES = ["remote_stat", "local_fingerprint", "local_hash", "modtime", "backup", "transfer"]
+METRICS_FORMATS = ["jsonl", "prometheus"]
+
+
+# -----------------------------------------------------------------------------
+# Data Classes
+# -----------------------------------------------------------------------------
+@dataclass
+class SyncMetrics:
+    """Timings, transferred bytes, retries, remote cache accesses and hashes of a sync."""
+
+    timings: Dict[str, float] = field(default_factory=dict)
+    bytes_transferred: int = 0
+    retries: int = 0
+    remote_cache_hits: int = 0
+    remote_cache_misses: int = 0
+    transfer_profile: str = "default"
+    # The hashes are of the type hash_type negotiated with the remote, the field
+    # names are kept for compatibility with existing journals and exports
+    hash_type: str = "md5"
+    local_md5: Optional[str] = None
+    remote_md5: Optional[str] = None
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        """Measure the duration of a phase and add it to the timings.
+
+        Args:
+            phase (str): The name of the phase, see PHASES.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] = self.timings.get(phase, 0.0) + time.perf_counter() - start
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def _escape_label(value: str) -> str:
+    """Escape a label value of the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _get_labels(record: Dict[str, Any], phase: Optional[str] = None) -> str:
+    """Get the labels of a record in the Prometheus text format."""
+    labels = f'local_file="{_escape_label(record["local_file"])}",' \
+        f'remote_file="{_escape_label(record["remote_file"])}"'
+    if phase is not None:
+        labels += f',phase="{phase}"'
+    return f"{{{labels}}}"
+
+
+def format_prometheus(records: List[Dict[str, Any]]) -> str:
+    """Format the records in the Prometheus text exposition format.
+
+    Args:
+        records (list): The records of the results as returned by SyncResult.get_record().
+
+    Returns:
+        Returns the content of the textfile.
+    """
+    lines = ["# HELP syncer_sync_timestamp_seconds Time of the last synchronization.",
+             "# TYPE syncer_sync_timestamp_seconds gauge"]
+    lines += [f"syncer_sync_timestamp_seconds{_get_labels(record)} {record['timestamp']}"
+              for record in records]
+    lines += ["# HELP syncer_sync_success Whether the last synchronization succeeded.",
+              "# TYPE syncer_sync_success gauge"]
+    lines += [f"syncer_sync_success{_get_labels(record)} {int(record['error'] is None)}"
+              for record in records]
+    lines += ["# HELP syncer_sync_duration_seconds Duration of the last synchronization.",
+              "# TYPE syncer_sync_duration_seconds gauge"]
+    lines += [f"syncer_sync_duration_seconds{_get_labels(record)} {record['duration_secs']}"
+              for record in records]
+    lines += ["# HELP syncer_sync_phase_duration_seconds Duration of a phase of the last "
+              "synchronization.",
+              "# TYPE syncer_sync_phase_duration_seconds gauge"]
+    lines += [f"syncer_sync_phase_duration_seconds{_get_labels(record, phase)} {duration}"
+              for record in records for phase, duration in record["timings"].items()]
+    lines += ["# HELP syncer_sync_transferred_bytes Bytes transferred by the last "
+              "synchronization.",
+              "# TYPE syncer_sync_transferred_bytes gauge"]
+    lines += [f"syncer_sync_transferred_bytes{_get_labels(record)} {record['bytes_transferred']}"
+              for record in records]
+    lines += ["# HELP syncer_sync_retries Retried rclone calls of the last synchronization.",
+              "# TYPE syncer_sync_retries gauge"]
+    lines += [f"syncer_sync_retries{_get_labels(record)} {record['retries']}"
+              for record in records]
+    lines += ["# HELP syncer_sync_remote_cache_hits Remote metadata taken from the cache by the "
+              "last synchronization.",
+              "# TYPE syncer_sync_remote_cache_hits gauge"]
+    lines += [f"syncer_sync_remote_cache_hits{_get_labels(record)} {record['remote_cache_hits']}"
+              for record in records]
+    lines += ["# HELP syncer_sync_remote_cache_misses Remote metadata queried from the remote "
+              "by the last synchronization.",
+              "# TYPE syncer_sync_remote_cache_misses gauge"]
+    lines += [f"syncer_sync_remote_cache_misses{_get_labels(record)} "
+              f"{record['remote_cache_misses']}"
+              for record in records]
+    return "\n".join(lines) + "\n"
+
+
+def export_metrics(filename: str, metrics_format: str, records: List[Dict[str, Any]]) -> None:
+    """Write the records of a synchronization to a metrics file.
+
+    The format ``jsonl`` appends a JSON object per record to the file. The
+    format ``prometheus`` replaces the file atomically by the current values,
+    so it can be read by the textfile collector of the node exporter.
+
+    Args:
+        filename (str):       The metrics file.
+        metrics_format (str): The format, see METRICS_FORMATS.
+        records (list):       The records of the results as returned by
+                              SyncResult.get_record().
+
+    Raises:
+        ValueError: If the format is unknown.
+        OSError:    If the file can't be written.
+    """
+    timestamp = time.time()
+    records = [dict(record, timestamp=timestamp) for record in records]
+    if metrics_format == "jsonl":
+        with open(filename, "a", encoding="UTF-8") as file_handle:
+            for record in records:
+                file_handle.write(json.dumps(record) + "\n")
+    elif metrics_format == "prometheus":
+        with open(f"{filename}.tmp", "w", encoding="UTF-8") as file_handle:
+            file_handle.write(format_prometheus(records))
+        os.replace(f"{filename}.tmp", filename)
+    else:
+        raise ValueError(f"Unknown metrics format {metrics_format}!")
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer providing the synchronization worker for the Qt application.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+from typing import List, Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from .journal import SyncJournal
+from .settings import Settings
+from .sync_result import SyncListener, SyncResult
+from .synchronizer import Synchronizer
+
+
+# -----------------------------------------------------------------------------
+# Worker Class
+# -----------------------------------------------------------------------------
+class QtSynchronizer(QObject, SyncListener):
+    """Run the :class:`syncer_mods.synchronizer.Synchronizer` and report via Qt signals."""
+
+    started = pyqtSignal()
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, settings: Optional[Settings] = None):
+        """Construct a new worker.
+
+        Args:
+            settings (obj): The settings object to modify. If set
+                            to None, a local one will be used.
+        """
+        super().__init__()
+        self.synchronizer = Synchronizer(settings, self)
+
+    @property
+    def last_results(self) -> List[SyncResult]:
+        """Get the results of the last synchronization."""
+        return self.synchronizer.last_results
+
+    @property
+    def journal(self) -> SyncJournal:
+        """Get the journal of all synchronizations."""
+        return self.synchronizer.journal
+
+    @pyqtSlot()
+    def run(self) -> None:
+        """Synchronize all files."""
+        self.synchronizer.run()
+
+    def cancel(self) -> None:
+        """Cancel the running synchronization.
+
+        This method must be called directly instead of via a queued signal,
+        as the thread of the worker is blocked by the synchronization.
+        """
+        self.synchronizer.cancel()
+
+    @pyqtSlot()
+    def close(self) -> None:
+        """Release the resources of the synchronizer."""
+        self.synchronizer.close()
+
+    def on_started(self) -> None:
+        """Emit the signal started."""
+        self.started.emit()
+
+    def on_finished(self, message: str) -> None:
+        """Emit the signal finished."""
+        self.finished.emit(message)
+
+    def on_error(self, message: str) -> None:
+        """Emit the signal error."""
+        self.error.emit(message)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
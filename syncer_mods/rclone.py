@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer to call rclone and query the remote file.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import json
+import re
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, NoReturn, Optional, Tuple
+
+
+# -----------------------------------------------------------------------------
+# Exception Class
+# -----------------------------------------------------------------------------
+class SynchronizerError(Exception):
+    """Represents an error within the synchronization task."""
+
+
+class SyncCancelledError(SynchronizerError):
+    """Represents the cancellation of the synchronization task."""
+
+
+class RcloneExitError(SynchronizerError):
+    """Represents an rclone call terminated with a non-zero exit code."""
+
+    def __init__(self, message: str, returncode: int):
+        """Construct a new instance.
+
+        Args:
+            message (str):    The description of the error.
+            returncode (int): The exit code of rclone.
+        """
+        super().__init__(message, returncode)
+        self.message = message
+        self.returncode = returncode
+
+    def __str__(self) -> str:
+        """Get the description of the error."""
+        return self.message
+
+
+# -----------------------------------------------------------------------------
+# Process Watchdog
+# -----------------------------------------------------------------------------
+class ProcessWatchdog:
+    """Kill rclone processes exceeding their timeout or on cancellation.
+
+    The timeout of a process is the smaller of the step timeout and the time
+    left until the deadline set by the calling thread. The watchdog is shared
+    by all threads, so cancel() kills all watched processes.
+    """
+
+    def __init__(self) -> None:
+        """Construct a new instance."""
+        self.step_timeout: Optional[float] = None
+        self._kill_funcs: Dict[subprocess.Popen, Callable[[str], None]] = {}
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def reset(self) -> None:
+        """Reset the cancellation before starting a new synchronization."""
+        with self._lock:
+            self._cancelled.clear()
+
+    def cancel(self) -> None:
+        """Kill all watched processes and all processes started until reset() is called."""
+        with self._lock:
+            self._cancelled.set()
+            kill_funcs = list(self._kill_funcs.values())
+        for kill_func in kill_funcs:
+            kill_func("cancel")
+
+    def check(self) -> None:
+        """Check for a cancellation or an exceeded deadline.
+
+        Raises:
+            SyncCancelledError: If the synchronization was cancelled.
+            SynchronizerError:  If the deadline of the calling thread is exceeded.
+        """
+        if self._cancelled.is_set():
+            raise SyncCancelledError("Synchronization was cancelled!")
+        self.get_timeout()
+
+    def sleep(self, secs: float) -> None:
+        """Sleep unless the synchronization is cancelled.
+
+        Args:
+            secs (float): The duration in seconds. It is limited by the deadline
+                          of the calling thread.
+
+        Raises:
+            SyncCancelledError: If the synchronization was cancelled.
+            SynchronizerError:  If the deadline of the calling thread is exceeded.
+        """
+        timeout = self.get_timeout()
+        self._cancelled.wait(secs if timeout is None else min(secs, timeout))
+        self.check()
+
+    @contextmanager
+    def deadline(self, deadline: Optional[float]) -> Iterator[None]:
+        """Set the deadline of all processes started by the calling thread.
+
+        Args:
+            deadline (float): The deadline as time.monotonic() value or None.
+        """
+        previous = getattr(self._local, "deadline", None)
+        self._local.deadline = deadline
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+    def get_timeout(self) -> Optional[float]:
+        """Get the timeout of a process or remote control call started now by the calling thread.
+
+        Returns:
+            Returns the smaller of the step timeout and the time left until the
+            deadline, or None if neither is set.
+
+        Raises:
+            SynchronizerError: If the deadline is exceeded.
+        """
+        timeout = self.step_timeout
+        deadline = getattr(self._local, "deadline", None)
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0.0:
+                raise SynchronizerError("Synchronization exceeded its deadline!")
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    @contextmanager
+    def watch(self, process: subprocess.Popen) -> Iterator[None]:
+        """Watch a process while the context is active.
+
+        The context must wait for the termination of the process.
+
+        Args:
+            process (obj): The process to watch.
+
+        Raises:
+            SyncCancelledError: If the process was killed due to a cancellation.
+            SynchronizerError:  If the process was killed due to its timeout.
+        """
+        reasons: List[str] = []
+
+        def kill(reason: str) -> None:
+            reasons.append(reason)
+            process.kill()
+
+        try:
+            timeout = self.get_timeout()
+        except SynchronizerError:
+            kill("deadline")
+            process.wait()
+            raise
+        timer = threading.Timer(timeout, kill, ("timeout",)) if timeout is not None else None
+        with self._lock:
+            self._kill_funcs[process] = kill
+            cancelled = self._cancelled.is_set()
+        if cancelled:
+            kill("cancel")
+        if timer is not None:
+            timer.daemon = True
+            timer.start()
+
+        try:
+            yield
+        except Exception:  # pylint: disable=broad-except
+            if not reasons:
+                raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            with self._lock:
+                self._kill_funcs.pop(process, None)
+
+        if reasons:
+            process.wait()
+            if reasons[0] == "cancel":
+                raise SyncCancelledError("Synchronization was cancelled!")
+            raise SynchronizerError(f"RClone did not finish within {timeout:.1f} seconds!")
+
+
+WATCHDOG = ProcessWatchdog()
+
+
+# -----------------------------------------------------------------------------
+# Data Classes
+# -----------------------------------------------------------------------------
+@dataclass
+class RemoteStat:
+    """Metadata of a remote file as reported by rclone."""
+
+    size: int
+    modtime: datetime
+    hashes: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def md5(self) -> Optional[str]:
+        """Get the md5 checksum of the remote file or None if the remote does not provide it."""
+        return self.hashes.get("md5")
+
+    def get_hash(self, hash_type: str) -> Optional[str]:
+        """Get a checksum of the remote file or None if the remote does not provide it."""
+        return self.hashes.get(hash_type)
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+# Names of hash types used by older versions of rclone
+HASH_TYPE_ALIASES = {"sha-1": "sha1", "sha-256": "sha256", "quickxorhash": "quickxor"}
+
+RCLONE_TIME_REGEX = re.compile(r"^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?"
+                               r"(Z|[+-]\d{2}:\d{2})$")
+
+
+def parse_rclone_time(time_str: str) -> datetime:
+    """Parse a time stamp in the RFC 3339 format used by rclone.
+
+    rclone reports up to nanoseconds and uses either ``Z`` or a numeric offset
+    depending on the backend, e.g., ``2022-04-10T08:03:16.123456789+02:00``.
+
+    Args:
+        time_str (str): The time stamp.
+
+    Returns:
+        Returns the time stamp as a datetime object in UTC.
+
+    Raises:
+        ValueError: If the time stamp can not be parsed.
+    """
+    match = RCLONE_TIME_REGEX.match(time_str)
+    if not match:
+        raise ValueError(f"time data '{time_str}' does not match the RFC 3339 format")
+
+    fraction = match.group(7) or "0"
+    microseconds = int(fraction[:6].ljust(6, "0"))
+    if match.group(8) == "Z":
+        tzinfo = timezone.utc
+    else:
+        sign = -1 if match.group(8)[0] == "-" else 1
+        tzinfo = timezone(sign * timedelta(hours=int(match.group(8)[1:3]),
+                                           minutes=int(match.group(8)[4:6])))
+    year, month, day, hour, minute, second = (int(match.group(idx)) for idx in range(1, 7))
+    local_time = datetime(year, month, day, hour, minute, second, microseconds, tzinfo=tzinfo)
+    return local_time.astimezone(timezone.utc)
+
+
+def check_output(args: List[str]) -> str:
+    """Run a command supervised by the WATCHDOG and return its stdout.
+
+    Args:
+        args: List of arguments to execute.
+
+    Returns:
+        Returns the stdout of the command.
+
+    Raises:
+        subprocess.CalledProcessError: If the command returned a non-zero exit code.
+        SynchronizerError:             If the command was killed by the WATCHDOG.
+    """
+    process = popen(args, stdout=subprocess.PIPE, encoding="utf-8")
+    with WATCHDOG.watch(process):
+        stdout, _ = process.communicate()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args, stdout)
+    return stdout
+
+
+def check_call(args: List[str]) -> None:
+    """Run a command supervised by the WATCHDOG.
+
+    Args:
+        args: List of arguments to execute.
+
+    Raises:
+        subprocess.CalledProcessError: If the command returned a non-zero exit code.
+        SynchronizerError:             If the command was killed by the WATCHDOG.
+    """
+    process = popen(args)
+    with WATCHDOG.watch(process):
+        process.wait()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args)
+
+
+def popen(args: List[str], **kwargs: Any) -> subprocess.Popen:
+    """Wrap subprocess.Popen to support console hiding on Windows.
+
+    Args:
+        args:   List of arguments to execute.
+        kwargs: Further keyword arguments passed to subprocess.Popen.
+
+    Returns:
+        Returns the Popen object of the started process.
+    """
+    # We need to use this construct as it is the only way mypy understands platform specific code!
+    # pylint: disable=consider-using-in
+    if sys.platform == "win32" or sys.platform == "cygwin":
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        startupinfo.wShowWindow = subprocess.SW_HIDE
+        kwargs["startupinfo"] = startupinfo
+    return subprocess.Popen(args, shell=False, **kwargs)  # pylint: disable=consider-using-with
+
+
+def split_remote_file(remote_file: str) -> Tuple[str, str]:
+    """Split an rclone path of a remote file into the remote directory and the file name.
+
+    Args:
+        remote_file (str): Identifier of the remote file, e.g., ``gdrive:dir/file``.
+
+    Returns:
+        Returns the tuple (remote directory, file name), e.g., ``("gdrive:dir", "file")``.
+    """
+    if "/" in remote_file:
+        remote_dir, filename = remote_file.rsplit("/", 1)
+        # Keep the slash of absolute paths like "remote:/file" or "/file"
+        if remote_dir.endswith(":") or not remote_dir:
+            remote_dir += "/"
+        return remote_dir, filename
+    remote_dir, filename = remote_file.rsplit(":", 1)
+    return f"{remote_dir}:", filename
+
+
+def get_exit_code_error(returncode: int) -> RcloneExitError:
+    """Get the error describing an exit code of rclone.
+
+    Args:
+        returncode (int): The exit code of rclone.
+
+    Returns:
+        Returns the error referring to the rclone documentation of the exit codes.
+    """
+    return RcloneExitError(
+        f"RClone returned exit code {returncode}! Please check "
+        "https://rclone.org/docs/#exit-code for a description of the exit codes.", returncode)
+
+
+def raise_remote_file_error(returncode: int, remote_file: str) -> NoReturn:
+    """Raise a SynchronizerError describing an rclone exit code when accessing the remote file.
+
+    Args:
+        returncode (int):  The exit code of rclone.
+        remote_file (str): Identifier of the remote file.
+
+    Raises:
+        RcloneExitError: Always.
+    """
+    if returncode == 1:
+        raise RcloneExitError(
+            f"Syntax error of remote file {remote_file}, please check your settings!",
+            returncode) from None
+    if returncode in [3, 4]:
+        raise RcloneExitError(
+            f"Remote file {remote_file} does not exist! Please check your settings!",
+            returncode) from None
+    raise get_exit_code_error(returncode) from None
+
+
+def normalize_hash_type(hash_type: str) -> str:
+    """Get the name of a hash type as used by current versions of rclone, e.g., ``sha1``."""
+    hash_type = str(hash_type).lower()
+    return HASH_TYPE_ALIASES.get(hash_type, hash_type)
+
+
+def get_remote_hash_types(rclone: str, remote_dir: str) -> List[str]:
+    """Determine the hash types supported by a remote using ``rclone backend features``.
+
+    Args:
+        rclone (str):     Path to the rclone binary.
+        remote_dir (str): The remote directory.
+
+    Returns:
+        Returns the names of the supported hash types.
+
+    Raises:
+        SynchronizerError: If an error occurs.
+    """
+    try:
+        features_json = check_output([rclone, "backend", "features", remote_dir])
+    except subprocess.CalledProcessError as call_error:
+        raise get_exit_code_error(call_error.returncode) from None
+    except FileNotFoundError:
+        raise SynchronizerError(
+            f"Specified rclone binary {rclone} does not exist! Please check your settings!") \
+            from None
+
+    try:
+        return [normalize_hash_type(hash_type)
+                for hash_type in json.loads(features_json).get("Hashes") or []]
+    except (ValueError, AttributeError) as parse_error:
+        raise SynchronizerError(
+            f"Error parsing features of remote {remote_dir}: {parse_error}") from None
+
+
+def parse_remote_stat(entry: Dict[str, Any]) -> RemoteStat:
+    """Convert an entry of the `rclone lsjson` output into a RemoteStat object.
+
+    Args:
+        entry (dict): The decoded JSON object describing the remote file.
+
+    Returns:
+        Returns the RemoteStat object.
+
+    Raises:
+        KeyError, TypeError, ValueError: If the entry is incomplete or malformed.
+    """
+    return RemoteStat(size=int(entry["Size"]),
+                      modtime=parse_rclone_time(entry["ModTime"]),
+                      hashes={normalize_hash_type(key): str(value).lower()
+                              for key, value in (entry.get("Hashes") or {}).items() if value})
+
+
+def get_remote_stat(rclone: str, remote_file: str, hash_type: str = "md5") -> RemoteStat:
+    """Determine hash, size and modification time of the remote file with a single rclone call.
+
+    Args:
+        rclone (str):      Path to the rclone binary.
+        remote_file (str): Identifier of the remote file.
+        hash_type (str):   The type of the hash to determine.
+
+    Returns:
+        Returns the metadata of the remote file.
+
+    Raises:
+        SynchronizerError: If an error occurs or the remote file does not exist.
+    """
+    try:
+        remote_json = check_output([rclone, "lsjson", "--hash", "--hash-type", hash_type,
+                                    "--files-only", remote_file])
+    except subprocess.CalledProcessError as call_error:
+        raise_remote_file_error(call_error.returncode, remote_file)
+    except FileNotFoundError:
+        raise SynchronizerError(
+            f"Specified rclone binary {rclone} does not exist! Please check your settings!") \
+            from None
+
+    try:
+        entries = json.loads(remote_json)
+    except ValueError as value_error:
+        raise SynchronizerError(
+            f"Error parsing metadata of remote file {remote_file}: {value_error}") from None
+    if not entries:
+        raise_remote_file_error(3, remote_file)
+
+    try:
+        remote_stat = parse_remote_stat(entries[0])
+    except Exception as general_exception:
+        raise SynchronizerError(
+            (f"Error extracting metadata of remote file {remote_file}: "
+             f"{general_exception}")) from None
+    return remote_stat
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,482 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer to access the remote file using the rclone remote control daemon.
+
+Instead of starting a new rclone process for every operation, a single
+``rclone rcd`` process is started and driven over its HTTP API, see
+https://rclone.org/rc/ for details.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import base64
+import http.client
+import json
+import os
+import queue
+import secrets
+import socket
+import subprocess
+import threading
+import time
+import urllib.parse
+from contextlib import suppress
+from typing import Any, Dict, List, Optional
+
+from .rclone import (RemoteStat, SynchronizerError, WATCHDOG, normalize_hash_type,
+                     parse_remote_stat, popen, raise_remote_file_error, split_remote_file)
+from .settings import get_remote_name
+from .transfer import TransferParams
+from .transport import SubprocessTransport, Transport
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+# Interval of polling the status of a job, doubled up to the maximum
+MIN_JOB_POLL_SECS = 0.02
+MAX_JOB_POLL_SECS = 1.0
+# Time to use the fallback after the daemon could not be started
+DAEMON_RETRY_SECS = 300.0
+
+
+# -----------------------------------------------------------------------------
+# Exception Class
+# -----------------------------------------------------------------------------
+class RcError(SynchronizerError):
+    """Represents an error reported by the rclone remote control API."""
+
+    def __init__(self, method: str, status: int, message: str):
+        """Construct a new instance.
+
+        Args:
+            method (str):  The called method.
+            status (int):  The HTTP status code.
+            message (str): The error message of rclone.
+        """
+        super().__init__(method, status, message)
+        self.method = method
+        self.status = status
+        self.message = message
+
+    def __str__(self) -> str:
+        """Get the description of the error."""
+        return f"RClone remote control call {self.method} failed: {self.message}"
+
+
+# -----------------------------------------------------------------------------
+# Remote Control Client
+# -----------------------------------------------------------------------------
+class RcClient:
+    """Client of the rclone remote control API reusing its HTTP connections."""
+
+    def __init__(self, url: str, user: Optional[str] = None, password: Optional[str] = None,
+                 timeout: Optional[float] = None):
+        """Construct a new instance.
+
+        Args:
+            url (str):       The base URL of the remote control API,
+                             e.g., ``http://127.0.0.1:5572``.
+            user (str):      The user name for the basic authentication or None.
+            password (str):  The password for the basic authentication or None.
+            timeout (float): The socket timeout in seconds or None to wait forever.
+        """
+        parsed_url = urllib.parse.urlsplit(url)
+        self.host = parsed_url.hostname or "127.0.0.1"
+        self.port = parsed_url.port or 5572
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json"}
+        if user is not None:
+            credentials = base64.b64encode(f"{user}:{password or ''}".encode()).decode()
+            self.headers["Authorization"] = f"Basic {credentials}"
+        self._pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+
+    def call(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Call a method of the remote control API.
+
+        The socket timeout is limited by the timeout of the watchdog, i.e.,
+        the step timeout and the deadline of the calling thread. A cancellation
+        does not interrupt a running call, so long running operations should
+        use call_job() instead.
+
+        Args:
+            method (str):  The method, e.g., ``operations/stat``.
+            params (dict): The parameters of the method.
+
+        Returns:
+            Returns the decoded JSON response.
+
+        Raises:
+            SynchronizerError: If the daemon can't be reached, the call failed,
+                               timed out or the synchronization was cancelled.
+        """
+        WATCHDOG.check()
+        timeout = WATCHDOG.get_timeout()
+        if self.timeout is not None:
+            timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        return self._call(method, params, timeout)
+
+    def call_job(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Call a method of the remote control API as a job and wait for its completion.
+
+        The job is started with the parameter ``_async`` and its status is
+        polled. If the synchronization is cancelled or the timeout of the
+        watchdog is exceeded, the job is stopped using ``job/stop``.
+
+        Args:
+            method (str):  The method, e.g., ``operations/copyfile``.
+            params (dict): The parameters of the method.
+
+        Returns:
+            Returns the output of the job.
+
+        Raises:
+            SynchronizerError: If the daemon can't be reached, the job failed,
+                               timed out or the synchronization was cancelled.
+        """
+        timeout = WATCHDOG.get_timeout()
+        job_id = self.call(method, dict(params or {}, _async=True))["jobid"]
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        poll_secs = MIN_JOB_POLL_SECS
+        try:
+            while True:
+                status = self.call("job/status", {"jobid": job_id})
+                if status.get("finished"):
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise SynchronizerError(f"RClone did not finish within {timeout:.1f} seconds!")
+                WATCHDOG.sleep(poll_secs if deadline is None
+                               else min(poll_secs, max(0.0, deadline - time.monotonic())))
+                poll_secs = min(2.0 * poll_secs, MAX_JOB_POLL_SECS)
+        except SynchronizerError:
+            with suppress(SynchronizerError):
+                self._call("job/stop", {"jobid": job_id}, self.timeout)
+            raise
+        if not status.get("success"):
+            raise RcError(method, 500, str(status.get("error") or "unknown error"))
+        return status.get("output") or {}
+
+    def _call(self, method: str, params: Optional[Dict[str, Any]],
+              timeout: Optional[float]) -> Dict[str, Any]:
+        """Call a method with the given socket timeout, see call()."""
+        body = json.dumps(params or {}).encode()
+        try:
+            connection = self._pool.get_nowait()
+            reused = True
+        except queue.Empty:
+            connection = self._new_connection()
+            reused = False
+
+        try:
+            status, data = self._request(connection, method, body, timeout)
+        except socket.timeout:
+            connection.close()
+            raise SynchronizerError(f"RClone did not finish within {timeout:.1f} seconds!") \
+                from None
+        except (OSError, http.client.HTTPException) as first_error:
+            connection.close()
+            if not reused:
+                raise SynchronizerError(
+                    f"Can't reach the rclone remote control daemon: {first_error}") from None
+            # The daemon might have closed an idle connection, so try again with a new one
+            connection = self._new_connection()
+            try:
+                status, data = self._request(connection, method, body, timeout)
+            except (OSError, http.client.HTTPException) as second_error:
+                connection.close()
+                raise SynchronizerError(
+                    f"Can't reach the rclone remote control daemon: {second_error}") from None
+        self._pool.put(connection)
+
+        try:
+            result = json.loads(data) if data else {}
+        except ValueError:
+            result = {"error": data.decode(errors="replace")}
+        if status != 200:
+            raise RcError(method, status, str(result.get("error", "unknown error")))
+        return result
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        """Create a new connection to the daemon."""
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _request(self, connection: http.client.HTTPConnection, method: str, body: bytes,
+                 timeout: Optional[float]):
+        """Perform a single request and return the tuple (status, response body)."""
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        connection.request("POST", f"/{method}", body=body, headers=self.headers)
+        response = connection.getresponse()
+        return response.status, response.read()
+
+
+# -----------------------------------------------------------------------------
+# Daemon
+# -----------------------------------------------------------------------------
+def get_free_port() -> int:
+    """Get a free TCP port on the loopback interface."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class RcloneDaemon:
+    """Manage an ``rclone rcd`` process listening on the loopback interface."""
+
+    def __init__(self, rclone: str, startup_timeout: float = 10.0):
+        """Construct a new instance.
+
+        Args:
+            rclone (str):            Path to the rclone binary.
+            startup_timeout (float): Maximum time in seconds to wait for the daemon to respond.
+        """
+        self.rclone = rclone
+        self.startup_timeout = startup_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.client: Optional[RcClient] = None
+
+    def is_running(self) -> bool:
+        """Check if the daemon process is running."""
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> RcClient:
+        """Start the daemon and wait until it responds.
+
+        The credentials are passed in the environment so that they do not show
+        up in the process list.
+
+        Returns:
+            Returns the client connected to the daemon.
+
+        Raises:
+            SynchronizerError: If the daemon can't be started.
+        """
+        self.stop()
+        port = get_free_port()
+        user = "syncer"
+        password = secrets.token_urlsafe(16)
+        env = dict(os.environ, RCLONE_RC_USER=user, RCLONE_RC_PASS=password)
+        try:
+            self.process = popen([self.rclone, "rcd", "--rc-addr", f"127.0.0.1:{port}"],
+                                 env=env, stdin=subprocess.DEVNULL,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError as os_error:
+            raise SynchronizerError(
+                f"Can't start rclone remote control daemon {self.rclone}: {os_error}") from None
+
+        client = RcClient(f"http://127.0.0.1:{port}", user, password, timeout=None)
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            try:
+                client.call("core/noop")
+                break
+            except RcError:
+                break
+            except SynchronizerError:
+                if not self.is_running() or time.monotonic() > deadline:
+                    self.stop()
+                    raise SynchronizerError("The rclone remote control daemon did not start!") \
+                        from None
+                time.sleep(0.05)
+        self.client = client
+        return client
+
+    def stop(self) -> None:
+        """Stop the daemon."""
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout=5.0)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+            self.process = None
+
+
+# -----------------------------------------------------------------------------
+# Remote Control Transport
+# -----------------------------------------------------------------------------
+class RcTransport(Transport):
+    """Transport using a persistent rclone remote control daemon.
+
+    If the daemon can't be started, the operations fall back to the
+    :class:`syncer_mods.transport.SubprocessTransport`. The start is tried
+    again after DAEMON_RETRY_SECS only.
+    """
+
+    def __init__(self, rclone: str, client: Optional[RcClient] = None):
+        """Construct a new instance.
+
+        Args:
+            rclone (str): Path to the rclone binary.
+            client (obj): The client to use. If set to None, a daemon is started
+                          on first use.
+        """
+        self.rclone = rclone
+        self.daemon = RcloneDaemon(rclone)
+        self.fallback = SubprocessTransport(rclone)
+        self.transfer_params: Dict[str, TransferParams] = {}
+        self._client = client
+        self._retry_time = 0.0
+        self._lock = threading.Lock()
+
+    def set_transfer_params(self, remote_name: str, params: TransferParams) -> None:
+        """Set the parameters passed as ``_config`` when transferring files of a remote."""
+        self.transfer_params[remote_name] = params
+        self.fallback.set_transfer_params(remote_name, params)
+
+    def get_hash_types(self, remote_dir: str) -> List[str]:
+        """Determine the hash types supported by the remote using ``operations/fsinfo``."""
+        client = self._get_client()
+        if client is None:
+            return self.fallback.get_hash_types(remote_dir)
+
+        result = client.call("operations/fsinfo", {"fs": remote_dir})
+        return [normalize_hash_type(hash_type) for hash_type in result.get("Hashes") or []]
+
+    def stat(self, remote_file: str, hash_type: str = "md5") -> RemoteStat:
+        """Determine hash, size and modification time of the remote file."""
+        client = self._get_client()
+        if client is None:
+            return self.fallback.stat(remote_file, hash_type)
+
+        remote_dir, filename = split_remote_file(remote_file)
+        try:
+            result = client.call("operations/stat",
+                                 {"fs": remote_dir, "remote": filename,
+                                  "opt": {"showHash": True, "hashTypes": [hash_type],
+                                          "filesOnly": True}})
+        except RcError as rc_error:
+            if rc_error.status == 404:
+                raise_remote_file_error(3, remote_file)
+            raise
+        if not result.get("item"):
+            raise_remote_file_error(3, remote_file)
+
+        try:
+            remote_stat = parse_remote_stat(result["item"])
+        except Exception as general_exception:
+            raise SynchronizerError(
+                (f"Error extracting metadata of remote file {remote_file}: "
+                 f"{general_exception}")) from None
+        if remote_stat.get_hash(hash_type) is None:
+            digest = self.hashsum(remote_file, hash_type)
+            if digest is not None:
+                remote_stat.hashes[hash_type] = digest
+        return remote_stat
+
+    def hashsum(self, remote_file: str, hash_type: str = "md5") -> Optional[str]:
+        """Determine the hash of the remote file using ``operations/hashsum``.
+
+        Args:
+            remote_file (str): Identifier of the remote file.
+            hash_type (str):   The type of the hash.
+
+        Returns:
+            Returns the hex digest or None if the remote does not support the hash type.
+        """
+        client = self._get_client()
+        if client is None:
+            return None
+
+        remote_dir, filename = split_remote_file(remote_file)
+        try:
+            result = client.call_job("operations/hashsum",
+                                     {"fs": remote_dir, "hashType": hash_type,
+                                      "_filter": {"IncludeRule": [filename]}})
+        except RcError:
+            return None
+        for line in result.get("hashsum") or []:
+            digest, _, name = line.partition("  ")
+            if name == filename and digest:
+                return digest.lower()
+        return None
+
+    def upload(self, local_file: str, remote_file: str) -> None:
+        """Copy the local file to the remote file."""
+        client = self._get_client()
+        if client is None:
+            self.fallback.upload(local_file, remote_file)
+            return
+
+        remote_dir, remote_name = split_remote_file(remote_file)
+        local_dir, local_name = os.path.split(os.path.abspath(local_file))
+        client.call_job("operations/copyfile", self._with_transfer_config(
+            remote_file, {"srcFs": local_dir, "srcRemote": local_name,
+                          "dstFs": remote_dir, "dstRemote": remote_name}))
+
+    def download(self, remote_file: str, local_file: str) -> None:
+        """Copy the remote file to the local file."""
+        client = self._get_client()
+        if client is None:
+            self.fallback.download(remote_file, local_file)
+            return
+
+        remote_dir, remote_name = split_remote_file(remote_file)
+        local_dir, local_name = os.path.split(os.path.abspath(local_file))
+        client.call_job("operations/copyfile", self._with_transfer_config(
+            remote_file, {"srcFs": remote_dir, "srcRemote": remote_name,
+                          "dstFs": local_dir, "dstRemote": local_name}))
+
+    def _with_transfer_config(self, remote_file: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the transfer parameters of the remote of a file to the parameters of a call."""
+        config = self.transfer_params.get(get_remote_name(remote_file),
+                                          TransferParams()).get_rc_config()
+        return dict(params, _config=config) if config else params
+
+    def close(self) -> None:
+        """Close the connections and stop the daemon."""
+        if self._client is not None:
+            self._client.close()
+        self.daemon.stop()
+
+    def _get_client(self) -> Optional[RcClient]:
+        """Get the client and (re)start the daemon if necessary.
+
+        Returns:
+            Returns the client or None if the daemon can't be started or its
+            last start failed less than DAEMON_RETRY_SECS ago.
+        """
+        with self._lock:
+            if self._client is not None and (self.daemon.process is None
+                                             or self.daemon.is_running()):
+                return self._client
+            if time.monotonic() < self._retry_time:
+                return None
+
+            try:
+                self._client = self.daemon.start()
+            except SynchronizerError as synchronizer_error:
+                print(f"WARNING: {synchronizer_error} Falling back to calling rclone directly.")
+                self._client = None
+                self._retry_time = time.monotonic() + DAEMON_RETRY_SECS
+            return self._client
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
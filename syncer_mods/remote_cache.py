@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer providing a cache of the metadata of remote files.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .rclone import RemoteStat
+
+
+# -----------------------------------------------------------------------------
+# Class
+# -----------------------------------------------------------------------------
+class RemoteStatCache:
+    """In-memory cache of the metadata of remote files with a time to live.
+
+    An entry is valid for ``ttl_secs`` after it was stored and only for the
+    hash type it was queried with. Modifications of the remote file by other
+    clients are not detected until the entry expires. The cache can be used
+    by multiple threads concurrently.
+    """
+
+    def __init__(self, ttl_secs: float = 0.0):
+        """Construct a new instance.
+
+        Args:
+            ttl_secs (float): The time to live of the entries in seconds.
+                              0 disables the cache.
+        """
+        self.ttl_secs = ttl_secs
+        self._entries: Dict[str, Tuple[float, str, RemoteStat]] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, remote_file: str, hash_type: str = "md5") -> Optional[RemoteStat]:
+        """Get the cached metadata of a remote file.
+
+        Args:
+            remote_file (str): The remote file.
+            hash_type (str):   The type of the hash the metadata must contain.
+
+        Returns:
+            Returns the metadata or None if there is no valid entry.
+        """
+        with self._lock:
+            entry = self._entries.get(remote_file)
+            if entry is None:
+                return None
+            expires, entry_hash_type, remote_stat = entry
+            if time.monotonic() >= expires:
+                del self._entries[remote_file]
+                return None
+        return remote_stat if entry_hash_type == hash_type else None
+
+    def store(self, remote_file: str, remote_stat: RemoteStat, hash_type: str = "md5") -> None:
+        """Store the metadata of a remote file.
+
+        Args:
+            remote_file (str): The remote file.
+            remote_stat (obj): The metadata of the remote file.
+            hash_type (str):   The type of the hash contained in the metadata.
+        """
+        if self.ttl_secs <= 0:
+            return
+        with self._lock:
+            self._entries[remote_file] = (time.monotonic() + self.ttl_secs, hash_type,
+                                          remote_stat)
+
+    def invalidate(self, remote_file: str) -> None:
+        """Remove the entry of a remote file, e.g., before it is modified."""
+        with self._lock:
+            self._entries.pop(remote_file, None)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
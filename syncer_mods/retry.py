@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer providing the retry policy and the circuit breaker for rclone calls.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import random
+import threading
+import time
+from typing import Dict
+
+from .rclone import SynchronizerError
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+# Exit code of rclone for temporary errors that more retries might fix
+RETRYABLE_EXIT_CODES = [5]
+# Exit codes of rclone indicating a failing remote: temporary errors, fatal
+# errors like a suspended account and an exceeded transfer limit
+FAILURE_EXIT_CODES = [5, 7, 8]
+MAX_RETRY_DELAY_SECS = 30.0
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def get_backoff_delay(retry: int, base_secs: float,
+                      max_secs: float = MAX_RETRY_DELAY_SECS) -> float:
+    """Get the delay before a retry using exponential backoff with full jitter.
+
+    The random delay avoids that several clients failing at the same time
+    retry in lockstep.
+
+    Args:
+        retry (int):       The number of the retry, starting at 0.
+        base_secs (float): The maximum delay of the first retry.
+        max_secs (float):  The upper limit of the delay.
+
+    Returns:
+        Returns a random delay between 0 and min(max_secs, base_secs * 2^retry).
+    """
+    return random.uniform(0.0, min(max_secs, base_secs * 2 ** retry))
+
+
+# -----------------------------------------------------------------------------
+# Class
+# -----------------------------------------------------------------------------
+class CircuitBreaker:
+    """Stop calling a remote after consecutive failures for some time.
+
+    After ``threshold`` consecutive failures of a remote, the circuit opens and
+    all calls to the remote are refused for ``reset_secs``. Afterwards, calls
+    are allowed again, but a single failure opens the circuit again. A
+    successful call closes it. The breaker can be used by multiple threads.
+    """
+
+    def __init__(self, threshold: int = 5, reset_secs: float = 300.0):
+        """Construct a new instance.
+
+        Args:
+            threshold (int):    The number of consecutive failures opening the
+                                circuit. 0 disables the circuit breaker.
+            reset_secs (float): The time in seconds the circuit stays open.
+        """
+        self.threshold = threshold
+        self.reset_secs = reset_secs
+        self._failures: Dict[str, int] = {}
+        self._open_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def check(self, remote_name: str) -> None:
+        """Check if calls to the remote are allowed.
+
+        Args:
+            remote_name (str): The name of the rclone remote.
+
+        Raises:
+            SynchronizerError: If the circuit of the remote is open.
+        """
+        with self._lock:
+            remaining = self._open_until.get(remote_name, 0.0) - time.monotonic()
+            failures = self._failures.get(remote_name, 0)
+        if remaining > 0.0:
+            raise SynchronizerError(
+                f"Remote {remote_name} failed {failures} times in a row, "
+                f"skipping it for {remaining:.0f} seconds!")
+
+    def record_success(self, remote_name: str) -> None:
+        """Close the circuit of the remote after a successful call."""
+        with self._lock:
+            self._failures.pop(remote_name, None)
+            self._open_until.pop(remote_name, None)
+
+    def record_failure(self, remote_name: str) -> None:
+        """Count a failed call and open the circuit if the threshold is reached."""
+        with self._lock:
+            failures = self._failures.get(remote_name, 0) + 1
+            self._failures[remote_name] = failures
+            if 0 < self.threshold <= failures:
+                self._open_until[remote_name] = time.monotonic() + self.reset_secs
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
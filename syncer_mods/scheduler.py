@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer to synchronize periodically with an adaptive interval.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from .sync_interval import format_interval, get_next_interval
+from .sync_result import SyncResult
+
+
+# -----------------------------------------------------------------------------
+# Scheduler Class
+# -----------------------------------------------------------------------------
+class SyncScheduler(QObject):
+    """Emit the signal ``due`` periodically with an interval adapted to the results."""
+
+    due = pyqtSignal()
+
+    def __init__(self, min_secs: float = 60.0, max_secs: float = 3600.0):
+        """Construct a new instance.
+
+        Args:
+            min_secs (float): The minimum interval in seconds.
+            max_secs (float): The maximum interval in seconds.
+        """
+        super().__init__()
+        self.min_secs = min_secs
+        self.max_secs = max_secs
+        self.interval_secs = min_secs
+        self.next_run: Optional[datetime] = None
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.due)
+
+    def start(self) -> None:
+        """Start the scheduling with the minimum interval."""
+        self.interval_secs = self.min_secs
+        self._schedule()
+
+    def stop(self) -> None:
+        """Stop the scheduling."""
+        self.timer.stop()
+        self.next_run = None
+
+    def is_active(self) -> bool:
+        """Check if the scheduling is active."""
+        return self.next_run is not None
+
+    def update(self, results: List[SyncResult]) -> None:
+        """Adapt the interval to the results of a synchronization and restart the timer.
+
+        Args:
+            results (list): The results of the synchronization.
+        """
+        if not self.is_active():
+            return
+        self.interval_secs = get_next_interval(self.interval_secs, results,
+                                               self.min_secs, self.max_secs)
+        self._schedule()
+
+    def get_description(self) -> str:
+        """Get a description of the schedule for the tooltip."""
+        if self.next_run is None:
+            return ""
+        return (f"Next synchronization at {self.next_run.strftime('%H:%M')} "
+                f"(interval {format_interval(self.interval_secs)})")
+
+    def _schedule(self) -> None:
+        """Start the timer with the current interval."""
+        self.next_run = datetime.now() + timedelta(seconds=self.interval_secs)
+        self.timer.start(int(self.interval_secs * 1000))
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
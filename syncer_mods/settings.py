@@ -18,55 +18,223 @@ Copyright:
 # -----------------------------------------------------------------------------
 import os
 import shutil
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
 
-from PyQt5.QtCore import QSettings
+from .app_dirs import load_json, save_json
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def join_remote_file(remote_dir: str, local_file: str) -> str:
+    """Get the remote file by combining the remote directory with the local filename.
+
+    Args:
+        remote_dir (str): The remote directory as an rclone path.
+        local_file (str): The local file.
+
+    Returns:
+        Returns the identifier of the remote file.
+    """
+    filename = os.path.basename(local_file)
+    if remote_dir.endswith(':') or remote_dir.endswith('/'):
+        return f"{remote_dir}{filename}"
+    return f"{remote_dir}/{filename}"
+
+
+def get_remote_name(remote_dir: str) -> str:
+    """Get the name of the rclone remote of a remote directory.
+
+    Args:
+        remote_dir (str): The remote directory as an rclone path, e.g., ``gdrive:someDir``.
+
+    Returns:
+        Returns the name of the remote, e.g., ``gdrive``, or an empty string
+        for local paths.
+    """
+    remote_name, separator, _ = remote_dir.partition(':')
+    # Windows drive letters like C:\ are local paths
+    if not separator or (len(remote_name) == 1 and sys.platform == 'win32'):
+        return ""
+    return remote_name
+
+
+def get_default_settings() -> Dict[str, Any]:
+    """Get the default values of all settings."""
+    return {"rclone": shutil.which("rclone"),
+            "local_file": "localFile",
+            "remote_dir": "gdrive:someDir",
+            "autostart": False,
+            "sync_on_start": False,
+            "transport": "subprocess",
+            "storage_mode": "file",
+            "chunk_size": 1024 * 1024,
+            "upload_mode": "copy",
+            "download_mode": "copy",
+            "transfer_profile": "default",
+            "transfer_autotune": False,
+            "multi_thread_streams": 4,
+            "buffer_size_mib": 16,
+            "upload_chunk_size_mib": 8,
+            "checkers": 8,
+            "watch_local_file": False,
+            "watch_debounce_secs": 5,
+            "watch_quiet_secs": 30,
+            "periodic_sync": False,
+            "periodic_sync_min_minutes": 1,
+            "periodic_sync_max_minutes": 60,
+            "backup_count": 3,
+            "hash_cache_size": 256,
+            "hash_block_size": 1024 * 1024,
+            "hash_strategy": "auto",
+            "local_fingerprint": False,
+            "fingerprint_segment_size": 64 * 1024 * 1024,
+            "precheck_samples": 4,
+            "max_workers": 4,
+            "max_workers_per_remote": 2,
+            "metrics_file": "",
+            "metrics_format": "jsonl",
+            "journal_max_entries": 10000,
+            "step_timeout_secs": 3600,
+            "sync_timeout_secs": 7200,
+            "retry_count": 3,
+            "retry_delay_secs": 1.0,
+            "circuit_breaker_threshold": 5,
+            "circuit_breaker_reset_secs": 300,
+            "remote_cache_ttl_secs": 60,
+            "profiles": []}
+
+
+# -----------------------------------------------------------------------------
+# Data Classes
+# -----------------------------------------------------------------------------
+@dataclass
+class SyncProfile:
+    """A single local file synchronized with a remote directory."""
+
+    local_file: str
+    remote_dir: str
+
+    @property
+    def remote_file(self) -> str:
+        """Get the remote file by combining remote_dir with local filename."""
+        return join_remote_file(self.remote_dir, self.local_file)
+
+    @property
+    def remote_name(self) -> str:
+        """Get the name of the rclone remote."""
+        return get_remote_name(self.remote_dir)
 
 
 # -----------------------------------------------------------------------------
 # Class
 # -----------------------------------------------------------------------------
 class Settings:
-    """Settings support class."""
-
-    def __init__(self):
-        """Construct a new instance."""
+    """Settings support class.
+
+    The primary file to synchronize is given by the values ``local_file`` and
+    ``remote_dir``. Additional files are stored in the value ``profiles`` as a
+    list of dictionaries with the same keys.
+
+    By default, the settings are stored using QSettings. If a filename is
+    given, they are stored in this JSON file instead, which does not require
+    Qt at all.
+    """
+
+    def __init__(self, filename: Optional[str] = None):
+        """Construct a new instance.
+
+        Args:
+            filename (str): The JSON file to store the settings in or None
+                            to use QSettings.
+        """
+        self.filename = filename
+        self.settings: Dict[str, Any] = {}
         self._load_settings()
 
-    def get_value(self, key: str) -> str:
+    def get_value(self, key: str) -> Any:
         """Get a value."""
         return self.settings[key]
 
     def get_remote_file(self) -> str:
         """Get the remote file by combining remote_dir with local filename."""
-        filename = os.path.basename(self.get_value("local_file"))
-        remote_dir = self.get_value("remote_dir")
-        if remote_dir.endswith(':') or remote_dir.endswith('/'):
-            remote_file = f"{remote_dir}{filename}"
-        else:
-            remote_file = f"{remote_dir}/{filename}"
-        return remote_file
+        return join_remote_file(self.get_value("remote_dir"), self.get_value("local_file"))
 
-    def set_value(self, key: str, value: str) -> None:
+    def get_profiles(self) -> List[SyncProfile]:
+        """Get the primary file followed by all additional files to synchronize."""
+        profiles = [SyncProfile(self.get_value("local_file"), self.get_value("remote_dir"))]
+        for profile in self.get_value("profiles"):
+            profiles.append(SyncProfile(profile["local_file"], profile["remote_dir"]))
+        return profiles
+
+    def set_value(self, key: str, value: Any) -> None:
         """Set a value."""
         self.settings[key] = value
         self._save_settings()
 
     def _load_settings(self) -> None:
         """Load the settings into the internal map."""
+        if self.filename is not None:
+            self._load_json_settings()
+        else:
+            self._load_qsettings()
+
+    def _save_settings(self) -> None:
+        """Save the settings from the internal map."""
+        if self.filename is not None:
+            self._save_json_settings()
+        else:
+            self._save_qsettings()
+
+    def _load_json_settings(self) -> None:
+        """Load the settings from the JSON file."""
+        self.settings = get_default_settings()
+        if self.filename is not None and os.path.exists(self.filename):
+            self.settings.update(load_json(self.filename))
+
+    def _save_json_settings(self) -> None:
+        """Save the settings to the JSON file."""
+        assert self.filename is not None
+        save_json(self.filename, self.settings, indent=2)
+
+    def _load_qsettings(self) -> None:
+        """Load the settings from QSettings."""
+        from PyQt5.QtCore import QSettings  # pylint: disable=import-outside-toplevel
+
         self.settings = {}
         settings = QSettings("com.clemensrabe", "syncer")
-        self.settings["rclone"] = settings.value("rclone", shutil.which("rclone"), type=str)
-        self.settings["local_file"] = settings.value("local_file", "localFile", type=str)
-        self.settings["remote_dir"] = settings.value("remote_dir", "gdrive:someDir", type=str)
-        self.settings["autostart"] = settings.value("autostart", False, type=bool)
-        self.settings["sync_on_start"] = settings.value("sync_on_start", False, type=bool)
+        for key, default in get_default_settings().items():
+            if key != "profiles":
+                value_type = type(default) if default is not None else str
+                self.settings[key] = settings.value(key, default, type=value_type)
+
+        profiles: List[Dict[str, str]] = []
+        for idx in range(settings.beginReadArray("profiles")):
+            settings.setArrayIndex(idx)
+            profiles.append({"local_file": settings.value("local_file", "", type=str),
+                             "remote_dir": settings.value("remote_dir", "", type=str)})
+        settings.endArray()
+        self.settings["profiles"] = profiles
         del settings
 
-    def _save_settings(self) -> None:
-        """Save the settings from the internal map."""
+    def _save_qsettings(self) -> None:
+        """Save the settings to QSettings."""
+        from PyQt5.QtCore import QSettings  # pylint: disable=import-outside-toplevel
+
         settings = QSettings("com.clemensrabe", "syncer")
         for key, value in self.settings.items():
-            settings.setValue(key, value)
+            if key == "profiles":
+                settings.remove("profiles")
+                settings.beginWriteArray("profiles", len(value))
+                for idx, profile in enumerate(value):
+                    settings.setArrayIndex(idx)
+                    settings.setValue("local_file", profile["local_file"])
+                    settings.setValue("remote_dir", profile["remote_dir"])
+                settings.endArray()
+            else:
+                settings.setValue(key, value)
         del settings
 
 
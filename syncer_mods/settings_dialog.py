@@ -17,12 +17,14 @@ Copyright:
 # Module Import
 # -----------------------------------------------------------------------------
 import os
+from typing import Dict, List
 
 from PyQt5.QtCore import pyqtSlot
-from PyQt5.QtWidgets import QDialog, QFileDialog
+from PyQt5.QtWidgets import QDialog, QFileDialog, QTableWidgetItem
 
 from .settings import Settings
 from .settings_dialog_ui import Ui_SettingsDialog
+from .transfer import PROFILE_NAMES
 
 
 # -----------------------------------------------------------------------------
@@ -48,6 +50,27 @@ class SettingsDialog(QDialog):
         self.gui.rclonePath.setText(self.settings.get_value("rclone"))
         self.gui.remoteDir.setText(self.settings.get_value("remote_dir"))
         self.gui.localFilename.setText(self.settings.get_value("local_file"))
+        self.gui.rcDaemonCheckBox.setChecked(self.settings.get_value("transport") == "rcd")
+        self.gui.chunkedStorageCheckBox.setChecked(
+            self.settings.get_value("storage_mode") == "chunked")
+        self.gui.watchCheckBox.setChecked(self.settings.get_value("watch_local_file"))
+        self.gui.watchDebounceSpinBox.setValue(self.settings.get_value("watch_debounce_secs"))
+        self.gui.watchQuietSpinBox.setValue(self.settings.get_value("watch_quiet_secs"))
+        self.gui.periodicCheckBox.setChecked(self.settings.get_value("periodic_sync"))
+        self.gui.periodicMinSpinBox.setValue(self.settings.get_value("periodic_sync_min_minutes"))
+        self.gui.periodicMaxSpinBox.setValue(self.settings.get_value("periodic_sync_max_minutes"))
+        transfer_profile = self.settings.get_value("transfer_profile")
+        self.gui.transferProfileComboBox.setCurrentIndex(
+            PROFILE_NAMES.index(transfer_profile) if transfer_profile in PROFILE_NAMES else 0)
+        self.gui.autotuneCheckBox.setChecked(self.settings.get_value("transfer_autotune"))
+        self.gui.multiThreadStreamsSpinBox.setValue(self.settings.get_value("multi_thread_streams"))
+        self.gui.bufferSizeSpinBox.setValue(self.settings.get_value("buffer_size_mib"))
+        self.gui.uploadChunkSizeSpinBox.setValue(self.settings.get_value("upload_chunk_size_mib"))
+        self.gui.checkersSpinBox.setValue(self.settings.get_value("checkers"))
+        self.on_transferProfileComboBox_currentIndexChanged(
+            self.gui.transferProfileComboBox.currentIndex())
+        for profile in self.settings.get_value("profiles"):
+            self._add_profile_row(profile["remote_dir"], profile["local_file"])
         self.gui.autostartCheckBox.setChecked(self.settings.get_value("autostart"))
         self.gui.snychronizeOnStartCheckBox.setChecked(self.settings.get_value("sync_on_start"))
 
@@ -76,12 +99,73 @@ class SettingsDialog(QDialog):
         if filename:
             self.gui.localFilename.setText(filename)
 
+    @pyqtSlot(int)
+    def on_transferProfileComboBox_currentIndexChanged(self, index: int) -> None:   # noqa
+        """Enable the transfer parameters only for the custom transfer profile."""
+        custom = PROFILE_NAMES[index] == "custom"
+        for widget in [self.gui.multiThreadStreamsSpinBox, self.gui.bufferSizeSpinBox,
+                       self.gui.uploadChunkSizeSpinBox, self.gui.checkersSpinBox]:
+            widget.setEnabled(custom)
+
+    @pyqtSlot()
+    def on_addProfile_clicked(self) -> None:   # noqa
+        """Handle a click on the Add button of the additional files."""
+        self._add_profile_row(self.gui.remoteDir.text(), "")
+        self.gui.profilesTable.editItem(
+            self.gui.profilesTable.item(self.gui.profilesTable.rowCount() - 1, 1))
+
+    @pyqtSlot()
+    def on_removeProfile_clicked(self) -> None:   # noqa
+        """Handle a click on the Remove button of the additional files."""
+        rows = {index.row() for index in self.gui.profilesTable.selectedIndexes()}
+        for row in sorted(rows, reverse=True):
+            self.gui.profilesTable.removeRow(row)
+
+    def _add_profile_row(self, remote_dir: str, local_file: str) -> None:
+        """Add a row to the table of additional files."""
+        row = self.gui.profilesTable.rowCount()
+        self.gui.profilesTable.insertRow(row)
+        self.gui.profilesTable.setItem(row, 0, QTableWidgetItem(remote_dir))
+        self.gui.profilesTable.setItem(row, 1, QTableWidgetItem(local_file))
+
+    def _get_profiles(self) -> List[Dict[str, str]]:
+        """Get the additional files of the table, ignoring incomplete rows."""
+        profiles = []
+        for row in range(self.gui.profilesTable.rowCount()):
+            remote_dir = self.gui.profilesTable.item(row, 0)
+            local_file = self.gui.profilesTable.item(row, 1)
+            if remote_dir and local_file and remote_dir.text() and local_file.text():
+                profiles.append({"local_file": local_file.text(), "remote_dir": remote_dir.text()})
+        return profiles
+
     @pyqtSlot()
     def on_accepted(self) -> None:
         """Handle the acceptance of the settings by a click on the OK button."""
         self.settings.set_value("rclone", self.gui.rclonePath.text())
         self.settings.set_value("remote_dir", self.gui.remoteDir.text())
         self.settings.set_value("local_file", self.gui.localFilename.text())
+        self.settings.set_value("transport",
+                                "rcd" if self.gui.rcDaemonCheckBox.isChecked() else "subprocess")
+        self.settings.set_value("storage_mode",
+                                "chunked" if self.gui.chunkedStorageCheckBox.isChecked()
+                                else "file")
+        self.settings.set_value("watch_local_file", self.gui.watchCheckBox.isChecked())
+        self.settings.set_value("watch_debounce_secs", self.gui.watchDebounceSpinBox.value())
+        self.settings.set_value("watch_quiet_secs", self.gui.watchQuietSpinBox.value())
+        self.settings.set_value("periodic_sync", self.gui.periodicCheckBox.isChecked())
+        self.settings.set_value("periodic_sync_min_minutes", self.gui.periodicMinSpinBox.value())
+        self.settings.set_value("periodic_sync_max_minutes",
+                                max(self.gui.periodicMinSpinBox.value(),
+                                    self.gui.periodicMaxSpinBox.value()))
+        self.settings.set_value("transfer_profile",
+                                PROFILE_NAMES[self.gui.transferProfileComboBox.currentIndex()])
+        self.settings.set_value("transfer_autotune", self.gui.autotuneCheckBox.isChecked())
+        self.settings.set_value("multi_thread_streams",
+                                self.gui.multiThreadStreamsSpinBox.value())
+        self.settings.set_value("buffer_size_mib", self.gui.bufferSizeSpinBox.value())
+        self.settings.set_value("upload_chunk_size_mib", self.gui.uploadChunkSizeSpinBox.value())
+        self.settings.set_value("checkers", self.gui.checkersSpinBox.value())
+        self.settings.set_value("profiles", self._get_profiles())
         self.settings.set_value("autostart", self.gui.autostartCheckBox.isChecked())
         self.settings.set_value("sync_on_start", self.gui.snychronizeOnStartCheckBox.isChecked())
 
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer to adapt the interval of periodic synchronizations.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+from typing import List
+
+from .sync_result import SyncResult
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+BACKOFF_FACTOR = 2.0
+
+
+# -----------------------------------------------------------------------------
+# Functions
+# -----------------------------------------------------------------------------
+def get_next_interval(interval_secs: float, results: List[SyncResult],
+                      min_secs: float, max_secs: float) -> float:
+    """Adapt the interval to the results of the last synchronization.
+
+    The interval is halved if a file was transferred and doubled if all files
+    were already synchronized or an error occurred.
+
+    Args:
+        interval_secs (float): The current interval in seconds.
+        results (list):        The results of the last synchronization. An empty
+                               list indicates a failed synchronization.
+        min_secs (float):      The minimum interval in seconds.
+        max_secs (float):      The maximum interval in seconds.
+
+    Returns:
+        Returns the new interval in seconds.
+    """
+    failed = not results or any(result.error is not None for result in results)
+    changed = any(result.direction is not None for result in results)
+    if changed and not failed:
+        interval_secs /= BACKOFF_FACTOR
+    else:
+        interval_secs *= BACKOFF_FACTOR
+    return max(min_secs, min(max_secs, interval_secs))
+
+
+def format_interval(interval_secs: float) -> str:
+    """Format an interval like 45 s, 5 min or 2.5 h."""
+    if interval_secs < 60.0:
+        return f"{interval_secs:.0f} s"
+    if interval_secs < 3600.0:
+        return f"{interval_secs / 60.0:.0f} min"
+    return f"{interval_secs / 3600.0:.1f} h"
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
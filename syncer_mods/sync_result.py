@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer describing the results of a synchronization.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from .metrics import SyncMetrics
+from .settings import SyncProfile
+
+
+# -----------------------------------------------------------------------------
+# Result Class
+# -----------------------------------------------------------------------------
+@dataclass
+class SyncResult:
+    """Result of the synchronization of a single file."""
+
+    profile: SyncProfile
+    direction: Optional[str] = None
+    error: Optional[str] = None
+    dry_run: bool = False
+    start_time: float = 0.0
+    duration_secs: float = 0.0
+    metrics: SyncMetrics = field(default_factory=SyncMetrics)
+
+    @property
+    def message(self) -> str:
+        """Get a human readable description of the result."""
+        if self.error is not None:
+            return self.error
+        if self.direction is None:
+            return "Files are already synchronized"
+        if self.dry_run:
+            return f"{self.direction.capitalize()} file is newer"
+        if self.direction == "local":
+            return "Synchronized local to remote"
+        return "Synchronized remote to local"
+
+    def get_record(self) -> Dict[str, Any]:
+        """Get the result as a dictionary for the metrics export."""
+        return {"start_time": self.start_time,
+                "local_file": self.profile.local_file,
+                "remote_file": self.profile.remote_file,
+                "direction": self.direction,
+                "error": self.error,
+                "dry_run": self.dry_run,
+                "duration_secs": self.duration_secs,
+                "bytes_transferred": self.metrics.bytes_transferred,
+                "retries": self.metrics.retries,
+                "remote_cache_hits": self.metrics.remote_cache_hits,
+                "remote_cache_misses": self.metrics.remote_cache_misses,
+                "transfer_profile": self.metrics.transfer_profile,
+                "hash_type": self.metrics.hash_type,
+                "local_md5": self.metrics.local_md5,
+                "remote_md5": self.metrics.remote_md5,
+                "timings": self.metrics.timings}
+
+
+# -----------------------------------------------------------------------------
+# Listener Class
+# -----------------------------------------------------------------------------
+class SyncListener:
+    """Interface to get notified about the synchronization.
+
+    All methods are called in the thread running the synchronization.
+    """
+
+    def on_started(self) -> None:
+        """Handle the start of the synchronization."""
+
+    def on_finished(self, message: str) -> None:
+        """Handle a successful synchronization.
+
+        Args:
+            message (str): The human readable result.
+        """
+
+    def on_error(self, message: str) -> None:
+        """Handle a synchronization with errors.
+
+        Args:
+            message (str): The human readable result including the errors.
+        """
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer providing the state of the last successful synchronization.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from .app_dirs import get_cache_dir, load_json, save_json
+from .hash_cache import RACY_MTIME_SECS, get_cache_key
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def get_local_key(filename: str) -> Optional[str]:
+    """Get the key identifying the current version of a local file.
+
+    Args:
+        filename (str): The local file.
+
+    Returns:
+        Returns the key built from device, inode, size and modification time,
+        or None if the file does not exist or was modified too recently to
+        detect a later modification by its key.
+    """
+    try:
+        stat_result = os.stat(filename)
+    except OSError:
+        return None
+    if time.time() - stat_result.st_mtime < RACY_MTIME_SECS:
+        return None
+    return get_cache_key(stat_result)
+
+
+def get_changed_side(base_md5: Optional[str], local_md5: Optional[str],
+                     remote_md5: Optional[str]) -> Optional[str]:
+    """Determine the side that changed since the last successful synchronization.
+
+    All hashes must be of the same type, which is md5 for most remotes.
+
+    Args:
+        base_md5 (str):   The hash of both files after the last synchronization or None.
+        local_md5 (str):  The hash of the local file.
+        remote_md5 (str): The hash of the remote file or None if not supported.
+
+    Returns:
+        Returns "local" if only the local file changed, "remote" if only the
+        remote file changed, "both" if both files changed (a conflict) and None
+        if this can't be decided, i.e., the base or a hash is unknown or no
+        file changed.
+    """
+    if base_md5 is None or local_md5 is None or remote_md5 is None:
+        return None
+    if local_md5 == base_md5 and remote_md5 != base_md5:
+        return "remote"
+    if remote_md5 == base_md5 and local_md5 != base_md5:
+        return "local"
+    if base_md5 not in (local_md5, remote_md5):
+        return "both"
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Class
+# -----------------------------------------------------------------------------
+class SyncState:
+    """Persistent hash of each file pair after its last successful synchronization.
+
+    The state allows a three-way comparison of the local file, the remote
+    file and their common base. In addition, the key of the local file (see
+    get_local_key()) is stored to detect a modification of the local file
+    without hashing it. The state can be used by multiple threads concurrently.
+    """
+
+    def __init__(self, filename: Optional[str] = None):
+        """Construct a new instance and load the state file.
+
+        Args:
+            filename (str): The state file. If set to None, the file
+                            ``sync_state.json`` in the cache directory is used.
+        """
+        if filename is None:
+            filename = os.path.join(get_cache_dir(), "sync_state.json")
+        self.filename = filename
+        self.entries: Dict[str, Dict[str, str]] = {}
+        self._modified = False
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _get_key(local_file: str, remote_file: str) -> str:
+        """Get the key of a file pair."""
+        return f"{os.path.abspath(local_file)}|{remote_file}"
+
+    def get_base(self, local_file: str, remote_file: str,
+                 hash_type: str = "md5") -> Optional[str]:
+        """Get the hash of the file pair after the last successful synchronization.
+
+        Args:
+            local_file (str):  The local file.
+            remote_file (str): The remote file.
+            hash_type (str):   The type of the hash.
+
+        Returns:
+            Returns the hex digest or None if the pair was never synchronized
+            or the hash of this type is unknown.
+        """
+        with self._lock:
+            return self.entries.get(self._get_key(local_file, remote_file), {}).get(hash_type)
+
+    def get_local_key(self, local_file: str, remote_file: str) -> Optional[str]:
+        """Get the key of the local file after the last successful synchronization.
+
+        Args:
+            local_file (str):  The local file.
+            remote_file (str): The remote file.
+
+        Returns:
+            Returns the key or None if it is unknown.
+        """
+        with self._lock:
+            return self.entries.get(self._get_key(local_file, remote_file), {}).get("local_key")
+
+    def set_base(self, local_file: str, remote_file: str, hashes: Dict[str, str],
+                 local_key: Optional[str] = None) -> None:
+        """Store the hashes of the file pair after a successful synchronization.
+
+        Args:
+            local_file (str):  The local file.
+            remote_file (str): The remote file.
+            hashes (dict):     The hex digests of both files by hash type, e.g., ``md5``.
+            local_key (str):   The key of the local file with these hashes or None.
+        """
+        key = self._get_key(local_file, remote_file)
+        entry = dict(hashes)
+        if local_key is not None:
+            entry["local_key"] = local_key
+        with self._lock:
+            if self.entries.get(key) != entry:
+                self.entries[key] = entry
+                self._modified = True
+
+    def save(self) -> None:
+        """Save the state file if it was modified."""
+        with self._lock:
+            if not self._modified:
+                return
+
+            save_json(self.filename, self.entries, indent=2)
+            self._modified = False
+
+    def _load(self) -> None:
+        """Load the state file. A missing or corrupted file results in an empty state."""
+        try:
+            self.entries = {str(key): {str(name): str(item) for name, item in value.items()}
+                            for key, value in load_json(self.filename).items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            self.entries = {}
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
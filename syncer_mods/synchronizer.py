@@ -16,248 +16,937 @@ Copyright:
 # -----------------------------------------------------------------------------
 # Module Import
 # -----------------------------------------------------------------------------
-import hashlib
-import json
 import os
 import shutil
-import subprocess
-import sys
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import List, Optional
-
-from PyQt5.QtCore import QObject, pyqtSignal
-
-from .settings import Settings
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .backup import create_backup
+from .chunk_store import ChunkStore, load_local_manifest
+from .hash_cache import HashCache
+from .hashing import (DEFAULT_BLOCK_SIZE, SAMPLE_HASH_TYPE, TREE_HASH_TYPE, hash_file,
+                      hash_file_multi, sample_hash_file, select_hash_type, tree_hash_file)
+from .journal import SyncJournal
+from .metrics import SyncMetrics, export_metrics
+from .rclone import RcloneExitError, RemoteStat, SynchronizerError, WATCHDOG
+from .rclone_rc import RcTransport
+from .remote_cache import RemoteStatCache
+from .retry import CircuitBreaker, FAILURE_EXIT_CODES, RETRYABLE_EXIT_CODES, get_backoff_delay
+from .settings import Settings, SyncProfile, get_remote_name
+from .sync_result import SyncListener, SyncResult
+from .sync_state import SyncState, get_changed_side, get_local_key
+from .transfer import TransferTuner, get_transfer_params
+from .transport import SubprocessTransport, Transport
 
 
 # -----------------------------------------------------------------------------
-# Exception Class
+# Type Definitions
 # -----------------------------------------------------------------------------
-class SynchronizerError(Exception):
-    """Represents an error within the synchronization task."""
+ReturnT = TypeVar("ReturnT")
 
 
 # -----------------------------------------------------------------------------
 # Helper Functions
 # -----------------------------------------------------------------------------
-def md5_of_file(filename: str) -> Optional[str]:
+def md5_of_file(filename: str, block_size: int = DEFAULT_BLOCK_SIZE,
+                strategy: str = "auto") -> Optional[str]:
     """Calculate the md5 checksum of a file and return its hex digest.
 
     Args:
-        filename (str): File to calculate the md5 of.
+        filename (str):   File to calculate the md5 of.
+        block_size (int): The number of bytes processed at once.
+        strategy (str):   The strategy to read the file, see syncer_mods.hashing.STRATEGIES.
 
     Returns:
         Returns the hex digest or None if the file does not exist.
     """
     if not os.path.exists(filename):
         return None
-
-    file_hash = hashlib.md5()
-    with open(filename, "rb") as file_handle:
-        chunk = file_handle.read(8192)
-        while chunk:
-            file_hash.update(chunk)
-            chunk = file_handle.read(8192)
-    return file_hash.hexdigest()
-
-
-def check_output(args: List[str]) -> str:
-    """Wrap subprocess.check_output to support console hiding on Windows.
-
-    Args:
-        args: List of arguments to execute.
-
-    Returns:
-        Returns the stdout of the command.
-    """
-    # We need to use this construct as it is the only way mypy understands platform specific code!
-    # pylint: disable=consider-using-in
-    if sys.platform == "win32" or sys.platform == "cygwin":
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        startupinfo.wShowWindow = subprocess.SW_HIDE
-        return subprocess.check_output(args, shell=False, encoding="utf-8",
-                                       startupinfo=startupinfo)
-    return subprocess.check_output(args, shell=False, encoding="utf-8")
-
-
-def check_call(args: List[str]) -> None:
-    """Wrap subprocess.check_call to support console hiding on Windows.
-
-    Args:
-        args: List of arguments to execute.
-    """
-    # We need to use this construct as it is the only way mypy understands platform specific code!
-    # pylint: disable=consider-using-in
-    if sys.platform == "win32" or sys.platform == "cygwin":
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        startupinfo.wShowWindow = subprocess.SW_HIDE
-        subprocess.check_call(args, shell=False,
-                              startupinfo=startupinfo)
-        return
-    subprocess.check_call(args, shell=False)
-
-
-def get_remote_md5sum(rclone: str, remote_file: str) -> str:
-    """Call `rclone md5sum <remote_file>` to retrieve the md5 checksum of the remote file.
-
-    Args:
-        rclone (str):      Path to the rclone binary.
-        remote_file (str): Identifier of the remote file.
-
-    Returns:
-        Returns the md5 checksum of the remote file.
-
-    Raises:
-        SynchronizerError: If an error occurs.
-    """
-    try:
-        remote_md5 = check_output([rclone, "md5sum", remote_file])[:32]
-    except subprocess.CalledProcessError as call_error:
-        if call_error.returncode == 1:
-            raise SynchronizerError(
-                f"Syntax error of remote file {remote_file}, please check your settings!") from None
-        if call_error.returncode in [3, 4]:
-            raise SynchronizerError(
-                f"Remote file {remote_file} does not exist! Please check your settings!") from None
-        raise SynchronizerError(
-            f"RClone returned exit code {call_error.returncode}! Please check "
-            "https://rclone.org/docs/#exit-code for a description of the exit codes.") from None
-    except FileNotFoundError:
-        raise SynchronizerError(
-            f"Specified rclone binary {rclone} does not exist! Please check your settings!") \
-            from None
-    return remote_md5
+    return hash_file(filename, "md5", block_size, strategy)
 
 
-def get_remote_modtime(rclone: str, remote_file: str) -> datetime:
-    """Determine the modification time of the remote file.
+def get_local_modtime(local_file: str) -> datetime:
+    """Determine the modification time of the local file.
 
     Args:
-        rclone (str):      Path to the rclone binary.
-        remote_file (str): Identifier of the remote file.
+        local_file (str): The local file.
 
     Returns:
-        Returns the modification time of the remote file as a datetime object.
+        Returns the modification time of the local file as a datetime object.
 
     Raises:
         SynchronizerError: If an error occurs.
     """
     try:
-        remote_json = check_output([rclone, "lsjson", remote_file])
-    except subprocess.CalledProcessError:
-        raise SynchronizerError(
-            f"Can't determine modification time of remote file {remote_file}!") from None
-    except FileNotFoundError:
-        raise SynchronizerError(
-            f"Specified rclone binary {rclone} does not exist! Please check your settings!") \
-            from None
-
-    try:
-        remote_modtime = datetime.strptime(json.loads(remote_json)[0]["ModTime"],
-                                           "%Y-%m-%dT%H:%M:%S.%fZ").replace(
-                                               tzinfo=timezone.utc)
+        local_modtime = datetime.fromtimestamp(os.stat(local_file).st_mtime,
+                                               tz=timezone.utc)
     except Exception as general_exception:
         raise SynchronizerError(
-            (f"Error extracting modification time of remote file {remote_file}: "
+            (f"Error extracting modification time of local file {local_file}: "
              f"{general_exception}")) from None
-    return remote_modtime
+    return local_modtime
 
 
-def get_local_modtime(local_file: str) -> datetime:
-    """Determine the modification time of the local file.
+def get_sync_source(local_file: str, remote_modtime: datetime) -> str:
+    """Determine the source of the synchronization from the modification times.
 
     Args:
-        local_file (str): The local file.
+        local_file (str):       The local file.
+        remote_modtime (obj):   The modification time of the remote file.
 
     Returns:
-        Returns the modification time of the local file as a datetime object.
+        Returns "local" if the local file is newer and "remote" otherwise.
 
     Raises:
-        SynchronizerError: If an error occurs.
+        SynchronizerError: If the modification times are too close to decide.
     """
-    try:
-        local_modtime = datetime.fromtimestamp(os.stat(local_file).st_mtime,
-                                               tz=timezone.utc)
-    except Exception as general_exception:
-        raise SynchronizerError(
-            (f"Error extracting modification time of local file {local_file}: "
-             f"{general_exception}")) from None
-    return local_modtime
+    local_modtime = get_local_modtime(local_file)
+    delta_secs = abs((local_modtime - remote_modtime).total_seconds())
+    if delta_secs < 30.0:
+        raise SynchronizerError(f"Time difference of {delta_secs} seconds is too "
+                                "small to ensure picking the right file!")
+    if local_modtime > remote_modtime:
+        return "local"
+    return "remote"
 
 
 # -----------------------------------------------------------------------------
 # Worker Class
 # -----------------------------------------------------------------------------
-class Synchronizer(QObject):
-    """Synchronize the file."""
-
-    started = pyqtSignal()
-    finished = pyqtSignal(str)
-    error = pyqtSignal(str)
+class Synchronizer:
+    """Synchronize the files.
+
+    All configured files are synchronized concurrently on a thread pool
+    limited by the settings ``max_workers`` and ``max_workers_per_remote``.
+    The progress is reported to the listener. Each rclone call is limited by
+    the setting ``step_timeout_secs`` and the whole run by ``sync_timeout_secs``.
+    A run can be cancelled from another thread using cancel(). Transient
+    rclone errors are retried with exponential backoff, and a remote failing
+    repeatedly is skipped for a while by the circuit breaker.
+    """
 
-    def __init__(self, settings: Optional[Settings] = None):
+    def __init__(self, settings: Optional[Settings] = None,
+                 listener: Optional[SyncListener] = None):
         """Construct a new worker.
 
         Args:
             settings (obj): The settings object to modify. If set
                             to None, a local one will be used.
+            listener (obj): The listener to notify or None.
         """
-        super().__init__()
         self.settings = settings if settings is not None else Settings()
+        self.listener = listener if listener is not None else SyncListener()
+        self.hash_cache = HashCache(max_entries=self.settings.get_value("hash_cache_size"))
+        self.sync_state = SyncState()
+        self.journal = SyncJournal(max_entries=self.settings.get_value("journal_max_entries"))
+        self.circuit_breaker = CircuitBreaker()
+        self.remote_cache = RemoteStatCache()
+        self.transfer_tuner = TransferTuner()
+        self._transfer_profiles: Dict[str, str] = {}
+        self.transport: Optional[Transport] = None
+        self._transport_config: Optional[Tuple[str, str]] = None
+        self.last_results: List[SyncResult] = []
+        self._deadline: Optional[float] = None
+        self._hash_types: Dict[str, str] = {}
+        self._hash_types_lock = threading.Lock()
+        self._file_locks: Dict[str, threading.Lock] = {}
+        self._file_locks_lock = threading.Lock()
+
+    def cancel(self) -> None:
+        """Cancel the current run by killing all running rclone processes.
+
+        Files not yet started are reported as cancelled as well. This method
+        is intended to be called from another thread than run().
+        """
+        WATCHDOG.cancel()
 
-    def run(self) -> None:
-        """Synchronize the file."""
-        self.started.emit()
+    def run(self, dry_run: bool = False) -> List[SyncResult]:
+        """Synchronize all files.
 
-        rclone = self.settings.get_value("rclone")
-        remote_dir = self.settings.get_value("remote_dir")
-        remote_file = self.settings.get_remote_file()
-        local_file = self.settings.get_value("local_file")
+        Args:
+            dry_run (bool): If set, only determine the direction of the
+                            synchronization without transferring any file.
+
+        Returns:
+            Returns the results of all files or an empty list on internal errors.
+        """
+        self.listener.on_started()
+        self.last_results = []
+        WATCHDOG.reset()
+        step_timeout = self.settings.get_value("step_timeout_secs")
+        WATCHDOG.step_timeout = float(step_timeout) if step_timeout > 0 else None
+        sync_timeout = self.settings.get_value("sync_timeout_secs")
+        self._deadline = time.monotonic() + sync_timeout if sync_timeout > 0 else None
+        self.circuit_breaker.threshold = self.settings.get_value("circuit_breaker_threshold")
+        self.circuit_breaker.reset_secs = self.settings.get_value("circuit_breaker_reset_secs")
+        self.remote_cache.ttl_secs = self.settings.get_value("remote_cache_ttl_secs")
+
+        profiles = self.settings.get_profiles()
+        per_remote_limit = max(1, self.settings.get_value("max_workers_per_remote"))
+        semaphores = {profile.remote_name: threading.BoundedSemaphore(per_remote_limit)
+                      for profile in profiles}
+        max_workers = max(1, min(len(profiles), self.settings.get_value("max_workers")))
 
         try:
-            remote_md5 = get_remote_md5sum(rclone, remote_file)
-            local_md5 = md5_of_file(local_file)
-            sync_src = None
+            transport = self._get_transport()
+            self._set_transfer_params(transport, profiles)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(
+                    lambda profile: self._run_profile(transport, profile,
+                                                      semaphores[profile.remote_name], dry_run),
+                    profiles))
+        except Exception as general_exception:  # pylint: disable=broad-except
+            self.listener.on_error(f"Internal error: Caught exception {general_exception}!")
+            return []
+
+        finally:
+            self._save_hash_cache()
+            self._save_sync_state()
+
+        self.last_results = results
+        self._tune_transfers(results)
+        self._export_metrics(results)
+        self._write_journal(results)
+        if len(results) == 1:
+            message = results[0].message
+        else:
+            message = "\n".join(
+                f"{os.path.basename(result.profile.local_file)}: {result.message}"
+                for result in results)
 
-            if remote_md5 != local_md5:
-                if local_md5 is None:
-                    sync_src = "remote"
-                else:
-                    remote_modtime = get_remote_modtime(rclone, remote_file)
-                    local_modtime = get_local_modtime(local_file)
-                    delta_secs = abs((local_modtime - remote_modtime).total_seconds())
-                    if delta_secs < 30.0:
-                        raise SynchronizerError(f"Time difference of {delta_secs} seconds is too "
-                                                "small to ensure picking the right file!")
-                    if local_modtime > remote_modtime:
-                        sync_src = "local"
-                    else:
-                        sync_src = "remote"
-
-                if sync_src == "local":
-                    cmd = [rclone, "sync", local_file, remote_dir]
+        if any(result.error is not None for result in results):
+            self.listener.on_error(message)
+        else:
+            self.listener.on_finished(message)
+        return results
+
+    def _run_profile(self, transport: Transport, profile: SyncProfile,
+                     semaphore: threading.BoundedSemaphore, dry_run: bool) -> SyncResult:
+        """Synchronize a single file and catch all errors.
+
+        Args:
+            transport (obj): The transport to use.
+            profile (obj):   The file to synchronize.
+            semaphore (obj): The semaphore limiting the concurrent access to the remote.
+            dry_run (bool):  If set, do not transfer any file.
+
+        Returns:
+            Returns the result of the synchronization.
+        """
+        # Profiles sharing a local file must not replace and back it up concurrently
+        with self._get_file_lock(profile.local_file), semaphore:
+            metrics = SyncMetrics(
+                transfer_profile=self._transfer_profiles.get(profile.remote_name, "default"))
+            result = SyncResult(profile, dry_run=dry_run, start_time=time.time(),
+                                metrics=metrics)
+            start = time.perf_counter()
+            try:
+                with WATCHDOG.deadline(self._deadline):
+                    WATCHDOG.check()
+                    result.direction = self._synchronize(transport, profile, metrics, dry_run)
+            except SynchronizerError as synchronizer_error:
+                result.error = str(synchronizer_error)
+            except Exception as general_exception:  # pylint: disable=broad-except
+                result.error = f"Internal error: Caught exception {general_exception}!"
+            result.duration_secs = time.perf_counter() - start
+            return result
+
+    def _get_file_lock(self, local_file: str) -> threading.Lock:
+        """Get the lock serializing the synchronizations of a local file."""
+        with self._file_locks_lock:
+            return self._file_locks.setdefault(os.path.realpath(local_file), threading.Lock())
+
+    def _synchronize(self, transport: Transport, profile: SyncProfile,
+                     metrics: SyncMetrics, dry_run: bool = False) -> Optional[str]:
+        """Synchronize a single file.
+
+        Args:
+            transport (obj): The transport to use.
+            profile (obj):   The file to synchronize.
+            metrics (obj):   The metrics to record the timings and transferred bytes in.
+            dry_run (bool):  If set, do not transfer any file.
+
+        Returns:
+            Returns the source of the synchronization, i.e., "local" or "remote",
+            or None if the files are already synchronized.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        if self.settings.get_value("storage_mode") == "chunked":
+            return self._synchronize_chunked(profile, metrics, dry_run)
+
+        remote_file = profile.remote_file
+        local_file = profile.local_file
+        local_key = get_local_key(local_file)
+        hash_type = metrics.hash_type = self._get_hash_type(transport, profile, metrics)
+
+        # The local file is hashed while the remote file is queried, unless it
+        # might be uploaded by streaming without hashing it first
+        may_stream = not dry_run and self._may_stream_upload(profile, local_key, hash_type,
+                                                             metrics)
+        remote_stat = self._stat_and_hash(transport, profile, metrics, not may_stream)
+        remote_md5 = metrics.remote_md5
+
+        # Only the local file changed, so it is hashed while uploading it
+        if may_stream and remote_md5 is not None and \
+                remote_md5 == self.sync_state.get_base(local_file, remote_file, hash_type):
+            self._upload(transport, profile, metrics, local_key)
+            return "local"
+
+        local_md5 = self._hash_local_file(profile, metrics) if may_stream \
+            else metrics.local_md5
+
+        # Remotes without a common hash type are treated like a mismatch
+        if remote_md5 is not None and remote_md5 == local_md5:
+            if not dry_run:
+                self._set_base(profile, {hash_type: remote_md5}, local_key)
+            return None
+
+        sync_src = self._get_sync_source(profile, remote_stat.modtime, metrics)
+        if dry_run:
+            return sync_src
+        if sync_src == "local":
+            self._upload(transport, profile, metrics, local_key)
+        else:
+            digest = self._download(transport, remote_file, local_file, metrics)
+
+            # The checksum of the downloaded file was verified
+            if digest is not None:
+                self.hash_cache.store(os.stat(local_file), digest, hash_type)
+            if remote_md5 is not None:
+                self._set_base(profile, {hash_type: remote_md5}, get_local_key(local_file))
+
+        return sync_src
+
+    def _get_hash_type(self, transport: Transport, profile: SyncProfile,
+                       metrics: SyncMetrics) -> str:
+        """Get the hash type used to compare the local and the remote file.
+
+        The hash types supported by a remote are determined once and cached.
+
+        Args:
+            transport (obj): The transport to use.
+            profile (obj):   The file to synchronize.
+            metrics (obj):   The metrics to record the timing in.
+
+        Returns:
+            Returns the preferred hash type supported by the remote and computable
+            locally. If there is none, md5 is returned, which results in a
+            comparison of the modification times as the remote provides no md5.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        with self._hash_types_lock:
+            hash_type = self._hash_types.get(profile.remote_name)
+        if hash_type is not None:
+            return hash_type
+
+        with metrics.measure("remote_stat"):
+            try:
+                remote_hash_types = self._call_with_retry(
+                    profile.remote_file, metrics, transport.get_hash_types, profile.remote_dir)
+            except RcloneExitError as exit_error:
+                if exit_error.returncode in FAILURE_EXIT_CODES:
+                    raise
+                # rclone versions without the backend command support md5 only
+                remote_hash_types = ["md5"]
+        hash_type = select_hash_type(remote_hash_types) or "md5"
+        with self._hash_types_lock:
+            self._hash_types[profile.remote_name] = hash_type
+        return hash_type
+
+    def _may_stream_upload(self, profile: SyncProfile, local_key: Optional[str],
+                           hash_type: str, metrics: SyncMetrics) -> bool:
+        """Check if the local file might be uploaded without hashing it first.
+
+        This is the case for the upload mode ``stream`` if the local file was
+        modified since the last synchronization. It is uploaded if the remote
+        file was not modified. A modification is assumed if the key of the
+        local file changed and the sampled pre-check, if enabled, shows that
+        the content changed as well.
+
+        Args:
+            profile (obj):    The file to synchronize.
+            local_key (str):  The key of the local file, see get_local_key().
+            hash_type (str):  The type of the hash used for the comparison.
+            metrics (obj):    The metrics to record the timing of the pre-check in.
+
+        Returns:
+            Returns True if the local file might be uploaded without hashing it.
+        """
+        if self.settings.get_value("upload_mode") != "stream" or local_key is None \
+                or self.hash_cache.lookup(profile.local_file, hash_type) is not None:
+            return False
+        base_key = self.sync_state.get_local_key(profile.local_file, profile.remote_file)
+        if base_key is None or base_key == local_key:
+            return False
+
+        base_sample = self.sync_state.get_base(profile.local_file, profile.remote_file,
+                                               SAMPLE_HASH_TYPE)
+        if self.settings.get_value("precheck_samples") <= 0 or base_sample is None:
+            return True
+        # A touched file with the same samples is hashed to decide
+        with metrics.measure("local_fingerprint"):
+            return self._sample_file(profile.local_file) != base_sample
+
+    def _stat_and_hash(self, transport: Transport, profile: SyncProfile, metrics: SyncMetrics,
+                       hash_local: bool) -> RemoteStat:
+        """Query the remote file while hashing the local file in another thread.
+
+        The metadata of the remote file is taken from the remote cache if valid
+        and it shows that the files are synchronized. Otherwise, a file is
+        going to be transferred, so the remote file is queried again to base
+        this decision on the current metadata, e.g., to detect a modification
+        by another client.
+
+        Args:
+            transport (obj):   The transport to use.
+            profile (obj):     The file to synchronize.
+            metrics (obj):     The metrics to record the timings and the hashes in.
+            hash_local (bool): If set, hash the local file. Otherwise, only
+                               the remote file is queried.
+
+        Returns:
+            Returns the metadata of the remote file.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        stop_hashing = threading.Event()
+
+        def hash_local_file() -> Optional[str]:
+            with WATCHDOG.deadline(self._deadline):
+                return self._hash_local_file(profile, metrics, stop_hashing)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            local_md5_future = executor.submit(hash_local_file) if hash_local else None
+            try:
+                remote_stat = self.remote_cache.lookup(profile.remote_file, metrics.hash_type)
+                cached = remote_stat is not None
+                if remote_stat is not None:
+                    metrics.remote_cache_hits += 1
+                    metrics.remote_md5 = remote_stat.get_hash(metrics.hash_type)
                 else:
-                    shutil.copyfile(local_file, local_file + ".bak")
-                    local_dir = os.path.dirname(local_file)
-                    cmd = [rclone, "sync", remote_file, local_dir]
-                check_call(cmd)
+                    metrics.remote_cache_misses += 1
+                    remote_stat = self._stat_remote(transport, profile, metrics)
+            except BaseException:
+                stop_hashing.set()   # Do not wait for the hash of a large file in vain
+                raise
+            if local_md5_future is not None:
+                local_md5_future.result()
+
+        if cached and (not hash_local or metrics.remote_md5 is None
+                       or metrics.remote_md5 != metrics.local_md5):
+            self.remote_cache.invalidate(profile.remote_file)
+            remote_stat = self._stat_remote(transport, profile, metrics)
+        return remote_stat
+
+    def _stat_remote(self, transport: Transport, profile: SyncProfile,
+                     metrics: SyncMetrics) -> RemoteStat:
+        """Query the remote file and store its metadata in the remote cache.
 
-        except SynchronizerError as synchronizer_error:
-            self.error.emit(str(synchronizer_error))
-            return
+        Args:
+            transport (obj): The transport to use.
+            profile (obj):   The file to synchronize.
+            metrics (obj):   The metrics to record the timing and the remote hash in.
 
-        except Exception as general_exception:  # pylint: disable=broad-except
-            self.error.emit(f"Internal error: Caught exception {general_exception}!")
+        Returns:
+            Returns the metadata of the remote file.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        with metrics.measure("remote_stat"):
+            remote_stat = self._call_with_retry(profile.remote_file, metrics, transport.stat,
+                                                profile.remote_file, metrics.hash_type)
+        self.remote_cache.store(profile.remote_file, remote_stat, metrics.hash_type)
+        metrics.remote_md5 = remote_stat.get_hash(metrics.hash_type)
+        return remote_stat
+
+    def _hash_local_file(self, profile: SyncProfile, metrics: SyncMetrics,
+                         stop: Optional[threading.Event] = None) -> Optional[str]:
+        """Get the hash of the local file from the hash cache or by hashing it.
+
+        If the local file is synchronized with further remotes using other hash
+        types, their hashes are calculated in the same pass and cached.
+
+        Args:
+            profile (obj): The file to synchronize.
+            metrics (obj): The metrics to record the timing and the hash in.
+            stop (obj):    Event aborting the hashing when set.
+
+        Returns:
+            Returns the hex digest of the type metrics.hash_type or None if the
+            file does not exist.
+        """
+        if self.settings.get_value("local_fingerprint") and \
+                self.hash_cache.lookup(profile.local_file, metrics.hash_type) is None:
+            metrics.local_md5 = self._get_unchanged_hash(profile, metrics)
+            if metrics.local_md5 is not None:
+                return metrics.local_md5
+
+        hash_types = {metrics.hash_type}
+        with self._hash_types_lock:
+            for other_profile in self.settings.get_profiles():
+                if other_profile.local_file == profile.local_file:
+                    hash_types.add(self._hash_types.get(other_profile.remote_name,
+                                                        metrics.hash_type))
+        with metrics.measure("local_hash"):
+            digests = self.hash_cache.get_hashes(
+                profile.local_file, lambda filename, types: self._hash_file(filename, types, stop),
+                sorted(hash_types))
+        metrics.local_md5 = digests[metrics.hash_type] if digests is not None else None
+        return metrics.local_md5
+
+    def _get_unchanged_hash(self, profile: SyncProfile, metrics: SyncMetrics) -> Optional[str]:
+        """Get the hash of the local file if its fingerprint shows it is unchanged.
+
+        The fingerprint is calculated in parallel at disk speed, so it avoids
+        calculating the sequential remote hash of a large local file with the
+        same content as after the last synchronization.
+
+        Args:
+            profile (obj): The file to synchronize.
+            metrics (obj): The metrics to record the timing in.
+
+        Returns:
+            Returns the hash of the type metrics.hash_type after the last
+            synchronization if the fingerprint of the local file did not change
+            since then, and None otherwise.
+        """
+        base_md5 = self.sync_state.get_base(profile.local_file, profile.remote_file,
+                                            metrics.hash_type)
+        base_fingerprint = self.sync_state.get_base(profile.local_file, profile.remote_file,
+                                                    TREE_HASH_TYPE)
+        if base_md5 is None or base_fingerprint is None:
+            return None
+        with metrics.measure("local_fingerprint"):
+            fingerprint = self.hash_cache.get_hash(profile.local_file, self._fingerprint_file,
+                                                   TREE_HASH_TYPE)
+        return base_md5 if fingerprint == base_fingerprint else None
+
+    def _upload(self, transport: Transport, profile: SyncProfile, metrics: SyncMetrics,
+                local_key: Optional[str]) -> None:
+        """Upload the local file according to the upload mode.
+
+        In the upload mode ``stream``, the local file is read only once for the
+        upload and its md5, which is verified against the remote afterwards.
+
+        Args:
+            transport (obj): The transport to use.
+            profile (obj):   The file to synchronize.
+            metrics (obj):   The metrics to record the timings and transferred bytes in.
+            local_key (str): The key of the local file before it was hashed.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        local_file = profile.local_file
+        self.remote_cache.invalidate(profile.remote_file)
+        with metrics.measure("transfer"):
+            if self.settings.get_value("upload_mode") == "stream":
+                metrics.local_md5 = self._call_with_retry(
+                    profile.remote_file, metrics, transport.upload_stream, local_file,
+                    profile.remote_file, self.settings.get_value("hash_block_size"),
+                    metrics.hash_type)
+                if local_key is not None and get_local_key(local_file) == local_key:
+                    self.hash_cache.store(os.stat(local_file), metrics.local_md5,
+                                          metrics.hash_type)
+            else:
+                self._call_with_retry(profile.remote_file, metrics, transport.upload,
+                                      local_file, profile.remote_file)
+        metrics.bytes_transferred = os.path.getsize(local_file)
+        if metrics.local_md5 is not None and metrics.remote_md5 is not None:
+            self._set_base(profile, {metrics.hash_type: metrics.local_md5}, local_key)
+        self._cache_uploaded_stat(profile, metrics, local_key)
+
+    def _cache_uploaded_stat(self, profile: SyncProfile, metrics: SyncMetrics,
+                             local_key: Optional[str]) -> None:
+        """Store the metadata of the uploaded file in the remote cache using the local values.
+
+        The metadata is stored only if the local file was not modified since
+        its key was determined. The modification time of the remote file is the
+        one of the local file, except for the upload mode ``stream``, which sets
+        it to the time of the upload.
+
+        Args:
+            profile (obj):   The uploaded file.
+            metrics (obj):   The metrics containing the hashes.
+            local_key (str): The key of the local file before it was hashed.
+        """
+        try:
+            stat_result = os.stat(profile.local_file)
+        except OSError:
+            return
+        if local_key is None or get_local_key(profile.local_file) != local_key:
             return
 
-        if sync_src is None:
-            self.finished.emit("Files are already synchronized")
-        elif sync_src == "local":
-            self.finished.emit("Synchronized local to remote")
+        if self.settings.get_value("upload_mode") == "stream":
+            modtime = datetime.now(tz=timezone.utc)
         else:
-            self.finished.emit("Synchronized remote to local")
+            modtime = datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc)
+        # Remotes without a common hash type do not report the hash
+        hashes = {metrics.hash_type: metrics.local_md5} \
+            if metrics.local_md5 is not None and metrics.remote_md5 is not None else {}
+        self.remote_cache.store(profile.remote_file,
+                                RemoteStat(stat_result.st_size, modtime, hashes),
+                                metrics.hash_type)
+
+    def _set_base(self, profile: SyncProfile, hashes: Dict[str, str],
+                  local_key: Optional[str]) -> None:
+        """Store the hashes after a successful synchronization in the sync state.
+
+        The key of the local file is stored only if the file was not modified
+        since the key was determined. The same applies to the enabled
+        fingerprints of the local file.
+        """
+        if local_key is not None and get_local_key(profile.local_file) != local_key:
+            local_key = None
+        if local_key is not None:
+            fingerprints = self._get_fingerprints(profile.local_file)
+            if get_local_key(profile.local_file) == local_key:
+                hashes = dict(hashes, **fingerprints)
+        self.sync_state.set_base(profile.local_file, profile.remote_file, hashes, local_key)
+
+    def _get_fingerprints(self, local_file: str) -> Dict[str, str]:
+        """Get the enabled fingerprints of the local file stored in the sync state.
+
+        Args:
+            local_file (str): The local file.
+
+        Returns:
+            Returns the hex digests by hash type, i.e., TREE_HASH_TYPE if the
+            local fingerprint is enabled and SAMPLE_HASH_TYPE if the sampled
+            pre-check is enabled.
+        """
+        fingerprints = {}
+        if self.settings.get_value("local_fingerprint"):
+            fingerprints[TREE_HASH_TYPE] = self.hash_cache.get_hash(
+                local_file, self._fingerprint_file, TREE_HASH_TYPE)
+        if self.settings.get_value("precheck_samples") > 0:
+            fingerprints[SAMPLE_HASH_TYPE] = self._sample_file(local_file)
+        return {hash_type: digest for hash_type, digest in fingerprints.items()
+                if digest is not None}
+
+    def _synchronize_chunked(self, profile: SyncProfile, metrics: SyncMetrics,
+                             dry_run: bool) -> Optional[str]:
+        """Synchronize a single file stored as content-defined chunks on the remote.
+
+        The remote manifest takes the role of the remote file. If it does not exist
+        yet, the local file is uploaded.
+
+        Args:
+            profile (obj):  The file to synchronize.
+            metrics (obj):  The metrics to record the timings and transferred bytes in.
+            dry_run (bool): If set, do not transfer any file.
+
+        Returns:
+            Returns the source of the synchronization, i.e., "local" or "remote",
+            or None if the files are already synchronized.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        local_file = profile.local_file
+        chunk_store = ChunkStore(
+            self.settings.get_value("rclone"), profile.remote_file,
+            self.settings.get_value("chunk_size"),
+            lambda func, *args: self._call_with_retry(profile.remote_file, metrics, func, *args))
+        chunk_store.set_transfer_params(get_transfer_params(metrics.transfer_profile,
+                                                            self.settings))
+        with metrics.measure("remote_stat"):
+            manifest = chunk_store.get_manifest()
+        metrics.remote_md5 = manifest.md5 if manifest is not None else None
+        # A modified file synchronized before is chunked right away, which yields
+        # its md5 hash without reading the whole file once more for the transfer
+        hash_func = self._md5_of_file \
+            if load_local_manifest(local_file, unchanged_only=False) is None \
+            else chunk_store.get_local_md5
+        with metrics.measure("local_hash"):
+            local_md5 = metrics.local_md5 = self.hash_cache.get_hash(local_file, hash_func)
+
+        if manifest is None:
+            if local_md5 is None:
+                raise SynchronizerError(f"Neither local file {local_file} nor remote manifest "
+                                        f"{chunk_store.manifest_file} exist!")
+            sync_src = "local"
+        elif manifest.md5 == local_md5:
+            if not dry_run:
+                self.sync_state.set_base(local_file, profile.remote_file, {"md5": manifest.md5})
+            return None
+        else:
+            sync_src = self._get_sync_source(profile, manifest.modtime, metrics)
+
+        if dry_run:
+            return sync_src
+        if sync_src == "local":
+            assert local_md5 is not None
+            with metrics.measure("transfer"):
+                metrics.bytes_transferred = chunk_store.upload(local_file, manifest)
+            self.sync_state.set_base(local_file, profile.remote_file, {"md5": local_md5})
+        else:
+            assert manifest is not None
+            with metrics.measure("transfer"):
+                metrics.bytes_transferred = chunk_store.download(
+                    local_file, manifest, lambda: self._create_backup(local_file, metrics))
+
+            # The checksum of the rebuilt file was verified
+            self.hash_cache.store(os.stat(local_file), manifest.md5)
+            self.sync_state.set_base(local_file, profile.remote_file, {"md5": manifest.md5})
+
+        return sync_src
+
+    def _get_sync_source(self, profile: SyncProfile, remote_modtime: datetime,
+                         metrics: SyncMetrics) -> str:
+        """Determine the source of the synchronization of files with different content.
+
+        The hashes of both files are compared with the hash after the last
+        successful synchronization first. If both files changed since then, the
+        conflict is reported as an error, so neither change is overwritten. Only
+        if the file pair was never synchronized or the remote shares no hash type
+        with syncer, the modification times are compared.
+
+        Args:
+            profile (obj):        The file to synchronize.
+            remote_modtime (obj): The modification time of the remote file.
+            metrics (obj):        The metrics containing the hashes of both files.
+
+        Returns:
+            Returns "local" if the local file is the source and "remote" otherwise.
+
+        Raises:
+            SynchronizerError: If both files changed or the modification times are
+                               too close to decide.
+        """
+        if metrics.local_md5 is None:
+            return "remote"
+
+        changed_side = get_changed_side(
+            self.sync_state.get_base(profile.local_file, profile.remote_file, metrics.hash_type),
+            metrics.local_md5, metrics.remote_md5)
+        if changed_side == "both":
+            raise SynchronizerError(
+                f"Both the local file {profile.local_file} and the remote file "
+                f"{profile.remote_file} changed since the last synchronization! Resolve "
+                "the conflict by deleting one of the files or by making both files equal.")
+        if changed_side is not None:
+            return changed_side
+
+        with metrics.measure("modtime"):
+            return get_sync_source(profile.local_file, remote_modtime)
+
+    def _download(self, transport: Transport, remote_file: str, local_file: str,
+                  metrics: SyncMetrics) -> Optional[str]:
+        """Download the remote file into a temporary file and replace the local file by it.
+
+        In the download mode ``stream``, the md5 of the data is calculated while
+        writing the temporary file and compared with the md5 of the remote file.
+        The local file is kept as a backup before it is replaced.
+
+        Args:
+            transport (obj):   The transport to use.
+            remote_file (str): Identifier of the remote file.
+            local_file (str):  The local file.
+            metrics (obj):     The metrics to record the timings and transferred bytes in.
+
+        Returns:
+            Returns the verified md5 of the new local file or None if it is unknown.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        local_dir, local_name = os.path.split(os.path.abspath(local_file))
+        tmp_handle, tmp_file = tempfile.mkstemp(prefix=f".{local_name}.", suffix=".syncer-tmp",
+                                                dir=local_dir)
+        os.close(tmp_handle)
+        try:
+            with metrics.measure("transfer"):
+                if self.settings.get_value("download_mode") == "stream":
+                    digest: Optional[str] = self._call_with_retry(
+                        remote_file, metrics, transport.download_stream, remote_file,
+                        tmp_file, self.settings.get_value("hash_block_size"), metrics.hash_type)
+                    if metrics.remote_md5 not in [None, digest]:
+                        raise SynchronizerError(
+                            f"Verification of downloaded file {remote_file} failed!")
+                else:
+                    # rclone verifies the checksum itself
+                    self._call_with_retry(remote_file, metrics, transport.download,
+                                          remote_file, tmp_file)
+                    digest = metrics.remote_md5
+            metrics.bytes_transferred = os.path.getsize(tmp_file)
+            if os.path.exists(local_file):
+                # The temporary file is only accessible by the user
+                shutil.copymode(local_file, tmp_file)
+            self._create_backup(local_file, metrics)
+            os.replace(tmp_file, local_file)
+        finally:
+            if os.path.exists(tmp_file):
+                os.unlink(tmp_file)
+        return digest
+
+    def _call_with_retry(self, remote_file: str, metrics: SyncMetrics,
+                         func: Callable[..., ReturnT], *args: Any) -> ReturnT:
+        """Call a transport method and retry it on transient rclone errors.
+
+        Each retry waits for a random time growing exponentially with the
+        number of retries (setting ``retry_delay_secs``). All calls are refused
+        while the circuit breaker of the remote is open.
+
+        Args:
+            remote_file (str): Identifier of the remote file accessed by the call.
+            metrics (obj):     The metrics to count the retries in.
+            func (obj):        The method to call.
+            args:              The arguments of the method.
+
+        Returns:
+            Returns the return value of the method.
+
+        Raises:
+            SynchronizerError: If the call failed, all retries failed or the
+                               circuit of the remote is open.
+        """
+        remote_name = get_remote_name(remote_file)
+        retry = 0
+        while True:
+            self.circuit_breaker.check(remote_name)
+            try:
+                value = func(*args)
+            except RcloneExitError as exit_error:
+                if exit_error.returncode not in FAILURE_EXIT_CODES:
+                    raise
+                self.circuit_breaker.record_failure(remote_name)
+                if exit_error.returncode not in RETRYABLE_EXIT_CODES \
+                        or retry >= self.settings.get_value("retry_count"):
+                    raise
+                delay_secs = get_backoff_delay(retry, self.settings.get_value("retry_delay_secs"))
+                WATCHDOG.sleep(delay_secs)
+                retry += 1
+                metrics.retries += 1
+                continue
+            self.circuit_breaker.record_success(remote_name)
+            return value
+
+    def _create_backup(self, local_file: str, metrics: SyncMetrics) -> None:
+        """Keep a backup of the local file before it is replaced."""
+        with metrics.measure("backup"):
+            create_backup(local_file, self.settings.get_value("backup_count"))
+
+    def _md5_of_file(self, filename: str) -> Optional[str]:
+        """Calculate the md5 checksum of a file using the configured hashing parameters."""
+        return md5_of_file(filename, self.settings.get_value("hash_block_size"),
+                           self.settings.get_value("hash_strategy"))
+
+    def _fingerprint_file(self, filename: str) -> Optional[str]:
+        """Calculate the local fingerprint of a file using the configured parameters."""
+        return tree_hash_file(filename, self.settings.get_value("fingerprint_segment_size"),
+                              block_size=self.settings.get_value("hash_block_size"))
+
+    def _sample_file(self, filename: str) -> Optional[str]:
+        """Calculate the sampled fingerprint of a file using the configured sampling depth."""
+        return sample_hash_file(filename, self.settings.get_value("precheck_samples"))
+
+    def _hash_file(self, filename: str, hash_types: List[str],
+                   stop: Optional[threading.Event] = None) -> Optional[Dict[str, str]]:
+        """Calculate several hashes of a file in one pass, abort it on a cancellation or stop."""
+        def check() -> None:
+            WATCHDOG.check()
+            if stop is not None and stop.is_set():
+                raise SynchronizerError(f"Hashing of {filename} was stopped!")
+
+        return hash_file_multi(filename, hash_types, self.settings.get_value("hash_block_size"),
+                               self.settings.get_value("hash_strategy"), check)
+
+    def close(self) -> None:
+        """Release the resources of the transport, e.g., stop the rclone daemon."""
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+            self._transport_config = None
+
+    def _get_transport(self) -> Transport:
+        """Get the transport and recreate it if the corresponding settings changed."""
+        transport_config = (self.settings.get_value("transport"), self.settings.get_value("rclone"))
+        if self.transport is None or transport_config != self._transport_config:
+            self.close()
+            if transport_config[0] == "rcd":
+                self.transport = RcTransport(transport_config[1])
+            else:
+                self.transport = SubprocessTransport(transport_config[1])
+            self._transport_config = transport_config
+        return self.transport
+
+    def _set_transfer_params(self, transport: Transport, profiles: List[SyncProfile]) -> None:
+        """Set the transfer parameters of all remotes according to the profile or the tuner."""
+        profile_name = self.settings.get_value("transfer_profile")
+        autotune = self.settings.get_value("transfer_autotune")
+        self._transfer_profiles = {}
+        for remote_name in sorted({profile.remote_name for profile in profiles}):
+            if autotune:
+                self._transfer_profiles[remote_name] = self.transfer_tuner.get_profile(
+                    remote_name, profile_name)
+            else:
+                self._transfer_profiles[remote_name] = profile_name
+            transport.set_transfer_params(remote_name, get_transfer_params(
+                self._transfer_profiles[remote_name], self.settings))
+
+    def _tune_transfers(self, results: List[SyncResult]) -> None:
+        """Record the throughput of the transfers in the tuner. Errors are reported, not fatal."""
+        if not self.settings.get_value("transfer_autotune") or \
+                self.settings.get_value("storage_mode") == "chunked":
+            return
+        for result in results:
+            if result.direction is not None and result.error is None and not result.dry_run \
+                    and "transfer" in result.metrics.timings:
+                self.transfer_tuner.record(result.profile.remote_name,
+                                           result.metrics.transfer_profile,
+                                           result.metrics.bytes_transferred,
+                                           result.metrics.timings["transfer"])
+        try:
+            self.transfer_tuner.save()
+        except OSError as os_error:
+            print(f"WARNING: Can't save transfer tuning {self.transfer_tuner.filename}: "
+                  f"{os_error}")
+
+    def _export_metrics(self, results: List[SyncResult]) -> None:
+        """Write the results to the metrics file. Errors are reported but not fatal."""
+        metrics_file = self.settings.get_value("metrics_file")
+        if not metrics_file:
+            return
+        try:
+            export_metrics(metrics_file, self.settings.get_value("metrics_format"),
+                           [result.get_record() for result in results])
+        except (OSError, ValueError) as export_error:
+            print(f"WARNING: Can't export metrics to {metrics_file}: {export_error}")
+
+    def _write_journal(self, results: List[SyncResult]) -> None:
+        """Add the results to the journal. Errors are reported but not fatal."""
+        if self.journal.max_entries <= 0:
+            return
+        try:
+            self.journal.add([result.get_record() for result in results])
+        except (OSError, sqlite3.Error) as journal_error:
+            print(f"WARNING: Can't write journal {self.journal.filename}: {journal_error}")
+
+    def _save_hash_cache(self) -> None:
+        """Save the hash cache. Errors are ignored as the cache is only an optimization."""
+        try:
+            self.hash_cache.save()
+        except OSError as os_error:
+            print(f"WARNING: Can't save hash cache {self.hash_cache.filename}: {os_error}")
+
+    def _save_sync_state(self) -> None:
+        """Save the sync state. On errors, the modification times are compared next time."""
+        try:
+            self.sync_state.save()
+        except OSError as os_error:
+            print(f"WARNING: Can't save sync state {self.sync_state.filename}: {os_error}")
 
 
 # -----------------------------------------------------------------------------
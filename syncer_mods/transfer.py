@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer providing the transfer parameters of rclone and their auto-tuning.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .app_dirs import get_cache_dir, load_json, save_json
+
+
+# -----------------------------------------------------------------------------
+# Data Classes
+# -----------------------------------------------------------------------------
+@dataclass(frozen=True)
+class TransferParams:
+    """Parameters of rclone for transferring files. A value of 0 keeps the rclone default."""
+
+    multi_thread_streams: int = 0
+    buffer_size_mib: int = 0
+    chunk_size_mib: int = 0
+    checkers: int = 0
+
+    def get_rclone_flags(self) -> List[str]:
+        """Get the command line flags of rclone.
+
+        The chunk size applies to uploads to Google Drive and S3. The flags of
+        other backends are ignored by rclone.
+
+        Returns:
+            Returns the list of flags.
+        """
+        flags = []
+        if self.multi_thread_streams > 0:
+            flags += ["--multi-thread-streams", str(self.multi_thread_streams)]
+        if self.buffer_size_mib > 0:
+            flags += ["--buffer-size", f"{self.buffer_size_mib}M"]
+        if self.chunk_size_mib > 0:
+            flags += ["--drive-chunk-size", f"{self.chunk_size_mib}M",
+                      "--s3-chunk-size", f"{self.chunk_size_mib}M"]
+        if self.checkers > 0:
+            flags += ["--checkers", str(self.checkers)]
+        return flags
+
+    def get_rc_config(self) -> Dict[str, Any]:
+        """Get the global options for the ``_config`` parameter of the remote control API.
+
+        The chunk sizes are options of the backends, which can't be set per call.
+
+        Returns:
+            Returns the options by their name in the rclone configuration.
+        """
+        config: Dict[str, Any] = {}
+        if self.multi_thread_streams > 0:
+            config["MultiThreadStreams"] = self.multi_thread_streams
+        if self.buffer_size_mib > 0:
+            config["BufferSize"] = self.buffer_size_mib * 1024 * 1024
+        if self.checkers > 0:
+            config["Checkers"] = self.checkers
+        return config
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+TRANSFER_PROFILES = {"default": TransferParams(),
+                     "low_memory": TransferParams(1, 4, 8, 4),
+                     "balanced": TransferParams(4, 32, 32, 8),
+                     "large_files": TransferParams(8, 64, 128, 8)}
+# The profile "custom" uses the parameters of the settings instead
+PROFILE_NAMES = ["default", "low_memory", "balanced", "large_files", "custom"]
+
+# Profiles tried by the auto-tuner, ordered by their resource usage
+TUNING_LEVELS = ["low_memory", "default", "balanced", "large_files"]
+# Smaller transfers are dominated by the latency and not taken into account
+MIN_TUNING_BYTES = 4 * 1024 * 1024
+# Weight of a new measurement in the moving average of the throughput
+TUNING_WEIGHT = 0.3
+# Older measurements are discarded, so the tuner adapts to a changed connection
+TUNING_MAX_AGE_SECS = 7 * 24 * 3600
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def get_transfer_params(profile_name: str, settings: Any) -> TransferParams:
+    """Get the parameters of a transfer profile.
+
+    Args:
+        profile_name (str): The name of the profile, see PROFILE_NAMES.
+        settings (obj):     The settings containing the parameters of the
+                            profile ``custom``.
+
+    Returns:
+        Returns the parameters. Unknown profiles use the rclone defaults.
+    """
+    if profile_name == "custom":
+        return TransferParams(settings.get_value("multi_thread_streams"),
+                              settings.get_value("buffer_size_mib"),
+                              settings.get_value("upload_chunk_size_mib"),
+                              settings.get_value("checkers"))
+    return TRANSFER_PROFILES.get(profile_name, TransferParams())
+
+
+# -----------------------------------------------------------------------------
+# Class
+# -----------------------------------------------------------------------------
+class TransferTuner:
+    """Select the transfer profile of each remote by the throughput of past transfers.
+
+    The tuner climbs the ladder TUNING_LEVELS: once the profile in use was
+    measured, the untried neighbours of the fastest profile are tried as
+    well, and the fastest one is kept afterwards. The throughput of a profile
+    is a moving average of its transfers. The state is stored in the file
+    ``transfer_tuning.json`` in the cache directory. The tuner can be used by
+    multiple threads concurrently.
+    """
+
+    def __init__(self, filename: Optional[str] = None):
+        """Construct a new instance and load the state file.
+
+        Args:
+            filename (str): The state file or None to use the default file in
+                            the cache directory.
+        """
+        self.filename = filename if filename is not None \
+            else os.path.join(get_cache_dir(), "transfer_tuning.json")
+        # Maps the remote name to the profiles and their throughput and time of measurement
+        self.entries: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._modified = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def get_profile(self, remote_name: str, start_profile: str) -> str:
+        """Get the transfer profile to use for the next transfers to a remote.
+
+        Args:
+            remote_name (str):   The name of the rclone remote.
+            start_profile (str): The profile used if the remote was not measured
+                                 yet. Profiles not in TUNING_LEVELS start with
+                                 ``default``.
+
+        Returns:
+            Returns the name of the profile.
+        """
+        min_time = time.time() - TUNING_MAX_AGE_SECS
+        with self._lock:
+            throughputs = {name: entry["bytes_per_sec"]
+                           for name, entry in self.entries.get(remote_name, {}).items()
+                           if name in TUNING_LEVELS and entry["time"] >= min_time}
+        if not throughputs:
+            return start_profile if start_profile in TUNING_LEVELS else "default"
+
+        best = max(throughputs, key=lambda name: throughputs[name])
+        index = TUNING_LEVELS.index(best)
+        for neighbour in [index + 1, index - 1]:
+            if 0 <= neighbour < len(TUNING_LEVELS) and TUNING_LEVELS[neighbour] not in throughputs:
+                return TUNING_LEVELS[neighbour]
+        return best
+
+    def record(self, remote_name: str, profile_name: str, num_bytes: int,
+               duration_secs: float) -> None:
+        """Record the throughput of a transfer.
+
+        Args:
+            remote_name (str):     The name of the rclone remote.
+            profile_name (str):    The profile used for the transfer.
+            num_bytes (int):       The number of transferred bytes.
+            duration_secs (float): The duration of the transfer.
+        """
+        if num_bytes < MIN_TUNING_BYTES or duration_secs <= 0.0:
+            return
+        bytes_per_sec = num_bytes / duration_secs
+        now = time.time()
+        with self._lock:
+            profiles = self.entries.setdefault(remote_name, {})
+            entry = profiles.get(profile_name)
+            if entry is not None and entry["time"] >= now - TUNING_MAX_AGE_SECS:
+                bytes_per_sec = (1.0 - TUNING_WEIGHT) * entry["bytes_per_sec"] \
+                    + TUNING_WEIGHT * bytes_per_sec
+            profiles[profile_name] = {"bytes_per_sec": bytes_per_sec, "time": now}
+            self._modified = True
+
+    def save(self) -> None:
+        """Save the state file if it was modified."""
+        with self._lock:
+            if not self._modified:
+                return
+
+            save_json(self.filename, self.entries, indent=2)
+            self._modified = False
+
+    def _load(self) -> None:
+        """Load the state file. A missing or corrupted file results in an empty state."""
+        try:
+            self.entries = {
+                str(remote_name): {str(name): {"bytes_per_sec": float(entry["bytes_per_sec"]),
+                                               "time": float(entry["time"])}
+                                   for name, entry in profiles.items()}
+                for remote_name, profiles in load_json(self.filename).items()}
+        except (OSError, ValueError, TypeError, AttributeError, KeyError):
+            self.entries = {}
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Module for syncer providing the transports used to access the remote file.
+
+Copyright:
+    2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+
+    All rights reserved.
+
+    This file is part of syncer (https://github.com/seeraven/syncer)
+    and is released under the "BSD 3-Clause License". Please see the ``LICENSE`` file
+    that is included as part of this package.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import subprocess
+from abc import ABC, abstractmethod
+from contextlib import suppress
+from typing import Dict, List, Optional
+
+from .hashing import DEFAULT_BLOCK_SIZE, hash_file, new_hash
+from .rclone import (RemoteStat, SynchronizerError, WATCHDOG, check_call, get_exit_code_error,
+                     get_remote_hash_types, get_remote_stat, popen, split_remote_file)
+from .settings import get_remote_name
+from .transfer import TransferParams
+
+
+# -----------------------------------------------------------------------------
+# Base Class
+# -----------------------------------------------------------------------------
+class Transport(ABC):
+    """Interface of all transports."""
+
+    def get_hash_types(self, remote_dir: str) -> List[str]:
+        """Determine the hash types supported by the remote.
+
+        The default implementation assumes md5 support.
+
+        Args:
+            remote_dir (str): The remote directory.
+
+        Returns:
+            Returns the names of the hash types as used by rclone, e.g., ``sha1``.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        # pylint: disable=unused-argument
+        return ["md5"]
+
+    def set_transfer_params(self, remote_name: str, params: TransferParams) -> None:   # noqa: B027
+        """Set the parameters of rclone used to transfer the files of a remote.
+
+        The default implementation ignores the parameters.
+
+        Args:
+            remote_name (str): The name of the rclone remote.
+            params (obj):      The transfer parameters.
+        """
+
+    @abstractmethod
+    def stat(self, remote_file: str, hash_type: str = "md5") -> RemoteStat:
+        """Determine hash, size and modification time of the remote file.
+
+        Args:
+            remote_file (str): Identifier of the remote file.
+            hash_type (str):   The type of the hash to determine.
+
+        Returns:
+            Returns the metadata of the remote file.
+
+        Raises:
+            SynchronizerError: If an error occurs or the remote file does not exist.
+        """
+
+    @abstractmethod
+    def upload(self, local_file: str, remote_file: str) -> None:
+        """Copy the local file to the remote file.
+
+        Args:
+            local_file (str):  The local file.
+            remote_file (str): Identifier of the remote file.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+
+    def upload_stream(self, local_file: str, remote_file: str,
+                      block_size: int = DEFAULT_BLOCK_SIZE, hash_type: str = "md5") -> str:
+        """Copy the local file to the remote file and calculate its hash on the way.
+
+        The default implementation uploads and hashes the file separately.
+
+        Args:
+            local_file (str):  The local file.
+            remote_file (str): Identifier of the remote file.
+            block_size (int):  The number of bytes read at once.
+            hash_type (str):   The type of the hash.
+
+        Returns:
+            Returns the hex digest of the uploaded data.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        self.upload(local_file, remote_file)
+        digest = hash_file(local_file, hash_type, block_size)
+        if digest is None:
+            raise SynchronizerError(f"Local file {local_file} does not exist!")
+        return digest
+
+    @abstractmethod
+    def download(self, remote_file: str, local_file: str) -> None:
+        """Copy the remote file to the local file.
+
+        Args:
+            remote_file (str): Identifier of the remote file.
+            local_file (str):  The local file.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+
+    def download_stream(self, remote_file: str, local_file: str,
+                        block_size: int = DEFAULT_BLOCK_SIZE, hash_type: str = "md5") -> str:
+        """Copy the remote file to the local file and calculate its hash on the way.
+
+        The default implementation downloads and hashes the file separately.
+
+        Args:
+            remote_file (str): Identifier of the remote file.
+            local_file (str):  The local file.
+            block_size (int):  The number of bytes written at once.
+            hash_type (str):   The type of the hash.
+
+        Returns:
+            Returns the hex digest of the downloaded data.
+
+        Raises:
+            SynchronizerError: If an error occurs.
+        """
+        self.download(remote_file, local_file)
+        digest = hash_file(local_file, hash_type, block_size)
+        if digest is None:
+            raise SynchronizerError(f"Downloaded file {local_file} does not exist!")
+        return digest
+
+    def close(self) -> None:   # noqa: B027
+        """Release all resources of the transport."""
+
+
+# -----------------------------------------------------------------------------
+# Subprocess Transport
+# -----------------------------------------------------------------------------
+class SubprocessTransport(Transport):
+    """Transport calling a new rclone process for every operation."""
+
+    def __init__(self, rclone: str):
+        """Construct a new instance.
+
+        Args:
+            rclone (str): Path to the rclone binary.
+        """
+        self.rclone = rclone
+        self.transfer_params: Dict[str, TransferParams] = {}
+
+    def set_transfer_params(self, remote_name: str, params: TransferParams) -> None:
+        """Set the parameters passed as flags to rclone when transferring files of a remote."""
+        self.transfer_params[remote_name] = params
+
+    def get_hash_types(self, remote_dir: str) -> List[str]:
+        """Determine the hash types supported by the remote using ``rclone backend features``."""
+        return get_remote_hash_types(self.rclone, remote_dir)
+
+    def stat(self, remote_file: str, hash_type: str = "md5") -> RemoteStat:
+        """Determine hash, size and modification time of the remote file."""
+        return get_remote_stat(self.rclone, remote_file, hash_type)
+
+    def upload(self, local_file: str, remote_file: str) -> None:
+        """Copy the local file to the remote file."""
+        remote_dir, _ = split_remote_file(remote_file)
+        self._call_rclone([self.rclone, "sync"] + self._get_transfer_flags(remote_file)
+                          + [local_file, remote_dir])
+
+    def upload_stream(self, local_file: str, remote_file: str,
+                      block_size: int = DEFAULT_BLOCK_SIZE, hash_type: str = "md5") -> str:
+        """Pipe the local file into ``rclone rcat`` and calculate its hash on the way.
+
+        The file is read only once. Afterwards, the hash and size reported by the
+        remote are compared with the uploaded data.
+        """
+        file_hash = new_hash(hash_type)
+        size = 0
+        try:
+            process = popen([self.rclone, "rcat"] + self._get_transfer_flags(remote_file)
+                            + [remote_file], stdin=subprocess.PIPE)
+        except FileNotFoundError:
+            raise self._get_missing_binary_error() from None
+
+        assert process.stdin is not None
+        read_error: Optional[OSError] = None
+        with WATCHDOG.watch(process):
+            try:
+                with open(local_file, "rb") as file_handle:
+                    for block in iter(lambda: file_handle.read(block_size), b''):
+                        file_hash.update(block)
+                        size += len(block)
+                        process.stdin.write(block)
+            except BrokenPipeError:
+                # rclone terminated early, its exit code describes the error
+                pass
+            except OSError as os_error:
+                # Abort the upload instead of letting rclone store a truncated file
+                read_error = os_error
+                process.kill()
+            with suppress(BrokenPipeError):
+                process.stdin.close()
+            returncode = process.wait()
+        if read_error is not None:
+            raise SynchronizerError(f"Error reading local file {local_file}: {read_error}")
+        if returncode != 0:
+            raise get_exit_code_error(returncode)
+
+        digest = file_hash.hexdigest()
+        remote_stat = self.stat(remote_file, hash_type)
+        if remote_stat.size != size or remote_stat.get_hash(hash_type) not in [None, digest]:
+            raise SynchronizerError(f"Verification of uploaded file {remote_file} failed!")
+        return digest
+
+    def download(self, remote_file: str, local_file: str) -> None:
+        """Copy the remote file to the local file."""
+        self._call_rclone([self.rclone, "copyto"] + self._get_transfer_flags(remote_file)
+                          + [remote_file, local_file])
+
+    def download_stream(self, remote_file: str, local_file: str,
+                        block_size: int = DEFAULT_BLOCK_SIZE, hash_type: str = "md5") -> str:
+        """Write the output of ``rclone cat`` to the local file and hash it on the way."""
+        file_hash = new_hash(hash_type)
+        try:
+            process = popen([self.rclone, "cat"] + self._get_transfer_flags(remote_file)
+                            + [remote_file], stdout=subprocess.PIPE)
+        except FileNotFoundError:
+            raise self._get_missing_binary_error() from None
+
+        stdout = process.stdout
+        assert stdout is not None
+        write_error: Optional[OSError] = None
+        with WATCHDOG.watch(process):
+            try:
+                with open(local_file, "wb") as file_handle:
+                    for block in iter(lambda: stdout.read(block_size), b''):
+                        file_hash.update(block)
+                        file_handle.write(block)
+            except OSError as os_error:
+                write_error = os_error
+                process.kill()
+            stdout.close()
+            returncode = process.wait()
+        if write_error is not None:
+            raise SynchronizerError(f"Error writing local file {local_file}: {write_error}")
+        if returncode != 0:
+            raise get_exit_code_error(returncode)
+        return file_hash.hexdigest()
+
+    def _get_transfer_flags(self, remote_file: str) -> List[str]:
+        """Get the flags of the transfer parameters of the remote of a file."""
+        return self.transfer_params.get(get_remote_name(remote_file),
+                                        TransferParams()).get_rclone_flags()
+
+    def _call_rclone(self, cmd: List[str]) -> None:
+        """Call rclone and convert errors into a SynchronizerError."""
+        try:
+            check_call(cmd)
+        except subprocess.CalledProcessError as call_error:
+            raise get_exit_code_error(call_error.returncode) from None
+        except FileNotFoundError:
+            raise self._get_missing_binary_error() from None
+
+    def _get_missing_binary_error(self) -> SynchronizerError:
+        """Get the error describing a missing rclone binary."""
+        return SynchronizerError(f"Specified rclone binary {self.rclone} does not exist! "
+                                 "Please check your settings!")
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
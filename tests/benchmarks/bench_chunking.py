@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Benchmark of the content-defined chunking of the syncer_mods.chunk_store module.
+
+The benchmark creates temporary files of the given sizes and measures the
+effective throughput, i.e., the file size divided by the duration, of
+chunking them for every average chunk size. The md5 hash of the file is
+computed in the same pass.
+
+Scenarios:
+    md5             Reference: Only the md5 hash of the file is computed.
+    full            The file is chunked without a previous manifest.
+    modified-end    Only the last tenth of the file changed since the previous manifest.
+    modified-start  The first bytes of the file changed since the previous manifest.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import argparse
+import json
+import os
+import time
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List
+
+from syncer_mods.chunk_store import chunk_file
+from syncer_mods.hashing import hash_file
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+SCENARIOS = ["md5", "full", "modified-end", "modified-start"]
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def parse_size(size_str: str) -> int:
+    """Parse a size like 64K, 16M or 1G."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if size_str[-1].upper() in units:
+        return int(float(size_str[:-1]) * units[size_str[-1].upper()])
+    return int(size_str)
+
+
+def create_file(filename: str, size: int) -> None:
+    """Create a file with random content."""
+    with open(filename, "wb") as file_handle:
+        file_handle.write(os.urandom(size))
+
+
+def modify_file(filename: str, offset: int) -> None:
+    """Overwrite some bytes of a file at the given offset."""
+    with open(filename, "r+b") as file_handle:
+        file_handle.seek(offset)
+        file_handle.write(os.urandom(16))
+
+
+def measure(func: Callable[[], Any], repeats: int) -> float:
+    """Get the best time in seconds of several runs."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_scenario(filename: str, size: int, avg_size: int, scenario: str,
+                     repeats: int) -> float:
+    """Get the best time in seconds of a scenario."""
+    if scenario == "md5":
+        return measure(lambda: hash_file(filename, "md5"), repeats)
+    if scenario == "full":
+        return measure(lambda: chunk_file(filename, avg_size), repeats)
+
+    previous, _ = chunk_file(filename, avg_size)
+    modify_file(filename, size * 9 // 10 if scenario == "modified-end" else 0)
+    return measure(lambda: chunk_file(filename, avg_size, previous), repeats)
+
+
+def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Measure all scenarios and average chunk sizes and print the results."""
+    results: List[Dict[str, Any]] = []
+    print(f"{'size':>10} {'scenario':>15} {'avg chunk':>10} {'MiB/s':>10}")
+    with TemporaryDirectory(dir=args.dir) as tmp_dir:
+        for size_str in args.sizes.split(","):
+            size = parse_size(size_str)
+            filename = os.path.join(tmp_dir, f"bench_{size}")
+            for scenario in SCENARIOS:
+                avg_sizes = args.avg_sizes.split(",") if scenario != "md5" else ["-"]
+                for avg_size_str in avg_sizes:
+                    avg_size = parse_size(avg_size_str) if avg_size_str != "-" else 0
+                    create_file(filename, size)
+                    duration = measure_scenario(filename, size, avg_size, scenario,
+                                                args.repeats)
+                    throughput = size / (1024 * 1024) / duration if duration > 0 else 0.0
+                    print(f"{size_str:>10} {scenario:>15} {avg_size_str:>10} "
+                          f"{throughput:>10.1f}")
+                    results.append({"size": size, "scenario": scenario,
+                                    "avg_size": avg_size, "seconds": duration,
+                                    "mib_per_sec": throughput})
+            os.unlink(filename)
+    return results
+
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="4M,32M",
+                        help="Comma separated list of file sizes. Default: %(default)s")
+    parser.add_argument("--avg-sizes", default="64K,1M",
+                        help="Comma separated list of average chunk sizes. "
+                        "Default: %(default)s")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Number of runs of which the best is taken. Default: %(default)s")
+    parser.add_argument("--dir", default=None,
+                        help="Directory for the temporary files, e.g., on the drive to test.")
+    parser.add_argument("--json", default=None,
+                        help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    if args.json:
+        with open(args.json, "w", encoding="UTF-8") as file_handle:
+            json.dump({"results": results}, file_handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Benchmark of the hashing strategies of the syncer_mods.hashing module.
+
+The benchmark creates temporary files of the given sizes and measures the
+throughput of every strategy and block size. As the files are read from the
+page cache after the first run, the results show the CPU overhead of each
+strategy, which dominates on fast NVMe drives.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import argparse
+import json
+import os
+import time
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List
+
+from syncer_mods.hashing import has_file_digest, hash_file, tree_hash_file
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def parse_size(size_str: str) -> int:
+    """Parse a size like 64K, 16M or 1G."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if size_str[-1].upper() in units:
+        return int(float(size_str[:-1]) * units[size_str[-1].upper()])
+    return int(size_str)
+
+
+def create_file(filename: str, size: int) -> None:
+    """Create a file with random content."""
+    chunk = os.urandom(min(size, 16 * 1024 * 1024))
+    with open(filename, "wb") as file_handle:
+        remaining = size
+        while remaining > 0:
+            file_handle.write(chunk[:remaining])
+            remaining -= len(chunk)
+
+
+def measure(filename: str, hash_type: str, block_size: int, strategy: str,
+            repeats: int) -> float:
+    """Get the best time in seconds of several runs."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        if strategy == "tree":
+            tree_hash_file(filename, block_size=block_size)
+        else:
+            hash_file(filename, hash_type, block_size, strategy)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Measure all strategies and block sizes and print the results."""
+    strategies = ["readinto", "mmap"]
+    if has_file_digest():
+        strategies.append("file_digest")
+    # The local fingerprint always uses BLAKE2b, independent of the hash type
+    strategies.append("tree")
+
+    results: List[Dict[str, Any]] = []
+    print(f"{'size':>10} {'strategy':>12} {'block size':>10} {'MiB/s':>10}")
+    with TemporaryDirectory(dir=args.dir) as tmp_dir:
+        for size_str in args.sizes.split(","):
+            size = parse_size(size_str)
+            filename = os.path.join(tmp_dir, f"bench_{size}")
+            create_file(filename, size)
+            for strategy in strategies:
+                block_sizes = args.block_sizes.split(",") if strategy != "file_digest" else ["-"]
+                for block_size_str in block_sizes:
+                    block_size = parse_size(block_size_str) if block_size_str != "-" else 0
+                    duration = measure(filename, args.hash_type, block_size, strategy,
+                                       args.repeats)
+                    throughput = size / (1024 * 1024) / duration if duration > 0 else 0.0
+                    print(f"{size_str:>10} {strategy:>12} {block_size_str:>10} "
+                          f"{throughput:>10.1f}")
+                    results.append({"size": size, "strategy": strategy,
+                                    "block_size": block_size, "seconds": duration,
+                                    "mib_per_sec": throughput})
+            os.unlink(filename)
+    return results
+
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1M,64M,512M",
+                        help="Comma separated list of file sizes. Default: %(default)s")
+    parser.add_argument("--block-sizes", default="8K,64K,1M,4M",
+                        help="Comma separated list of block sizes. Default: %(default)s")
+    parser.add_argument("--hash-type", default="md5",
+                        help="The hash algorithm. Default: %(default)s")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Number of runs of which the best is taken. Default: %(default)s")
+    parser.add_argument("--dir", default=None,
+                        help="Directory for the temporary files, e.g., on the drive to test.")
+    parser.add_argument("--json", default=None,
+                        help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    largest_size = max(result["size"] for result in results)
+    best = max((result for result in results if result["size"] == largest_size),
+               key=lambda result: result["mib_per_sec"])
+    print(f"\nFastest on the largest file: strategy={best['strategy']} "
+          f"block_size={best['block_size']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="UTF-8") as file_handle:
+            json.dump({"hash_type": args.hash_type, "results": results}, file_handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
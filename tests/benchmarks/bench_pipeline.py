@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Benchmark of the synchronization pipeline of syncer.
+
+The benchmark measures the latency and throughput of Synchronizer.run() for
+every file size and scenario, as well as the individual steps hashing, remote
+stat, transfer and backup. By default, the remote is emulated by the stand-in
+tests/tools/fake_rclone.py operating on a local directory, so the results show
+the overhead of syncer and the rclone process calls, not of a network.
+
+Scenarios:
+    in-sync         Both files are equal and the hash cache is empty.
+    in-sync-cached  Both files are equal and the local hash is cached.
+    upload          The local file is newer.
+    download        The remote file is newer.
+
+Use --json to store the results and compare them with an earlier run by
+passing the earlier file to --compare.
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from functools import partial
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List
+
+from syncer_mods.backup import create_backup
+from syncer_mods.settings import Settings
+from syncer_mods.synchronizer import Synchronizer, md5_of_file
+from syncer_mods.transport import SubprocessTransport
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+FAKE_RCLONE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "tools", "fake_rclone.py")
+SCENARIOS = ["in-sync", "in-sync-cached", "upload", "download"]
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def parse_size(size_str: str) -> int:
+    """Parse a size like 64K, 16M or 1G."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if size_str[-1].upper() in units:
+        return int(float(size_str[:-1]) * units[size_str[-1].upper()])
+    return int(size_str)
+
+
+def create_file(filename: str, size: int, age_secs: float) -> None:
+    """Create a file with random content and a modification time in the past."""
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    chunk = os.urandom(min(size, 16 * 1024 * 1024))
+    with open(filename, "wb") as file_handle:
+        remaining = size
+        while remaining > 0:
+            file_handle.write(chunk[:remaining])
+            remaining -= len(chunk)
+    mtime = time.time() - age_secs
+    os.utime(filename, (mtime, mtime))
+
+
+def measure(func: Callable[[], Any], prepare: Callable[[], Any], repeats: int) -> float:
+    """Get the best time in seconds of several runs, calling prepare before each run."""
+    best = float("inf")
+    for _ in range(repeats):
+        prepare()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class Environment:
+    """Local and remote files of a benchmark run."""
+
+    def __init__(self, base_dir: str, rclone: str, size: int):
+        """Construct a new instance."""
+        self.base_dir = base_dir
+        self.size = size
+        self.local_file = os.path.join(base_dir, "local", "data.bin")
+        self.remote_file = os.path.join(base_dir, "remote", "bench", "data.bin")
+        os.environ["FAKE_RCLONE_ROOT"] = os.path.join(base_dir, "remote")
+        os.environ["XDG_CACHE_HOME"] = os.path.join(base_dir, "cache")
+
+        self.settings = Settings(os.path.join(base_dir, "settings.json"))
+        self.settings.set_value("rclone", rclone)
+        self.settings.set_value("local_file", self.local_file)
+        self.settings.set_value("remote_dir", "bench:")
+
+    def prepare(self, scenario: str) -> None:
+        """Create the local and the remote file for the scenario."""
+        shutil.rmtree(os.path.join(self.base_dir, "cache"), ignore_errors=True)
+        for filename in os.listdir(os.path.dirname(self.local_file)) \
+                if os.path.exists(os.path.dirname(self.local_file)) else []:
+            os.unlink(os.path.join(os.path.dirname(self.local_file), filename))
+
+        create_file(self.local_file, self.size, 3600.0 if scenario == "download" else 60.0)
+        if scenario in ["in-sync", "in-sync-cached"]:
+            os.makedirs(os.path.dirname(self.remote_file), exist_ok=True)
+            shutil.copy2(self.local_file, self.remote_file)
+        else:
+            create_file(self.remote_file, self.size, 60.0 if scenario == "download" else 3600.0)
+
+        if scenario == "in-sync-cached":
+            Synchronizer(self.settings).run()
+
+
+# -----------------------------------------------------------------------------
+# Benchmarks
+# -----------------------------------------------------------------------------
+def bench_size(env: Environment, rclone: str, repeats: int) -> List[Dict[str, Any]]:
+    """Measure all scenarios and steps for a single file size."""
+    results: List[Dict[str, Any]] = []
+    for scenario in SCENARIOS:
+        duration = measure(lambda: Synchronizer(env.settings).run(),
+                           partial(env.prepare, scenario), repeats)
+        results.append({"size": env.size, "name": f"run/{scenario}", "seconds": duration})
+
+    transport = SubprocessTransport(rclone)
+    tmp_file = os.path.join(env.base_dir, "local", "download.tmp")
+    steps: Dict[str, Callable[[], Any]] = {
+        "hash": lambda: md5_of_file(env.local_file),
+        "stat": lambda: transport.stat("bench:data.bin"),
+        "upload": lambda: transport.upload(env.local_file, "bench:data.bin"),
+        "download": lambda: transport.download("bench:data.bin", tmp_file),
+        "backup": lambda: create_backup(env.local_file, 3),
+    }
+    for name, func in steps.items():
+        duration = measure(func, lambda: env.prepare("upload"), repeats)
+        results.append({"size": env.size, "name": f"step/{name}", "seconds": duration})
+    return results
+
+
+def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Run the benchmark for all file sizes and print the results."""
+    results: List[Dict[str, Any]] = []
+    print(f"{'size':>10} {'benchmark':>22} {'ms':>10} {'MiB/s':>10}")
+    for size_str in args.sizes.split(","):
+        with TemporaryDirectory(dir=args.dir) as tmp_dir:
+            env = Environment(tmp_dir, args.rclone, parse_size(size_str))
+            for result in bench_size(env, args.rclone, args.repeats):
+                result["mib_per_sec"] = result["size"] / (1024 * 1024) / result["seconds"] \
+                    if result["seconds"] > 0 else 0.0
+                print(f"{size_str:>10} {result['name']:>22} {result['seconds'] * 1000:>10.1f} "
+                      f"{result['mib_per_sec']:>10.1f}")
+                results.append(result)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline_file: str, threshold: float) -> int:
+    """Compare the results with a baseline and return the number of regressions."""
+    with open(baseline_file, "r", encoding="UTF-8") as file_handle:
+        baseline = {(result["size"], result["name"]): result["seconds"]
+                    for result in json.load(file_handle)["results"]}
+
+    regressions = 0
+    print(f"\n{'size':>10} {'benchmark':>22} {'change':>10}")
+    for result in results:
+        key = (result["size"], result["name"])
+        if key in baseline and baseline[key] > 0:
+            change = result["seconds"] / baseline[key] - 1.0
+            marker = " REGRESSION" if change > threshold else ""
+            regressions += 1 if marker else 0
+            print(f"{result['size']:>10} {result['name']:>22} {change * 100:>+9.1f}%{marker}")
+    return regressions
+
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1M,64M",
+                        help="Comma separated list of file sizes. Default: %(default)s")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Number of runs of which the best is taken. Default: %(default)s")
+    parser.add_argument("--rclone", default=FAKE_RCLONE,
+                        help="The rclone binary. Default: The fake rclone stand-in.")
+    parser.add_argument("--dir", default=None,
+                        help="Directory for the temporary files, e.g., on the drive to test.")
+    parser.add_argument("--json", default=None,
+                        help="Write the results to this JSON file.")
+    parser.add_argument("--compare", default=None,
+                        help="Compare the results with this JSON file of an earlier run.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown reported as regression. Default: %(default)s")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    if args.json:
+        with open(args.json, "w", encoding="UTF-8") as file_handle:
+            json.dump({"rclone": args.rclone, "results": results}, file_handle, indent=2)
+    if args.compare and compare(results, args.compare, args.threshold) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
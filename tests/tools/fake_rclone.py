@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Stand-in for rclone using a local directory as the remote.
+
+A remote path like ``gdrive:dir/file`` is mapped to the local path
+``$FAKE_RCLONE_ROOT/gdrive/dir/file``. All other paths are local paths.
+The commands used by syncer are supported:
+
+    lsjson [--hash] [--hash-type <type>] [--files-only] <path>
+    md5sum <path>
+    cat <path>
+    copyto <src> <dst>
+    rcat <dst>
+    copy [--files-from <file>] <src dir> <dst dir>
+    sync <src> <dst dir>
+    delete [--files-from <file>] <dir>
+    backend features <path>
+
+The transfer flags --multi-thread-streams, --buffer-size, --drive-chunk-size,
+--s3-chunk-size and --checkers are accepted and ignored.
+
+The exit codes follow rclone, e.g., 1 if the remote is not configured,
+i.e., the directory ``$FAKE_RCLONE_ROOT/<remote>`` does not exist, and 3 if a
+file or directory does not exist.
+
+The behaviour can be configured by the following environment variables:
+
+    FAKE_RCLONE_LATENCY     Delay of every call in seconds.
+    FAKE_RCLONE_BANDWIDTH   Limit of the transfer rate in bytes per second.
+    FAKE_RCLONE_FAIL        Comma separated list of failures to inject, each
+                            given as <command>=<exit code>[@<count>], e.g.,
+                            "copyto=5@2" lets the first two calls of copyto
+                            fail with exit code 5. Use "*" as the command to
+                            match all commands. Without a count, all calls fail.
+    FAKE_RCLONE_LOG         File to append every call to as a JSON line.
+    FAKE_RCLONE_HASHES      Comma separated list of the hash types supported by
+                            the remotes. Default: "md5,sha1".
+"""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, IO, List, Optional, Tuple
+
+if sys.platform == "win32":
+    import msvcrt  # pylint: disable=import-error
+else:
+    import fcntl
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+REMOTE_REGEX = re.compile(r'^([A-Za-z0-9_\-]{2,}):(.*)$')
+OPTIONS_WITH_VALUE = ["--hash-type", "--files-from", "--multi-thread-streams", "--buffer-size",
+                      "--drive-chunk-size", "--s3-chunk-size", "--checkers"]
+
+EXIT_USAGE = 1
+EXIT_NOT_FOUND = 3
+
+BLOCK_SIZE = 64 * 1024
+
+
+# -----------------------------------------------------------------------------
+# Exception
+# -----------------------------------------------------------------------------
+class RcloneError(Exception):
+    """Error terminating rclone with the given exit code."""
+
+    def __init__(self, exit_code: int, message: str):
+        """Construct a new instance."""
+        super().__init__(exit_code, message)
+        self.exit_code = exit_code
+        self.message = message
+
+    def __str__(self) -> str:
+        """Get the description of the error."""
+        return self.message
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def resolve(path: str) -> str:
+    """Map a remote path to the local directory representing the remote."""
+    match = REMOTE_REGEX.match(path)
+    if match is None:
+        return path
+    root = os.environ.get("FAKE_RCLONE_ROOT")
+    if root is None:
+        raise RcloneError(EXIT_USAGE, "Environment variable FAKE_RCLONE_ROOT is not set")
+    if not os.path.isdir(os.path.join(root, match.group(1))):
+        raise RcloneError(EXIT_USAGE, f"didn't find section in config file: {match.group(1)}")
+    return os.path.join(root, match.group(1), match.group(2).lstrip("/"))
+
+
+def parse_args(args: List[str]) -> Tuple[Dict[str, Optional[str]], List[str]]:
+    """Split the arguments into options and positional arguments."""
+    options: Dict[str, Optional[str]] = {}
+    positional: List[str] = []
+    idx = 0
+    while idx < len(args):
+        if args[idx] in OPTIONS_WITH_VALUE:
+            options[args[idx]] = args[idx + 1]
+            idx += 2
+        elif args[idx].startswith("--"):
+            options[args[idx]] = None
+            idx += 1
+        else:
+            positional.append(args[idx])
+            idx += 1
+    return options, positional
+
+
+def get_files_from(options: Dict[str, Optional[str]], directory: str) -> List[str]:
+    """Get the files given by --files-from or all files of the directory."""
+    files_from = options.get("--files-from")
+    if files_from is not None:
+        with open(files_from, "r", encoding="UTF-8") as file_handle:
+            return [line.strip() for line in file_handle if line.strip()]
+    if not os.path.isdir(directory):
+        raise RcloneError(EXIT_NOT_FOUND, f"directory not found: {directory}")
+    return sorted(name for name in os.listdir(directory)
+                  if os.path.isfile(os.path.join(directory, name)))
+
+
+def hash_of_file(filename: str, hash_type: str = "md5") -> str:
+    """Calculate the checksum of a file."""
+    file_hash = hashlib.new(hash_type)
+    with open(filename, "rb") as file_handle:
+        for block in iter(lambda: file_handle.read(1024 * 1024), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def get_hash_types() -> List[str]:
+    """Get the hash types supported by the remotes according to FAKE_RCLONE_HASHES."""
+    return [hash_type.strip() for hash_type in
+            os.environ.get("FAKE_RCLONE_HASHES", "md5,sha1").split(",") if hash_type.strip()]
+
+
+def transfer(src_handle, dst_handle) -> None:
+    """Copy the data limited to the bandwidth given by FAKE_RCLONE_BANDWIDTH."""
+    bandwidth = float(os.environ.get("FAKE_RCLONE_BANDWIDTH", "0"))
+    start = time.monotonic()
+    transferred = 0
+    for block in iter(lambda: src_handle.read(BLOCK_SIZE), b''):
+        dst_handle.write(block)
+        transferred += len(block)
+        if bandwidth > 0:
+            delay = transferred / bandwidth - (time.monotonic() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+
+def copy_file(src: str, dst: str) -> None:
+    """Copy a file including its modification time."""
+    if not os.path.isfile(src):
+        raise RcloneError(EXIT_NOT_FOUND, f"file not found: {src}")
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    with open(src, "rb") as src_handle, open(dst, "wb") as dst_handle:
+        transfer(src_handle, dst_handle)
+    shutil.copystat(src, dst)
+
+
+def get_injected_exit_code(command: str) -> int:
+    """Get the exit code to inject for the command according to FAKE_RCLONE_FAIL.
+
+    The number of calls of every failure with a count is stored in the file
+    ``$FAKE_RCLONE_ROOT/.fake_rclone_state.json``.
+    """
+    failures = [failure.strip() for failure in os.environ.get("FAKE_RCLONE_FAIL", "").split(",")
+                if failure.strip()]
+    for failure in failures:
+        failure_command, _, code_and_count = failure.partition("=")
+        if failure_command not in [command, "*"]:
+            continue
+        exit_code, _, count = code_and_count.partition("@")
+        if not count:
+            return int(exit_code)
+        if increment_call_count(failure) <= int(count):
+            return int(exit_code)
+    return 0
+
+
+def lock_file(file_handle: IO[str]) -> None:
+    """Lock an open file exclusively until it is closed."""
+    if sys.platform == "win32":
+        file_handle.seek(0)
+        msvcrt.locking(file_handle.fileno(), msvcrt.LK_LOCK, 1)
+    else:
+        fcntl.flock(file_handle, fcntl.LOCK_EX)
+
+
+def increment_call_count(failure: str) -> int:
+    """Increment the number of calls matching the failure and return it."""
+    state_file = os.path.join(os.environ.get("FAKE_RCLONE_ROOT", "."), ".fake_rclone_state.json")
+    with open(state_file, "a+", encoding="UTF-8") as file_handle:
+        lock_file(file_handle)
+        file_handle.seek(0)
+        content = file_handle.read()
+        state = json.loads(content) if content else {}
+        state[failure] = state.get(failure, 0) + 1
+        file_handle.seek(0)
+        file_handle.truncate()
+        file_handle.write(json.dumps(state))
+    return state[failure]
+
+
+def get_entry(filename: str, hash_types: List[str]) -> Dict:
+    """Get the lsjson entry of a file."""
+    stat_result = os.stat(filename)
+    mod_time = datetime.fromtimestamp(stat_result.st_mtime_ns // 1000000000, tz=timezone.utc)
+    entry = {"Path": os.path.basename(filename),
+             "Name": os.path.basename(filename),
+             "Size": stat_result.st_size,
+             "MimeType": "application/octet-stream",
+             "ModTime": (mod_time.strftime("%Y-%m-%dT%H:%M:%S")
+                         + f".{stat_result.st_mtime_ns % 1000000000:09d}Z"),
+             "IsDir": False}
+    if hash_types:
+        entry["Hashes"] = {hash_type: hash_of_file(filename, hash_type)
+                           for hash_type in hash_types}
+    return entry
+
+
+# -----------------------------------------------------------------------------
+# Commands
+# -----------------------------------------------------------------------------
+def cmd_lsjson(options: Dict[str, Optional[str]], paths: List[str]) -> None:
+    """List a file or the files of a directory as JSON."""
+    path = resolve(paths[0])
+    hash_types: List[str] = []
+    if "--hash" in options:
+        hash_types = [hash_type for hash_type in get_hash_types()
+                      if options.get("--hash-type") in [None, hash_type]]
+    if os.path.isfile(path):
+        entries = [get_entry(path, hash_types)]
+    elif os.path.isdir(path):
+        entries = [get_entry(os.path.join(path, name), hash_types)
+                   for name in sorted(os.listdir(path))
+                   if os.path.isfile(os.path.join(path, name))]
+    else:
+        raise RcloneError(EXIT_NOT_FOUND, f"directory not found: {paths[0]}")
+    sys.stdout.write(json.dumps(entries) + "\n")
+
+
+def cmd_md5sum(_options: Dict[str, Optional[str]], paths: List[str]) -> None:
+    """Print the md5 checksum of a file."""
+    path = resolve(paths[0])
+    if not os.path.isfile(path):
+        raise RcloneError(EXIT_NOT_FOUND, f"directory not found: {paths[0]}")
+    if "md5" not in get_hash_types():
+        sys.stdout.write(f"{'':32}  {os.path.basename(path)}\n")
+    else:
+        sys.stdout.write(f"{hash_of_file(path)}  {os.path.basename(path)}\n")
+
+
+def cmd_cat(_options: Dict[str, Optional[str]], paths: List[str]) -> None:
+    """Write the content of a file to stdout."""
+    path = resolve(paths[0])
+    if not os.path.isfile(path):
+        raise RcloneError(EXIT_NOT_FOUND, f"directory not found: {paths[0]}")
+    with open(path, "rb") as file_handle:
+        transfer(file_handle, sys.stdout.buffer)
+    sys.stdout.flush()
+
+
+def cmd_copyto(_options: Dict[str, Optional[str]], paths: List[str]) -> None:
+    """Copy a file to the given name."""
+    copy_file(resolve(paths[0]), resolve(paths[1]))
+
+
+def cmd_rcat(_options: Dict[str, Optional[str]], paths: List[str]) -> None:
+    """Write stdin to a file, which is replaced only if stdin was read completely."""
+    dst = resolve(paths[0])
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    with open(f"{dst}.partial", "wb") as dst_handle:
+        transfer(sys.stdin.buffer, dst_handle)
+    os.replace(f"{dst}.partial", dst)
+
+
+def cmd_copy(options: Dict[str, Optional[str]], paths: List[str]) -> None:
+    """Copy the files of a directory into another directory."""
+    src_dir, dst_dir = resolve(paths[0]), resolve(paths[1])
+    for name in get_files_from(options, src_dir):
+        copy_file(os.path.join(src_dir, name), os.path.join(dst_dir, name))
+
+
+def cmd_sync(_options: Dict[str, Optional[str]], paths: List[str]) -> None:
+    """Synchronize a single file into a directory."""
+    src, dst_dir = resolve(paths[0]), resolve(paths[1])
+    if not os.path.isfile(src):
+        raise RcloneError(EXIT_USAGE, f"only single files are supported: {paths[0]}")
+    copy_file(src, os.path.join(dst_dir, os.path.basename(src)))
+
+
+def cmd_delete(options: Dict[str, Optional[str]], paths: List[str]) -> None:
+    """Delete the given files of a directory."""
+    directory = resolve(paths[0])
+    for name in get_files_from(options, directory):
+        filename = os.path.join(directory, name)
+        if os.path.isfile(filename):
+            os.unlink(filename)
+
+
+def cmd_backend(_options: Dict[str, Optional[str]], paths: List[str]) -> None:
+    """Show the features of a remote including the supported hash types."""
+    if paths[0] != "features":
+        raise RcloneError(EXIT_USAGE, f"unsupported backend command {paths[0]}")
+    resolve(paths[1])
+    sys.stdout.write(json.dumps({"Name": paths[1].split(":")[0], "Root": paths[1],
+                                 "Hashes": get_hash_types(), "Features": {}}) + "\n")
+
+
+COMMANDS: Dict[str, Tuple[int, Callable[[Dict[str, Optional[str]], List[str]], None]]] = {
+    "lsjson": (1, cmd_lsjson),
+    "md5sum": (1, cmd_md5sum),
+    "cat": (1, cmd_cat),
+    "copyto": (2, cmd_copyto),
+    "rcat": (1, cmd_rcat),
+    "copy": (2, cmd_copy),
+    "sync": (2, cmd_sync),
+    "delete": (1, cmd_delete),
+    "backend": (2, cmd_backend),
+}
+
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+def main(argv: List[str]) -> int:
+    """Execute a command and return the exit code."""
+    if not argv or argv[0] not in COMMANDS:
+        sys.stderr.write(f"fake rclone: unsupported command {argv[:1]}\n")
+        return EXIT_USAGE
+
+    log_file = os.environ.get("FAKE_RCLONE_LOG")
+    if log_file:
+        with open(log_file, "a", encoding="UTF-8") as file_handle:
+            file_handle.write(json.dumps(argv) + "\n")
+    time.sleep(float(os.environ.get("FAKE_RCLONE_LATENCY", "0")))
+
+    num_paths, command = COMMANDS[argv[0]]
+    options, paths = parse_args(argv[1:])
+    if len(paths) != num_paths:
+        sys.stderr.write(f"fake rclone: {argv[0]} requires {num_paths} path(s)\n")
+        return EXIT_USAGE
+    try:
+        exit_code = get_injected_exit_code(argv[0])
+        if exit_code:
+            raise RcloneError(exit_code, f"injected failure of {argv[0]}")
+        command(options, paths)
+    except RcloneError as rclone_error:
+        sys.stderr.write(f"fake rclone: {rclone_error}\n")
+        return rclone_error.exit_code
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
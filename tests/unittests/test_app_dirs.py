@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.app_dirs module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from syncer_mods.app_dirs import load_json, save_json
+
+
+# -----------------------------------------------------------------------------
+# Test Classes
+# -----------------------------------------------------------------------------
+class JsonFileTest(TestCase):
+    """Test the :func:`syncer_mods.app_dirs.save_json` and ``load_json`` functions."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.filename = os.path.join(self.tmp_dir.name, "sub", "file.json")
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.tmp_dir.cleanup()
+
+    def test_save_and_load(self):
+        """save_json: The directory is created and no temporary file is left."""
+        save_json(self.filename, {"key": [1, 2]}, indent=2)
+        self.assertEqual(load_json(self.filename), {"key": [1, 2]})
+        save_json(self.filename, ["replaced"])
+        self.assertEqual(load_json(self.filename), ["replaced"])
+        self.assertEqual(os.listdir(os.path.dirname(self.filename)), ["file.json"])
+
+    def test_load_errors(self):
+        """load_json: Missing and corrupted files raise an error."""
+        self.assertRaises(OSError, load_json, self.filename)
+        os.makedirs(os.path.dirname(self.filename))
+        with open(self.filename, 'w', encoding='UTF-8') as file_handle:
+            file_handle.write('{"key": ')
+        self.assertRaises(ValueError, load_json, self.filename)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.application module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import sys
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from PyQt5.QtWidgets import QApplication
+
+import mock
+
+from syncer_mods.application import Application
+from syncer_mods.rclone_rc import RcTransport
+from syncer_mods.settings import Settings
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class ApplicationTest(TestCase):
+    """Test the :class:`syncer_mods.application.Application` class."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.env_patcher = mock.patch.dict(os.environ,
+                                           {"XDG_CACHE_HOME": os.path.join(self.tmp_dir.name,
+                                                                           "cache")})
+        self.env_patcher.start()
+        settings = Settings(os.path.join(self.tmp_dir.name, "settings.json"))
+        self.settings_patcher = mock.patch("syncer_mods.application.Settings",
+                                           return_value=settings)
+        self.settings_patcher.start()
+        self.app = QApplication(sys.argv)
+
+    def tearDown(self):
+        """Clean up after a test."""
+        del self.app
+        self.settings_patcher.stop()
+        self.env_patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def test_quit_stops_daemon(self):
+        """Application: Quitting closes the transport and thereby stops the rclone daemon."""
+        application = Application(self.app)
+        transport = mock.Mock(spec=RcTransport)
+        application.synchronizer.synchronizer.transport = transport
+        self.app.aboutToQuit.emit()
+        transport.close.assert_called_once_with()
+        self.assertIsNone(application.synchronizer.synchronizer.transport)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.backup module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import mock
+
+from syncer_mods.backup import create_backup
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class CreateBackupTest(TestCase):
+    """Test the :func:`syncer_mods.backup.create_backup` function."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.filename = os.path.join(self.tmp_dir.name, "file")
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.tmp_dir.cleanup()
+
+    def _write(self, filename, content):
+        """Replace a file like a download does."""
+        with open(filename + ".tmp", 'w', encoding="UTF-8") as file_handle:
+            file_handle.write(content)
+        os.replace(filename + ".tmp", filename)
+
+    def _read(self, filename):
+        """Read a file."""
+        with open(filename, 'r', encoding="UTF-8") as file_handle:
+            return file_handle.read()
+
+    def test_rotation(self):
+        """create_backup: Backups are rotated and limited to the count."""
+        for version in range(5):
+            create_backup(self.filename, 3)
+            self._write(self.filename, f"version {version}")
+        self.assertEqual(self._read(self.filename), "version 4")
+        self.assertEqual(self._read(self.filename + ".bak"), "version 3")
+        self.assertEqual(self._read(self.filename + ".bak.1"), "version 2")
+        self.assertEqual(self._read(self.filename + ".bak.2"), "version 1")
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)),
+                         ["file", "file.bak", "file.bak.1", "file.bak.2"])
+
+    def test_hardlink(self):
+        """create_backup: The backup is a hardlink of the original file."""
+        self._write(self.filename, "data")
+        create_backup(self.filename, 1)
+        self.assertEqual(os.stat(self.filename).st_ino, os.stat(self.filename + ".bak").st_ino)
+
+    def test_copy_fallback(self):
+        """create_backup: The file is copied if hardlinks are not supported."""
+        self._write(self.filename, "data")
+        with mock.patch("os.link", side_effect=OSError("Not supported")):
+            create_backup(self.filename, 1)
+        self.assertEqual(self._read(self.filename + ".bak"), "data")
+
+    def test_no_backups(self):
+        """create_backup: A count of zero removes all backups."""
+        self._write(self.filename, "data")
+        create_backup(self.filename, 2)
+        create_backup(self.filename, 2)
+        create_backup(self.filename, 0)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["file"])
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.chunk_store module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import hashlib
+import os
+import random
+import shutil
+import subprocess
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import mock
+
+from syncer_mods import chunk_store
+from syncer_mods.chunk_store import ChunkStore, Manifest, chunk_file
+from syncer_mods.transfer import TransferParams
+
+
+# -----------------------------------------------------------------------------
+# Mock Classes
+# -----------------------------------------------------------------------------
+class FakeRemote:
+    """Emulation of the rclone commands used by the chunk store on a local directory."""
+
+    def __init__(self, root_dir):
+        """Construct a new instance."""
+        self.root_dir = root_dir
+        self.copied_files = []
+
+    def _path(self, name):
+        """Map a remote or local name to a local path."""
+        if name.startswith("remote:"):
+            return os.path.join(self.root_dir, name[len("remote:"):])
+        return name
+
+    def check_output(self, args):
+        """Emulate rclone cat."""
+        assert args[1] == "cat"
+        try:
+            with open(self._path(args[2]), "r", encoding="UTF-8") as file_handle:
+                return file_handle.read()
+        except FileNotFoundError:
+            raise subprocess.CalledProcessError(3, args) from None
+
+    def check_call(self, args):
+        """Emulate rclone copy, copyto and delete."""
+        command, args = args[1], args[2:]
+        files_from = None
+        if args[0] == "--files-from":
+            with open(args[1], "r", encoding="UTF-8") as file_handle:
+                files_from = file_handle.read().split()
+            args = args[2:]
+
+        if command == "copyto":
+            os.makedirs(os.path.dirname(self._path(args[1])), exist_ok=True)
+            shutil.copyfile(self._path(args[0]), self._path(args[1]))
+        elif command == "copy":
+            src_dir, dst_dir = self._path(args[0]), self._path(args[1])
+            os.makedirs(dst_dir, exist_ok=True)
+            for name in files_from if files_from is not None else os.listdir(src_dir):
+                shutil.copyfile(os.path.join(src_dir, name), os.path.join(dst_dir, name))
+                self.copied_files.append(name)
+        elif command == "delete":
+            for name in files_from:
+                os.unlink(os.path.join(self._path(args[0]), name))
+        return 0
+
+
+# -----------------------------------------------------------------------------
+# Test Classes
+# -----------------------------------------------------------------------------
+class ChunkFileTest(TestCase):
+    """Test the :func:`syncer_mods.chunk_store.chunk_file` function."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.random = random.Random(42)
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.tmp_dir.cleanup()
+
+    def _create_file(self, content):
+        """Create a file with the given content."""
+        filename = os.path.join(self.tmp_dir.name, "file")
+        with open(filename, 'wb') as file_handle:
+            file_handle.write(content)
+        return filename
+
+    def test_chunks_cover_file(self):
+        """chunk_file: Chunks cover the whole file and the md5 is correct."""
+        data = self.random.randbytes(100000)
+        manifest, offsets = chunk_file(self._create_file(data), 1024)
+        self.assertEqual(manifest.size, len(data))
+        self.assertEqual(manifest.md5, hashlib.md5(data).hexdigest())
+        self.assertGreater(len(manifest.chunks), 10)
+        for (digest, length), offset in zip(manifest.chunks, offsets):
+            self.assertLessEqual(length, 4096)
+            self.assertEqual(hashlib.sha256(data[offset:offset + length]).hexdigest(), digest)
+        self.assertEqual(sum(length for _, length in manifest.chunks), len(data))
+
+    def test_insertion_is_local(self):
+        """chunk_file: An insertion changes only the chunks around it."""
+        data = self.random.randbytes(100000)
+        old_manifest, _ = chunk_file(self._create_file(data), 1024)
+        new_manifest, _ = chunk_file(self._create_file(data[:50000] + b'x' + data[50000:]),
+                                     1024)
+        old_chunks = {digest for digest, _ in old_manifest.chunks}
+        new_chunks = [digest for digest, _ in new_manifest.chunks if digest not in old_chunks]
+        self.assertLessEqual(len(new_chunks), 2)
+
+    def test_previous_manifest(self):
+        """chunk_file: Unchanged leading chunks of a previous manifest are not scanned again."""
+        data = self.random.randbytes(100000)
+        old_manifest, _ = chunk_file(self._create_file(data), 1024)
+        filename = self._create_file(data[:60000] + b'x' + data[60000:])
+        original = chunk_store._find_boundary   # pylint: disable=protected-access
+        with mock.patch("syncer_mods.chunk_store._find_boundary", wraps=original) as find_boundary:
+            self.assertEqual(chunk_file(filename, 1024, old_manifest), chunk_file(filename, 1024))
+        self.assertGreater(find_boundary.call_args_list[0][0][1], 50000)
+
+        # The last chunk is scanned again as it might have been cut by the end of the file
+        filename = self._create_file(data + b'appended')
+        self.assertEqual(chunk_file(filename, 1024, old_manifest), chunk_file(filename, 1024))
+        filename = self._create_file(b'short')
+        self.assertEqual(chunk_file(filename, 1024, old_manifest), chunk_file(filename, 1024))
+
+    def test_empty_file(self):
+        """chunk_file: Empty file."""
+        manifest, offsets = chunk_file(self._create_file(b''))
+        self.assertEqual(manifest.chunks, [])
+        self.assertEqual(offsets, [])
+        self.assertEqual(manifest.md5, hashlib.md5().hexdigest())
+
+    def test_manifest_json(self):
+        """Manifest: Conversion to and from JSON."""
+        manifest, _ = chunk_file(self._create_file(self.random.randbytes(5000)), 1024)
+        self.assertEqual(Manifest.from_json(manifest.to_json()), manifest)
+
+
+class ChunkStoreTest(TestCase):
+    """Test the :class:`syncer_mods.chunk_store.ChunkStore` class."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.env_patcher = mock.patch.dict(os.environ,
+                                           {"XDG_CACHE_HOME": os.path.join(self.tmp_dir.name,
+                                                                           "cache")})
+        self.env_patcher.start()
+        os.makedirs(os.path.join(self.tmp_dir.name, "remote"))
+        os.makedirs(os.path.join(self.tmp_dir.name, "local"))
+        self.remote = FakeRemote(os.path.join(self.tmp_dir.name, "remote"))
+        self.patchers = [mock.patch("syncer_mods.chunk_store.check_call",
+                                    side_effect=self.remote.check_call),
+                         mock.patch("syncer_mods.chunk_store.check_output",
+                                    side_effect=self.remote.check_output)]
+        for patcher in self.patchers:
+            patcher.start()
+        self.chunk_store = ChunkStore("rclone", "remote:file", 1024)
+        self.local_file = os.path.join(self.tmp_dir.name, "local", "file")
+        self.random = random.Random(42)
+
+    def tearDown(self):
+        """Clean up after a test."""
+        for patcher in self.patchers:
+            patcher.stop()
+        self.env_patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def _write(self, content):
+        """Write the local file."""
+        with open(self.local_file, 'wb') as file_handle:
+            file_handle.write(content)
+
+    def _read(self):
+        """Read the local file."""
+        with open(self.local_file, 'rb') as file_handle:
+            return file_handle.read()
+
+    def test_no_manifest(self):
+        """ChunkStore: Missing manifest."""
+        self.assertIsNone(self.chunk_store.get_manifest())
+
+    def test_upload_only_new_chunks(self):
+        """ChunkStore: Appending data uploads only the new chunks."""
+        data = self.random.randbytes(100000)
+        self._write(data)
+        self.chunk_store.upload(self.local_file, None)
+        manifest = self.chunk_store.get_manifest()
+        self.assertEqual(manifest.md5, hashlib.md5(data).hexdigest())
+        num_uploaded = len(self.remote.copied_files)
+
+        self.remote.copied_files = []
+        self._write(data + self.random.randbytes(1000))
+        transferred = self.chunk_store.upload(self.local_file, manifest)
+        self.assertLessEqual(len(self.remote.copied_files), 3)
+        self.assertLess(transferred, 10000)
+        self.assertGreater(num_uploaded, 10)
+
+    def test_unused_chunks_deleted(self):
+        """ChunkStore: Chunks not referenced anymore are deleted on the remote."""
+        self._write(self.random.randbytes(20000))
+        self.chunk_store.upload(self.local_file, None)
+        manifest = self.chunk_store.get_manifest()
+        self._write(self.random.randbytes(20000))
+        self.chunk_store.upload(self.local_file, manifest)
+        new_manifest = self.chunk_store.get_manifest()
+        self.assertEqual(sorted(os.listdir(os.path.join(self.remote.root_dir, "file.chunks"))),
+                         sorted({digest for digest, _ in new_manifest.chunks}))
+
+    def test_download_rebuilds_file(self):
+        """ChunkStore: Download transfers only missing chunks and rebuilds the file."""
+        data = self.random.randbytes(100000)
+        new_data = data[:30000] + b'inserted' + data[30000:]
+        self._write(new_data)
+        self.chunk_store.upload(self.local_file, None)
+        manifest = self.chunk_store.get_manifest()
+
+        self._write(data)
+        self.remote.copied_files = []
+        self.chunk_store.download(self.local_file, manifest)
+        self.assertEqual(self._read(), new_data)
+        self.assertLessEqual(len(self.remote.copied_files), 2)
+        self.assertEqual(os.listdir(os.path.dirname(self.local_file)), ["file"])
+
+    def test_call_and_transfer_params(self):
+        """ChunkStore: All rclone calls use the call function and transfers the parameters."""
+        calls = []
+        store = ChunkStore("rclone", "remote:file", 1024,
+                           lambda func, *args: calls.append(func.__name__) or func(*args))
+        store.set_transfer_params(TransferParams(multi_thread_streams=4))
+        self._write(self.random.randbytes(5000))
+        with mock.patch("syncer_mods.chunk_store.check_call") as check_call_mock:
+            store.upload(self.local_file, store.get_manifest())
+        self.assertEqual(calls, ["_read_manifest", "_run_rclone", "_run_rclone"])
+        self.assertEqual(check_call_mock.call_args_list[0][0][0][:4],
+                         ["rclone", "copy", "--multi-thread-streams", "4"])
+
+    def test_unchanged_file_not_chunked(self):
+        """ChunkStore: An unchanged local file is not chunked again."""
+        self._write(self.random.randbytes(20000))
+        self.chunk_store.upload(self.local_file, None)
+        manifest = self.chunk_store.get_manifest()
+        shutil.rmtree(os.path.join(self.remote.root_dir, "file.chunks"))
+        with mock.patch("syncer_mods.chunk_store._find_boundary") as find_boundary:
+            self.chunk_store.upload(self.local_file, None)
+        find_boundary.assert_not_called()
+        self.assertEqual(self.chunk_store.get_manifest(), manifest)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.remote.root_dir, "file.chunks"))),
+                         sorted({digest for digest, _ in manifest.chunks}))
+
+    def test_local_md5_reused(self):
+        """ChunkStore: The md5 of a modified file is computed while chunking it only once."""
+        self.assertIsNone(self.chunk_store.get_local_md5(self.local_file))
+        data = self.random.randbytes(20000)
+        self._write(data)
+        self.chunk_store.upload(self.local_file, None)
+        manifest = self.chunk_store.get_manifest()
+
+        self._write(data + b'appended')
+        self.assertEqual(self.chunk_store.get_local_md5(self.local_file),
+                         hashlib.md5(data + b'appended').hexdigest())
+        with mock.patch("syncer_mods.chunk_store._find_boundary") as find_boundary:
+            self.chunk_store.upload(self.local_file, manifest)
+        find_boundary.assert_not_called()
+        self.assertEqual(self.chunk_store.get_manifest().md5,
+                         hashlib.md5(data + b'appended').hexdigest())
+
+    def test_download_without_local(self):
+        """ChunkStore: Download without a local file."""
+        data = self.random.randbytes(10000)
+        self._write(data)
+        self.chunk_store.upload(self.local_file, None)
+        os.unlink(self.local_file)
+        self.chunk_store.download(self.local_file, self.chunk_store.get_manifest())
+        self.assertEqual(self._read(), data)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.cli module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import json
+import os
+import subprocess
+import sys
+import threading
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import mock
+
+from syncer_mods.cli import main, run_daemon
+from syncer_mods.settings import SyncProfile
+from syncer_mods.synchronizer import SyncResult
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class CliTest(TestCase):
+    """Test the :mod:`syncer_mods.cli` module."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.config = os.path.join(self.tmp_dir.name, "settings.json")
+        with open(self.config, 'w', encoding="UTF-8") as file_handle:
+            json.dump({"local_file": "file", "remote_dir": "remote:"}, file_handle)
+        self.profile = SyncProfile("file", "remote:")
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.tmp_dir.cleanup()
+
+    def _main(self, argv, results):
+        """Run main with a mocked synchronizer returning the results."""
+        with mock.patch("syncer_mods.cli.Synchronizer") as synchronizer_mock:
+            synchronizer_mock.return_value.run.return_value = results
+            exit_code = main(["--config", self.config] + argv)
+        settings = synchronizer_mock.call_args[0][0]
+        self.assertEqual(settings.get_value("local_file"), "file")
+        synchronizer_mock.return_value.close.assert_called_once_with()
+        return exit_code, synchronizer_mock.return_value
+
+    def test_sync_once(self):
+        """main: Command sync-once returns 1 on errors."""
+        exit_code, synchronizer = self._main(["sync-once"], [SyncResult(self.profile, "local")])
+        self.assertEqual(exit_code, 0)
+        synchronizer.run.assert_called_once_with()
+        exit_code, _ = self._main(["sync-once"], [SyncResult(self.profile, error="Failed")])
+        self.assertEqual(exit_code, 1)
+
+    def test_status(self):
+        """main: Command status performs a dry run."""
+        exit_code, synchronizer = self._main(["status"], [SyncResult(self.profile)])
+        self.assertEqual(exit_code, 0)
+        synchronizer.run.assert_called_once_with(dry_run=True)
+        exit_code, _ = self._main(["status"], [SyncResult(self.profile, "remote")])
+        self.assertEqual(exit_code, 2)
+
+    def test_daemon(self):
+        """run_daemon: Synchronizes until the stop event is set."""
+        stop_event = threading.Event()
+        synchronizer = mock.MagicMock()
+        synchronizer.run.side_effect = lambda: [SyncResult(self.profile)] \
+            if synchronizer.run.call_count < 3 else stop_event.set() or []
+        self.assertEqual(run_daemon(synchronizer, 0.01, 0.02, stop_event), 0)
+        self.assertEqual(synchronizer.run.call_count, 3)
+
+    def test_no_qt_import(self):
+        """cli: Importing the command line interface does not import Qt."""
+        code = ("import sys, syncer_mods.cli; "
+                "sys.exit(any(name.startswith('PyQt5') for name in sys.modules))")
+        self.assertEqual(subprocess.call([sys.executable, "-c", code],
+                                         cwd=os.path.dirname(os.path.dirname(
+                                             os.path.dirname(os.path.abspath(__file__))))), 0)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Tests of syncer against the rclone stand-in tests/tools/fake_rclone.py."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipIf
+
+import mock
+
+from syncer_mods.hashing import hash_file
+from syncer_mods.rclone import RemoteStat
+from syncer_mods.settings import Settings
+from syncer_mods.synchronizer import Synchronizer, md5_of_file
+from syncer_mods.transport import SubprocessTransport
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+FAKE_RCLONE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "tools", "fake_rclone.py")
+
+
+# -----------------------------------------------------------------------------
+# Test Classes
+# -----------------------------------------------------------------------------
+class FakeRcloneTest(TestCase):
+    """Test the configuration of the fake rclone."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        os.makedirs(os.path.join(self.tmp_dir.name, "remote"))
+        self.env = dict(os.environ, FAKE_RCLONE_ROOT=self.tmp_dir.name)
+        self.local_file = os.path.join(self.tmp_dir.name, "file")
+        with open(self.local_file, 'wb') as file_handle:
+            file_handle.write(b'x' * 100000)
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.tmp_dir.cleanup()
+
+    def _call(self, *args, **env):
+        """Call the fake rclone and return the exit code."""
+        return subprocess.call([sys.executable, FAKE_RCLONE] + list(args),
+                               env=dict(self.env, **env), stderr=subprocess.DEVNULL)
+
+    def test_commands(self):
+        """fake_rclone: Copy and list a file."""
+        self.assertEqual(self._call("copyto", self.local_file, "remote:dir/file"), 0)
+        output = subprocess.check_output(
+            [sys.executable, FAKE_RCLONE, "lsjson", "--hash", "remote:dir/file"], env=self.env)
+        entry = json.loads(output)[0]
+        self.assertEqual(entry["Size"], 100000)
+        self.assertEqual(entry["Hashes"]["md5"], md5_of_file(self.local_file))
+        self.assertEqual(self._call("lsjson", "remote:missing"), 3)
+        self.assertEqual(self._call("lsjson", "unknown:file"), 1)
+
+    def test_latency_and_bandwidth(self):
+        """fake_rclone: Latency and bandwidth limit delay the calls."""
+        start = time.monotonic()
+        self._call("copyto", self.local_file, "remote:file", FAKE_RCLONE_LATENCY="0.2",
+                   FAKE_RCLONE_BANDWIDTH="500000")
+        self.assertGreaterEqual(time.monotonic() - start, 0.35)
+
+    def test_failure_injection(self):
+        """fake_rclone: Failures are injected for the given number of calls."""
+        fail = {"FAKE_RCLONE_FAIL": "copyto=5@2,lsjson=7"}
+        self.assertEqual(self._call("copyto", self.local_file, "remote:file", **fail), 5)
+        self.assertEqual(self._call("copyto", self.local_file, "remote:file", **fail), 5)
+        self.assertEqual(self._call("copyto", self.local_file, "remote:file", **fail), 0)
+        self.assertEqual(self._call("lsjson", "remote:file", **fail), 7)
+        self.assertEqual(self._call("cat", "remote:file", FAKE_RCLONE_FAIL="*=8"), 8)
+
+
+@skipIf(sys.platform == "win32", "The fake rclone is not executable on Windows.")
+class SynchronizerFakeRcloneTest(TestCase):
+    """Test the :class:`syncer_mods.synchronizer.Synchronizer` class with the fake rclone."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.env_patcher = mock.patch.dict(os.environ, {
+            "FAKE_RCLONE_ROOT": os.path.join(self.tmp_dir.name, "remote"),
+            "XDG_CACHE_HOME": os.path.join(self.tmp_dir.name, "cache")})
+        self.env_patcher.start()
+        os.makedirs(os.path.join(self.tmp_dir.name, "remote", "remote"))
+        self.local_file = os.path.join(self.tmp_dir.name, "file")
+        self.remote_file = os.path.join(self.tmp_dir.name, "remote", "remote", "file")
+        self.settings = Settings(os.path.join(self.tmp_dir.name, "settings.json"))
+        self.settings.set_value("rclone", FAKE_RCLONE)
+        self.settings.set_value("local_file", self.local_file)
+        self.settings.set_value("remote_dir", "remote:")
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.env_patcher.stop()
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def _write(filename, content, age_secs):
+        """Write a file with a modification time in the past."""
+        with open(filename, 'wb') as file_handle:
+            file_handle.write(content)
+        mtime = time.time() - age_secs
+        os.utime(filename, (mtime, mtime))
+
+    def test_upload_and_download(self):
+        """Synchronizer: Upload and download with the fake rclone."""
+        self._write(self.local_file, b'local', 60.0)
+        self._write(self.remote_file, b'remote', 3600.0)
+        results = Synchronizer(self.settings).run()
+        self.assertEqual(results[0].direction, "local")
+        self.assertEqual(md5_of_file(self.remote_file), md5_of_file(self.local_file))
+
+        self._write(self.remote_file, b'newer remote', 10.0)
+        results = Synchronizer(self.settings).run()
+        self.assertEqual(results[0].direction, "remote")
+        self.assertEqual(md5_of_file(self.local_file), md5_of_file(self.remote_file))
+        self.assertEqual(Synchronizer(self.settings).run()[0].direction, None)
+
+    def test_streaming_upload(self):
+        """Synchronizer: A local modification is uploaded by streaming without hashing first."""
+        self.settings.set_value("upload_mode", "stream")
+        self._write(self.local_file, b'data', 60.0)
+        self._write(self.remote_file, b'data', 3600.0)
+        self.assertEqual(Synchronizer(self.settings).run()[0].direction, None)
+
+        self._write(self.local_file, b'modified data', 30.0)
+        result = Synchronizer(self.settings).run()[0]
+        self.assertEqual((result.direction, result.error), ("local", None))
+        self.assertNotIn("local_hash", result.metrics.timings)
+        self.assertEqual(result.metrics.local_md5, md5_of_file(self.local_file))
+        self.assertEqual(md5_of_file(self.remote_file), md5_of_file(self.local_file))
+        self.assertEqual(Synchronizer(self.settings).run()[0].direction, None)
+
+    def test_sampled_precheck(self):
+        """Synchronizer: A touched file is hashed if the sampled pre-check finds no change."""
+        self.settings.set_value("upload_mode", "stream")
+        self._write(self.local_file, b'data', 60.0)
+        self._write(self.remote_file, b'data', 3600.0)
+        self.assertEqual(Synchronizer(self.settings).run()[0].direction, None)
+
+        self._write(self.local_file, b'data', 30.0)
+        result = Synchronizer(self.settings).run()[0]
+        self.assertEqual((result.direction, result.error), (None, None))
+        self.assertIn("local_fingerprint", result.metrics.timings)
+        self.assertIn("local_hash", result.metrics.timings)
+
+        self._write(self.local_file, b'more data', 20.0)
+        result = Synchronizer(self.settings).run()[0]
+        self.assertEqual((result.direction, result.error), ("local", None))
+        self.assertNotIn("local_hash", result.metrics.timings)
+        self.assertEqual(md5_of_file(self.remote_file), md5_of_file(self.local_file))
+
+    def test_step_timeout(self):
+        """Synchronizer: A hanging rclone is killed after the step timeout."""
+        self._write(self.local_file, b'local', 60.0)
+        self._write(self.remote_file, b'remote', 3600.0)
+        self.settings.set_value("step_timeout_secs", 1)
+        with mock.patch.dict(os.environ, {"FAKE_RCLONE_LATENCY": "30"}):
+            result = Synchronizer(self.settings).run()[0]
+        self.assertRegex(result.error, "RClone did not finish within 1.0 seconds!")
+        self.assertLess(result.duration_secs, 10.0)
+
+    def test_cancel(self):
+        """Synchronizer: Cancel kills the running rclone."""
+        self._write(self.local_file, b'local', 60.0)
+        self._write(self.remote_file, b'remote', 3600.0)
+        synchronizer = Synchronizer(self.settings)
+        timer = threading.Timer(0.5, synchronizer.cancel)
+        timer.start()
+        with mock.patch.dict(os.environ, {"FAKE_RCLONE_LATENCY": "30"}):
+            result = synchronizer.run()[0]
+        timer.join()
+        self.assertEqual(result.error, "Synchronization was cancelled!")
+        self.assertLess(result.duration_secs, 10.0)
+        self.assertEqual(synchronizer.run()[0].direction, "local")
+
+    def test_retry(self):
+        """Synchronizer: Temporary errors are retried and counted."""
+        self._write(self.local_file, b'local', 60.0)
+        self._write(self.remote_file, b'remote', 3600.0)
+        self.settings.set_value("retry_delay_secs", 0.01)
+        with mock.patch.dict(os.environ, {"FAKE_RCLONE_FAIL": "lsjson=5@2,sync=5@1"}):
+            result = Synchronizer(self.settings).run()[0]
+        self.assertEqual((result.direction, result.error), ("local", None))
+        self.assertEqual(result.metrics.retries, 3)
+        self.assertEqual(result.get_record()["retries"], 3)
+
+        with mock.patch.dict(os.environ, {"FAKE_RCLONE_FAIL": "lsjson=5@5"}):
+            result = Synchronizer(self.settings).run()[0]
+        self.assertRegex(result.error, "RClone returned exit code 5!")
+        self.assertEqual(result.metrics.retries, 3)
+
+    def test_circuit_breaker(self):
+        """Synchronizer: A failing remote is skipped until the circuit breaker resets."""
+        self._write(self.local_file, b'local', 60.0)
+        self._write(self.remote_file, b'remote', 3600.0)
+        self.settings.set_value("circuit_breaker_threshold", 2)
+        self.settings.set_value("circuit_breaker_reset_secs", 1)
+        synchronizer = Synchronizer(self.settings)
+        log_file = os.path.join(self.tmp_dir.name, "calls.log")
+        with mock.patch.dict(os.environ, {"FAKE_RCLONE_FAIL": "*=7",
+                                          "FAKE_RCLONE_LOG": log_file}):
+            self.assertRegex(synchronizer.run()[0].error, "RClone returned exit code 7!")
+            self.assertRegex(synchronizer.run()[0].error, "RClone returned exit code 7!")
+            self.assertRegex(synchronizer.run()[0].error,
+                             "Remote remote failed 2 times in a row, skipping it")
+        with open(log_file, 'r', encoding="UTF-8") as file_handle:
+            self.assertEqual(len(file_handle.readlines()), 2)
+
+        time.sleep(1.0)
+        self.assertEqual(synchronizer.run()[0].direction, "local")
+
+    def test_hash_negotiation(self):
+        """Synchronizer: The hash type is negotiated once per remote."""
+        self._write(self.local_file, b'data', 60.0)
+        self._write(self.remote_file, b'data', 3600.0)
+        synchronizer = Synchronizer(self.settings)
+        log_file = os.path.join(self.tmp_dir.name, "calls.log")
+        with mock.patch.dict(os.environ, {"FAKE_RCLONE_HASHES": "sha1",
+                                          "FAKE_RCLONE_LOG": log_file}):
+            result = synchronizer.run()[0]
+            self.assertEqual((result.direction, result.error), (None, None))
+            self.assertEqual(result.metrics.hash_type, "sha1")
+            self.assertEqual(result.metrics.local_md5, hash_file(self.local_file, "sha1"))
+            self.assertEqual(result.get_record()["hash_type"], "sha1")
+
+            self._write(self.local_file, b'modified data', 30.0)
+            self.assertEqual(synchronizer.run()[0].direction, "local")
+            self.assertEqual(hash_file(self.remote_file), hash_file(self.local_file))
+        with open(log_file, 'r', encoding="UTF-8") as file_handle:
+            calls = [json.loads(line)[0] for line in file_handle]
+        self.assertEqual(calls.count("backend"), 1)
+
+    def test_transfer_flags(self):
+        """Synchronizer: The flags of the transfer profile are passed to rclone."""
+        self._write(self.local_file, b'local', 60.0)
+        self._write(self.remote_file, b'remote', 3600.0)
+        self.settings.set_value("transfer_profile", "low_memory")
+        log_file = os.path.join(self.tmp_dir.name, "calls.log")
+        with mock.patch.dict(os.environ, {"FAKE_RCLONE_LOG": log_file}):
+            result = Synchronizer(self.settings).run()[0]
+        self.assertEqual((result.direction, result.error), ("local", None))
+        self.assertEqual(result.metrics.transfer_profile, "low_memory")
+        with open(log_file, 'r', encoding="UTF-8") as file_handle:
+            calls = [json.loads(line) for line in file_handle]
+        copy_call = [call for call in calls if call[0] == "sync"][0]
+        self.assertIn("--multi-thread-streams", copy_call)
+        self.assertEqual(copy_call[copy_call.index("--buffer-size") + 1], "4M")
+
+    def test_no_common_hash_type(self):
+        """Synchronizer: Without a common hash type, the modification times are compared."""
+        self._write(self.local_file, b'local', 60.0)
+        self._write(self.remote_file, b'remote', 3600.0)
+        with mock.patch.dict(os.environ, {"FAKE_RCLONE_HASHES": "crc32"}):
+            result = Synchronizer(self.settings).run()[0]
+        self.assertEqual((result.direction, result.error), ("local", None))
+        self.assertEqual(result.metrics.hash_type, "md5")
+        self.assertIsNone(result.metrics.remote_md5)
+
+    def test_upload_stream(self):
+        """SubprocessTransport: Streaming upload returns the md5 and reports errors."""
+        self._write(self.local_file, b'local data', 60.0)
+        transport = SubprocessTransport(FAKE_RCLONE)
+        self.assertEqual(transport.upload_stream(self.local_file, "remote:file", 4),
+                         md5_of_file(self.local_file))
+        self.assertEqual(md5_of_file(self.remote_file), md5_of_file(self.local_file))
+        with mock.patch.dict(os.environ, {"FAKE_RCLONE_FAIL": "rcat=5"}):
+            self.assertRaisesRegex(Exception, "RClone returned exit code 5!",
+                                   transport.upload_stream, self.local_file, "remote:file")
+        with mock.patch.object(transport, "stat", return_value=RemoteStat(
+                10, datetime.now(tz=timezone.utc), {"md5": "0" * 32})):
+            self.assertRaisesRegex(Exception, "Verification of uploaded file remote:file failed!",
+                                   transport.upload_stream, self.local_file, "remote:file")
+
+    def test_upload_stream_sha1(self):
+        """SubprocessTransport: Streaming upload verifies the negotiated hash type."""
+        self._write(self.local_file, b'local data', 60.0)
+        transport = SubprocessTransport(FAKE_RCLONE)
+        with mock.patch.dict(os.environ, {"FAKE_RCLONE_HASHES": "sha1"}):
+            self.assertEqual(transport.get_hash_types("remote:"), ["sha1"])
+            self.assertEqual(transport.upload_stream(self.local_file, "remote:file", 4, "sha1"),
+                             hash_file(self.local_file, "sha1"))
+
+    def test_download_stream(self):
+        """SubprocessTransport: Streaming download returns the md5 and reports errors."""
+        self._write(self.remote_file, b'remote data', 3600.0)
+        transport = SubprocessTransport(FAKE_RCLONE)
+        self.assertEqual(transport.download_stream("remote:file", self.local_file, 4),
+                         md5_of_file(self.remote_file))
+        self.assertEqual(md5_of_file(self.local_file), md5_of_file(self.remote_file))
+        self.assertRaisesRegex(Exception, "RClone returned exit code 3!",
+                               transport.download_stream, "remote:missing", self.local_file)
+
+    def test_transport_errors(self):
+        """SubprocessTransport: Exit codes are reported."""
+        self._write(self.remote_file, b'remote', 3600.0)
+        transport = SubprocessTransport(FAKE_RCLONE)
+        with mock.patch.dict(os.environ, {"FAKE_RCLONE_FAIL": "copyto=5"}):
+            self.assertRaisesRegex(Exception, "RClone returned exit code 5!",
+                                   transport.download, "remote:file", self.local_file)
+        self.assertRaisesRegex(Exception, "Remote file .* does not exist!",
+                               transport.stat, "remote:missing")
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.file_watcher module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import sys
+import time
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from PyQt5.QtTest import QSignalSpy, QTest
+from PyQt5.QtWidgets import QApplication
+
+from syncer_mods.file_watcher import FileWatcher
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class FileWatcherTest(TestCase):
+    """Test the :class:`syncer_mods.file_watcher.FileWatcher` class."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.app = QApplication(sys.argv)
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.filename = os.path.join(self.tmp_dir.name, "file")
+        self._write(self.filename, b'data')
+        self.watcher = FileWatcher(debounce_secs=0.1, quiet_secs=0.0)
+        self.watcher.set_files([self.filename])
+        self.spy = QSignalSpy(self.watcher.changed)
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.watcher.set_files([])
+        del self.watcher
+        self.tmp_dir.cleanup()
+        del self.app
+
+    @staticmethod
+    def _write(filename, content):
+        """Write a file."""
+        with open(filename, 'wb') as file_handle:
+            file_handle.write(content)
+
+    def test_modification(self):
+        """FileWatcher: Modifications are signaled once after the debounce time."""
+        for idx in range(3):
+            self._write(self.filename, b'modified %d' % idx)
+            QTest.qWait(20)
+        self.assertTrue(self.spy.wait(2000))
+        QTest.qWait(300)
+        self.assertEqual(len(self.spy), 1)
+
+    def test_replace_by_rename(self):
+        """FileWatcher: Replacing the file by a rename is detected repeatedly."""
+        for idx in range(2):
+            tmp_filename = os.path.join(self.tmp_dir.name, "file.tmp")
+            self._write(tmp_filename, b'replaced %d' % idx)
+            os.replace(tmp_filename, self.filename)
+            self.assertTrue(self.spy.wait(2000))
+            self.watcher.synchronized()
+        self.assertIn(self.filename, self.watcher.watcher.files())
+
+    def test_own_modification(self):
+        """FileWatcher: Modifications before synchronized() are not signaled."""
+        self._write(self.filename, b'synchronized')
+        self.watcher.synchronized()
+        self.assertFalse(self.spy.wait(500))
+
+    def test_modification_during_sync(self):
+        """FileWatcher: Modifications during a synchronization are signaled afterwards."""
+        self.watcher.sync_started()
+        self._write(self.filename, b'saved while synchronizing')
+        self.watcher.synchronized()
+        self.assertTrue(self.spy.wait(2000))
+        self.assertEqual(self.watcher.get_modified_files(), [self.filename])
+
+    def test_replaced_file(self):
+        """FileWatcher: Files replaced by the synchronization are not signaled."""
+        self.watcher.sync_started()
+        self._write(self.filename, b'downloaded')
+        self.watcher.synchronized(replaced_files=[self.filename])
+        self.assertFalse(self.spy.wait(500))
+
+    def test_failed_sync(self):
+        """FileWatcher: Files of a failed synchronization keep their previous signature."""
+        self._write(self.filename, b'modified')
+        self.watcher.sync_started()
+        self.watcher.synchronized(failed_files=[self.filename])
+        self.assertEqual(self.watcher.get_modified_files(), [self.filename])
+
+    def test_quiet_period(self):
+        """FileWatcher: The signal is delayed until the quiet period is over."""
+        self.watcher.quiet_secs = 0.5
+        self.watcher.synchronized()
+        start = time.monotonic()
+        self._write(self.filename, b'modified')
+        self.assertTrue(self.spy.wait(2000))
+        self.assertGreaterEqual(time.monotonic() - start, 0.45)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
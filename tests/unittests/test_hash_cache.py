@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.hash_cache module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import time
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import mock
+
+from syncer_mods.hash_cache import HashCache
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class HashCacheTest(TestCase):
+    """Test the :class:`syncer_mods.hash_cache.HashCache` class."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.cache_file = os.path.join(self.tmp_dir.name, "cache.json")
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.tmp_dir.cleanup()
+
+    def _create_file(self, name, content=b'some data', age_secs=60.0):
+        """Create a file with a modification time in the past."""
+        filename = os.path.join(self.tmp_dir.name, name)
+        with open(filename, 'wb') as file_handle:
+            file_handle.write(content)
+        mtime = time.time() - age_secs
+        os.utime(filename, (mtime, mtime))
+        return filename
+
+    def test_hash_is_cached(self):
+        """HashCache: Unchanged file is hashed only once."""
+        filename = self._create_file("file")
+        hash_func = mock.Mock(return_value="1" * 32)
+        cache = HashCache(self.cache_file)
+        self.assertEqual(cache.get_hash(filename, hash_func), "1" * 32)
+        self.assertEqual(cache.get_hash(filename, hash_func), "1" * 32)
+        hash_func.assert_called_once_with(filename)
+
+    def test_multiple_hashes(self):
+        """HashCache: Only the missing hash types are calculated."""
+        filename = self._create_file("file")
+        cache = HashCache(self.cache_file)
+        cache.get_hash(filename, mock.Mock(return_value="1" * 32))
+        hash_func = mock.Mock(return_value={"sha1": "2" * 40})
+        self.assertEqual(cache.get_hashes(filename, hash_func, ["md5", "sha1"]),
+                         {"md5": "1" * 32, "sha1": "2" * 40})
+        hash_func.assert_called_once_with(filename, ["sha1"])
+        self.assertEqual(cache.lookup(filename, "sha1"), "2" * 40)
+        self.assertEqual(cache.get_hashes(filename, hash_func, ["sha1", "md5"]),
+                         {"md5": "1" * 32, "sha1": "2" * 40})
+        hash_func.assert_called_once()
+
+    def test_changed_file_is_rehashed(self):
+        """HashCache: Changed file is hashed again."""
+        filename = self._create_file("file")
+        hash_func = mock.Mock(side_effect=["1" * 32, "2" * 32])
+        cache = HashCache(self.cache_file)
+        self.assertEqual(cache.get_hash(filename, hash_func), "1" * 32)
+        self._create_file("file", b'other data', age_secs=30.0)
+        self.assertEqual(cache.get_hash(filename, hash_func), "2" * 32)
+        self.assertEqual(hash_func.call_count, 2)
+
+    def test_recent_file_not_cached(self):
+        """HashCache: Recently modified file is not cached."""
+        filename = self._create_file("file", age_secs=0.0)
+        hash_func = mock.Mock(return_value="1" * 32)
+        cache = HashCache(self.cache_file)
+        cache.get_hash(filename, hash_func)
+        cache.get_hash(filename, hash_func)
+        self.assertEqual(hash_func.call_count, 2)
+
+    def test_missing_file(self):
+        """HashCache: Missing file is not cached."""
+        cache = HashCache(self.cache_file)
+        self.assertIsNone(cache.get_hash("/i/do/not/exist", lambda filename: None))
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_lru_eviction(self):
+        """HashCache: Least recently used entries are evicted."""
+        files = [self._create_file(f"file{idx}", f"data{idx}".encode()) for idx in range(3)]
+        cache = HashCache(self.cache_file, max_entries=2)
+        cache.get_hash(files[0], lambda filename: "0" * 32)
+        cache.get_hash(files[1], lambda filename: "1" * 32)
+        cache.lookup(files[0])
+        cache.get_hash(files[2], lambda filename: "2" * 32)
+        self.assertEqual(cache.lookup(files[0]), "0" * 32)
+        self.assertIsNone(cache.lookup(files[1]))
+        self.assertEqual(cache.lookup(files[2]), "2" * 32)
+
+    def test_persistence(self):
+        """HashCache: Entries survive a reload."""
+        filename = self._create_file("file")
+        cache = HashCache(self.cache_file)
+        cache.get_hash(filename, lambda filename: "1" * 32)
+        cache.save()
+
+        reloaded_cache = HashCache(self.cache_file)
+        self.assertEqual(reloaded_cache.lookup(filename), "1" * 32)
+
+    def test_hit_not_saved(self):
+        """HashCache: A cache hit alone does not rewrite the cache file."""
+        filename = self._create_file("file")
+        cache = HashCache(self.cache_file)
+        cache.get_hash(filename, lambda filename: "1" * 32)
+        cache.save()
+
+        with mock.patch("syncer_mods.hash_cache.save_json") as save_json_mock:
+            self.assertEqual(cache.lookup(filename), "1" * 32)
+            cache.save()
+            save_json_mock.assert_not_called()
+
+            cache.store(os.stat(self._create_file("other", b'other data')), "2" * 32)
+            cache.save()
+            save_json_mock.assert_called_once()
+
+    def test_corrupted_cache_file(self):
+        """HashCache: Corrupted cache file results in an empty cache."""
+        with open(self.cache_file, 'w', encoding='UTF-8') as file_handle:
+            file_handle.write("{no json")
+        cache = HashCache(self.cache_file)
+        self.assertEqual(len(cache.entries), 0)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
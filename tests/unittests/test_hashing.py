@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.hashing module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import hashlib
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import mock
+
+from syncer_mods.hashing import (QuickXorHash, has_file_digest, hash_file, hash_file_multi,
+                                 sample_hash_file, select_hash_type, tree_hash_file)
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def quickxor_reference(data):
+    """Calculate the QuickXorHash bit by bit as specified by Microsoft."""
+    state = [0] * 160
+    for index, value in enumerate(data):
+        for bit in range(8):
+            if value & (1 << bit):
+                state[(index * 11 + bit) % 160] ^= 1
+    digest = bytearray(20)
+    for bit, value in enumerate(state):
+        digest[bit // 8] |= value << (bit % 8)
+    for index, value in enumerate(len(data).to_bytes(8, "little")):
+        digest[12 + index] ^= value
+    return bytes(digest).hex()
+
+
+# -----------------------------------------------------------------------------
+# Test Classes
+# -----------------------------------------------------------------------------
+class HashFileTest(TestCase):
+    """Test the :func:`syncer_mods.hashing.hash_file` function."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.strategies = ["auto", "readinto", "mmap"]
+        if has_file_digest():
+            self.strategies.append("file_digest")
+
+    def test_correct_md5(self):
+        """hash_file: Correct checksum with all strategies."""
+        filename = os.path.join(os.path.dirname(__file__), 'md5_testfile.txt')
+        for strategy in self.strategies:
+            self.assertEqual(hash_file(filename, strategy=strategy),
+                             "45e898b716af4c7f2adca7ac3519b663", strategy)
+
+    def test_block_sizes(self):
+        """hash_file: Block sizes not dividing the file size."""
+        with TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "file")
+            data = os.urandom(10000)
+            with open(filename, 'wb') as file_handle:
+                file_handle.write(data)
+            for strategy in self.strategies:
+                for block_size in [1, 7, 4096, 100000]:
+                    self.assertEqual(hash_file(filename, "sha1", block_size, strategy),
+                                     hashlib.sha1(data).hexdigest(), (strategy, block_size))
+
+    def test_empty_file(self):
+        """hash_file: Empty file."""
+        with TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "file")
+            with open(filename, 'wb'):
+                pass
+            for strategy in self.strategies:
+                self.assertEqual(hash_file(filename, strategy=strategy),
+                                 hashlib.md5().hexdigest(), strategy)
+
+    def test_file_does_not_exist(self):
+        """hash_file: Non-existant file."""
+        self.assertIsNone(hash_file("/i/do/not/exist"))
+
+    def test_unknown_strategy(self):
+        """hash_file: Unknown strategy."""
+        self.assertRaises(ValueError, hash_file, __file__, strategy="unknown")
+
+    def test_multiple_hashes(self):
+        """hash_file_multi: Several hashes in one pass."""
+        filename = os.path.join(os.path.dirname(__file__), 'md5_testfile.txt')
+        with open(filename, 'rb') as file_handle:
+            data = file_handle.read()
+        for strategy in self.strategies:
+            self.assertEqual(hash_file_multi(filename, ["md5", "sha1", "quickxor"], 7, strategy),
+                             {"md5": "45e898b716af4c7f2adca7ac3519b663",
+                              "sha1": hashlib.sha1(data).hexdigest(),
+                              "quickxor": quickxor_reference(data)}, strategy)
+        self.assertIsNone(hash_file_multi("/i/do/not/exist", ["md5", "sha1"]))
+
+    def test_check(self):
+        """hash_file_multi: The check function is called for every block and can abort."""
+        filename = os.path.join(os.path.dirname(__file__), 'md5_testfile.txt')
+        for strategy in self.strategies:
+            check = mock.Mock()
+            self.assertEqual(hash_file_multi(filename, ["md5"], 7, strategy, check),
+                             {"md5": "45e898b716af4c7f2adca7ac3519b663"}, strategy)
+            self.assertGreater(check.call_count, 1, strategy)
+
+            check = mock.Mock(side_effect=RuntimeError("aborted"))
+            self.assertRaises(RuntimeError, hash_file_multi, filename, ["md5"], 7, strategy, check)
+
+
+class QuickXorHashTest(TestCase):
+    """Test the :class:`syncer_mods.hashing.QuickXorHash` class."""
+
+    def test_reference(self):
+        """QuickXorHash: Digest matches the reference for arbitrary splits of the data."""
+        data = os.urandom(1000)
+        for split_size in [1, 3, 160, 333, 1000]:
+            quickxor = QuickXorHash()
+            for offset in range(0, len(data), split_size):
+                quickxor.update(data[offset:offset + split_size])
+            self.assertEqual(quickxor.hexdigest(), quickxor_reference(data), split_size)
+        self.assertEqual(QuickXorHash().hexdigest(), "0" * 40)
+
+
+class TreeHashFileTest(TestCase):
+    """Test the :func:`syncer_mods.hashing.tree_hash_file` function."""
+
+    def test_tree_hash(self):
+        """tree_hash_file: Fingerprint combines the segment hashes independent of the workers."""
+        with TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "file")
+            data = os.urandom(10000)
+            with open(filename, 'wb') as file_handle:
+                file_handle.write(data)
+            expected = hashlib.blake2b(b"10000:4096:", digest_size=32)
+            for offset in range(0, len(data), 4096):
+                expected.update(hashlib.blake2b(data[offset:offset + 4096],
+                                                digest_size=32).digest())
+            for max_workers in [0, 1, 3]:
+                for block_size in [7, 4096, 100000]:
+                    self.assertEqual(tree_hash_file(filename, 4096, max_workers, block_size),
+                                     expected.hexdigest(), (max_workers, block_size))
+            self.assertNotEqual(tree_hash_file(filename, 1000), expected.hexdigest())
+
+            with open(filename, 'r+b') as file_handle:
+                file_handle.seek(9999)
+                file_handle.write(b'x' if data[9999:] != b'x' else b'y')
+            self.assertNotEqual(tree_hash_file(filename, 4096), expected.hexdigest())
+
+    def test_empty_and_missing_file(self):
+        """tree_hash_file: Empty and non-existant file."""
+        with TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "file")
+            with open(filename, 'wb'):
+                pass
+            self.assertEqual(tree_hash_file(filename, 4096),
+                             hashlib.blake2b(b"0:4096:", digest_size=32).hexdigest())
+        self.assertIsNone(tree_hash_file("/i/do/not/exist"))
+
+
+class SampleHashFileTest(TestCase):
+    """Test the :func:`syncer_mods.hashing.sample_hash_file` function."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.filename = os.path.join(self.tmp_dir.name, "file")
+        with open(self.filename, 'wb') as file_handle:
+            file_handle.write(b'\0' * 1000)
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.tmp_dir.cleanup()
+
+    def _modified(self, offset, data=b'x'):
+        """Get the fingerprint after modifying the file and restore it afterwards."""
+        with open(self.filename, 'r+b') as file_handle:
+            file_handle.seek(offset)
+            file_handle.write(data)
+        digest = sample_hash_file(self.filename, 1, 10)
+        with open(self.filename, 'r+b') as file_handle:
+            file_handle.seek(offset)
+            file_handle.write(b'\0' * len(data))
+            file_handle.truncate(1000)
+        return digest
+
+    def test_samples(self):
+        """sample_hash_file: Head, tail, the sampled blocks and the size are compared."""
+        digest = sample_hash_file(self.filename, 1, 10)
+        for offset in [10, 494, 505, 989]:
+            self.assertEqual(self._modified(offset), digest, offset)
+        for offset in [0, 9, 495, 504, 990, 999]:
+            self.assertNotEqual(self._modified(offset), digest, offset)
+        self.assertNotEqual(self._modified(1000), digest)
+        self.assertEqual(sample_hash_file(self.filename, 1, 10), digest)
+        self.assertNotEqual(sample_hash_file(self.filename, 2, 10), digest)
+
+    def test_small_and_missing_file(self):
+        """sample_hash_file: Files smaller than the samples and non-existant files."""
+        with open(self.filename, 'wb') as file_handle:
+            file_handle.write(b'abc')
+        digest = sample_hash_file(self.filename, 4, 10)
+        with open(self.filename, 'wb') as file_handle:
+            file_handle.write(b'aXc')
+        self.assertNotEqual(sample_hash_file(self.filename, 4, 10), digest)
+        self.assertIsNone(sample_hash_file("/i/do/not/exist", 4))
+
+
+class SelectHashTypeTest(TestCase):
+    """Test the :func:`syncer_mods.hashing.select_hash_type` function."""
+
+    def test_select(self):
+        """select_hash_type: The preferred common hash type is selected."""
+        self.assertEqual(select_hash_type(["sha1", "md5"]), "md5")
+        self.assertEqual(select_hash_type(["crc32", "sha1"]), "sha1")
+        self.assertEqual(select_hash_type(["quickxor"]), "quickxor")
+        self.assertIsNone(select_hash_type(["crc32"]))
+        self.assertIsNone(select_hash_type([]))
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
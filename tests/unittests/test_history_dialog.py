@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.history_dialog module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import sys
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from PyQt5.QtWidgets import QApplication
+
+from syncer_mods.history_dialog import HistoryDialog, format_size
+from syncer_mods.journal import SyncJournal
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class HistoryDialogTest(TestCase):
+    """Test the :class:`syncer_mods.history_dialog.HistoryDialog` class."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.app = QApplication(sys.argv)
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.journal = SyncJournal(os.path.join(self.tmp_dir.name, "journal.sqlite3"))
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.tmp_dir.cleanup()
+        del self.app
+
+    def test_empty(self):
+        """HistoryDialog: Empty journal."""
+        form = HistoryDialog(self.journal)
+        self.assertEqual(form.gui.historyTable.rowCount(), 0)
+        self.assertEqual(form.gui.statsLabel.text(), "No synchronizations recorded yet.")
+
+    def test_entries(self):
+        """HistoryDialog: Entries and latency statistics are shown."""
+        record = {"start_time": 1650000000.0, "local_file": "/home/user/file",
+                  "remote_file": "remote:file", "direction": "remote", "error": None,
+                  "dry_run": False, "duration_secs": 0.5, "bytes_transferred": 3 * 1024 * 1024,
+                  "hash_type": "sha1", "local_md5": None, "remote_md5": "1" * 40,
+                  "timings": {"transfer": 0.25}}
+        self.journal.add([record, dict(record, direction=None, error="Failed")])
+        form = HistoryDialog(self.journal)
+        self.assertEqual(form.gui.historyTable.rowCount(), 2)
+        self.assertEqual(form.gui.historyTable.item(0, 2).text(), "Error: Failed")
+        self.assertEqual(form.gui.historyTable.item(1, 1).text(), "file")
+        self.assertEqual(form.gui.historyTable.item(1, 2).text(), "Download")
+        self.assertEqual(form.gui.historyTable.item(1, 4).text(), "3.0 MiB")
+        self.assertEqual(form.gui.historyTable.item(1, 5).text(), "sha1")
+        self.assertEqual(form.gui.historyTable.item(1, 5).toolTip(),
+                         f"Local: None\nRemote: {'1' * 40}")
+        self.assertEqual(form.gui.historyTable.item(1, 6).text(), "transfer 250 ms")
+        self.assertEqual(form.gui.statsLabel.text(),
+                         "remote:file: Last sync 500 ms, p50 500 ms, p95 500 ms "
+                         "(1 synchronizations)")
+        self.assertEqual(format_size(100), "100 B")
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.journal module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import sqlite3
+from contextlib import closing
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from syncer_mods.journal import SyncJournal, format_duration, get_percentile
+
+
+# -----------------------------------------------------------------------------
+# Helper Functions
+# -----------------------------------------------------------------------------
+def get_record(duration_secs, remote_file="remote:file", error=None, dry_run=False):
+    """Get a journal record of a synchronization."""
+    return {"start_time": 1650000000.0,
+            "local_file": "/home/user/file",
+            "remote_file": remote_file,
+            "direction": "local",
+            "error": error,
+            "dry_run": dry_run,
+            "duration_secs": duration_secs,
+            "bytes_transferred": 1024,
+            "hash_type": "md5",
+            "local_md5": "0" * 32,
+            "remote_md5": None,
+            "timings": {"transfer": duration_secs}}
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class SyncJournalTest(TestCase):
+    """Test the :class:`syncer_mods.journal.SyncJournal` class."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.filename = os.path.join(self.tmp_dir.name, "journal.sqlite3")
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.tmp_dir.cleanup()
+
+    def test_helpers(self):
+        """get_percentile: Nearest-rank percentiles and formatting of durations."""
+        values = [float(value) for value in range(1, 21)]
+        self.assertEqual(get_percentile(values, 0.5), 10.0)
+        self.assertEqual(get_percentile(values, 0.95), 19.0)
+        self.assertEqual(get_percentile([3.0], 0.95), 3.0)
+        self.assertEqual(format_duration(0.25), "250 ms")
+        self.assertEqual(format_duration(12.34), "12.3 s")
+
+    def test_entries(self):
+        """SyncJournal: Entries are returned newest first and survive a new instance."""
+        SyncJournal(self.filename).add([get_record(1.0), get_record(2.0, "other:file")])
+        entries = SyncJournal(self.filename).get_entries()
+        self.assertEqual([entry["duration_secs"] for entry in entries], [2.0, 1.0])
+        self.assertEqual(entries[1], get_record(1.0))
+        self.assertEqual(len(SyncJournal(self.filename).get_entries(remote_file="other:file")), 1)
+
+    def test_retention(self):
+        """SyncJournal: Only the most recent entries are kept."""
+        journal = SyncJournal(self.filename, max_entries=5)
+        for idx in range(8):
+            journal.add([get_record(float(idx))])
+        self.assertEqual([entry["duration_secs"] for entry in journal.get_entries()],
+                         [7.0, 6.0, 5.0, 4.0, 3.0])
+
+    def test_migration(self):
+        """SyncJournal: A journal without the hash type gets the column with md5 entries."""
+        with closing(sqlite3.connect(self.filename)) as connection:
+            with connection:
+                connection.execute("CREATE TABLE syncs ("
+                                   "id INTEGER PRIMARY KEY AUTOINCREMENT, start_time REAL, "
+                                   "local_file TEXT, remote_file TEXT, direction TEXT, "
+                                   "dry_run INTEGER, error TEXT, duration_secs REAL, "
+                                   "bytes_transferred INTEGER, local_md5 TEXT, "
+                                   "remote_md5 TEXT, timings TEXT)")
+                connection.execute("INSERT INTO syncs (start_time, local_file, remote_file, "
+                                   "direction, dry_run, error, duration_secs, "
+                                   "bytes_transferred, local_md5, remote_md5, timings) "
+                                   "VALUES (1650000000.0, '/home/user/file', 'remote:file', "
+                                   "'local', 0, NULL, 1.0, 1024, ?, NULL, '{\"transfer\": 1.0}')",
+                                   ("0" * 32,))
+        journal = SyncJournal(self.filename)
+        journal.add([dict(get_record(2.0), hash_type="quickxor", local_md5="A" * 28)])
+        entries = journal.get_entries()
+        self.assertEqual(entries[1], get_record(1.0))
+        self.assertEqual((entries[0]["hash_type"], entries[0]["local_md5"]),
+                         ("quickxor", "A" * 28))
+
+    def test_latency_stats(self):
+        """SyncJournal: Latency statistics ignore dry runs and errors."""
+        journal = SyncJournal(self.filename)
+        self.assertIsNone(journal.get_latency_stats())
+        journal.add([get_record(float(idx)) for idx in range(1, 21)])
+        journal.add([get_record(100.0, error="Failed"), get_record(100.0, dry_run=True)])
+        stats = journal.get_latency_stats()
+        self.assertEqual((stats.count, stats.last_secs, stats.p50_secs, stats.p95_secs),
+                         (20, 20.0, 10.0, 19.0))
+        self.assertEqual(stats.get_description(), "Last sync 20.0 s, p50 10.0 s, p95 19.0 s")
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
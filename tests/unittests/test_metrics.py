@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.metrics module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from syncer_mods.metrics import SyncMetrics, export_metrics
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+RECORD = {"local_file": "/home/user/my \"file\"",
+          "remote_file": "remote:file",
+          "direction": "local",
+          "error": None,
+          "dry_run": False,
+          "duration_secs": 1.5,
+          "bytes_transferred": 1024,
+          "retries": 2,
+          "remote_cache_hits": 1,
+          "remote_cache_misses": 0,
+          "timings": {"remote_stat": 0.5, "transfer": 1.0}}
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class MetricsTest(TestCase):
+    """Test the syncer_mods.metrics module."""
+
+    def test_measure(self):
+        """SyncMetrics.measure: Durations of a phase are accumulated."""
+        metrics = SyncMetrics()
+        with metrics.measure("transfer"):
+            pass
+        first = metrics.timings["transfer"]
+        with self.assertRaises(RuntimeError):
+            with metrics.measure("transfer"):
+                raise RuntimeError("Failed")
+        self.assertGreater(metrics.timings["transfer"], first)
+
+    def test_export_prometheus(self):
+        """export_metrics: The Prometheus textfile is replaced by the current values."""
+        with TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "syncer.prom")
+            export_metrics(filename, "prometheus", [RECORD])
+            export_metrics(filename, "prometheus", [RECORD])
+            with open(filename, 'r', encoding="UTF-8") as file_handle:
+                lines = file_handle.read().splitlines()
+            self.assertEqual(os.listdir(tmp_dir), ["syncer.prom"])
+
+        labels = 'local_file="/home/user/my \\"file\\"",remote_file="remote:file"'
+        self.assertIn(f"syncer_sync_success{{{labels}}} 1", lines)
+        self.assertIn(f"syncer_sync_duration_seconds{{{labels}}} 1.5", lines)
+        self.assertIn(f'syncer_sync_phase_duration_seconds{{{labels},phase="transfer"}} 1.0',
+                      lines)
+        self.assertIn(f"syncer_sync_transferred_bytes{{{labels}}} 1024", lines)
+        self.assertIn(f"syncer_sync_retries{{{labels}}} 2", lines)
+        self.assertEqual(len([line for line in lines if line.startswith("syncer_sync_success")]),
+                         1)
+
+    def test_export_jsonl(self):
+        """export_metrics: JSON lines are appended."""
+        with TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "syncer.jsonl")
+            export_metrics(filename, "jsonl", [RECORD])
+            export_metrics(filename, "jsonl", [RECORD, RECORD])
+            with open(filename, 'r', encoding="UTF-8") as file_handle:
+                self.assertEqual(len(file_handle.readlines()), 3)
+            self.assertRaises(ValueError, export_metrics, filename, "xml", [RECORD])
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.rclone module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import subprocess
+from datetime import datetime, timezone
+from unittest import TestCase
+
+import mock
+
+from syncer_mods.rclone import SynchronizerError, get_remote_stat, parse_rclone_time
+
+
+# -----------------------------------------------------------------------------
+# Test Classes
+# -----------------------------------------------------------------------------
+class ParseRcloneTimeTest(TestCase):
+    """Test the :func:`syncer_mods.rclone.parse_rclone_time` function."""
+
+    def test_utc(self):
+        """parse_rclone_time: UTC time stamp."""
+        self.assertEqual(parse_rclone_time("2022-04-10T08:03:16.000Z"),
+                         datetime(2022, 4, 10, 8, 3, 16, tzinfo=timezone.utc))
+
+    def test_nanoseconds_and_offset(self):
+        """parse_rclone_time: Nanoseconds and numeric offset."""
+        self.assertEqual(parse_rclone_time("2022-04-10T10:03:16.123456789+02:00"),
+                         datetime(2022, 4, 10, 8, 3, 16, 123456, tzinfo=timezone.utc))
+
+    def test_no_fraction(self):
+        """parse_rclone_time: Time stamp without fraction."""
+        self.assertEqual(parse_rclone_time("2022-04-10T08:03:16Z"),
+                         datetime(2022, 4, 10, 8, 3, 16, tzinfo=timezone.utc))
+
+    def test_invalid(self):
+        """parse_rclone_time: Invalid time stamp."""
+        self.assertRaises(ValueError, parse_rclone_time, "something-stupid")
+
+
+# pylint: disable=invalid-name
+class GetRemoteStatTest(TestCase):
+    """Test the :func:`syncer_mods.rclone.get_remote_stat` function."""
+
+    def test_rclone_binary_does_not_exist(self):
+        """get_remote_stat: Non-existant rclone."""
+        self.assertRaisesRegex(SynchronizerError,
+                               "Specified rclone binary .* does not exist!",
+                               get_remote_stat, "does_not_exist", "remote:file")
+
+    @mock.patch('syncer_mods.rclone.check_output')
+    def test_correct_output(self, mock_subproc_check_output):
+        """get_remote_stat: Correct output."""
+        mock_subproc_check_output.return_value = """
+[
+{"Path":"file","Name":"file","Size":42,"ModTime":"2022-04-10T08:03:16.000Z",
+ "IsDir":false,"Hashes":{"MD5":"ABCDEF0123456789ABCDEF0123456789"}}
+]"""
+        remote_stat = get_remote_stat("rclone", "remote:file")
+        self.assertEqual(remote_stat.size, 42)
+        self.assertEqual(remote_stat.modtime, datetime(2022, 4, 10, 8, 3, 16, tzinfo=timezone.utc))
+        self.assertEqual(remote_stat.md5, "abcdef0123456789abcdef0123456789")
+        self.assertEqual(mock_subproc_check_output.call_count, 1)
+        self.assertIn("--hash", mock_subproc_check_output.call_args[0][0])
+
+    @mock.patch('syncer_mods.rclone.check_output')
+    def test_missing_hash(self, mock_subproc_check_output):
+        """get_remote_stat: Remote without md5 support."""
+        mock_subproc_check_output.return_value = """
+[{"Path":"file","Name":"file","Size":42,"ModTime":"2022-04-10T08:03:16.000Z","IsDir":false}]"""
+        self.assertIsNone(get_remote_stat("rclone", "remote:file").md5)
+
+    @mock.patch('syncer_mods.rclone.check_output')
+    def test_remote_file_does_not_exist(self, mock_subproc_check_output):
+        """get_remote_stat: Remote file does not exist."""
+        mock_subproc_check_output.return_value = "[]"
+        self.assertRaisesRegex(SynchronizerError,
+                               "Remote file .* does not exist!",
+                               get_remote_stat, "rclone", "remote:file")
+
+        mock_subproc_check_output.side_effect = subprocess.CalledProcessError(3, "rclone")
+        self.assertRaisesRegex(SynchronizerError,
+                               "Remote file .* does not exist!",
+                               get_remote_stat, "rclone", "remote:file")
+
+    @mock.patch('syncer_mods.rclone.check_output')
+    def test_parse_error(self, mock_subproc_check_output):
+        """get_remote_stat: Error during parsing."""
+        mock_subproc_check_output.return_value = """
+[{"Path":"file","Name":"file","Size":42,"ModTime":"something-stupid","IsDir":false}]"""
+        self.assertRaisesRegex(SynchronizerError,
+                               "Error extracting metadata of remote file",
+                               get_remote_stat, "rclone", "remote:file")
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
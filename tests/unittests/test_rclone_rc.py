@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.rclone_rc module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import json
+import pickle
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+import mock
+
+from syncer_mods.rclone import SyncCancelledError, SynchronizerError, WATCHDOG
+from syncer_mods.rclone_rc import DAEMON_RETRY_SECS, RcClient, RcError, RcTransport
+from syncer_mods.transfer import TransferParams
+
+
+# -----------------------------------------------------------------------------
+# Fake Remote Control Server
+# -----------------------------------------------------------------------------
+class FakeRcHandler(BaseHTTPRequestHandler):
+    """Request handler of the fake rclone remote control server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):   # noqa: N802 pylint: disable=invalid-name
+        """Handle a POST request."""
+        length = int(self.headers.get("Content-Length", 0))
+        params = json.loads(self.rfile.read(length) or b'{}')
+        method = self.path.lstrip("/")
+        time.sleep(self.server.delays.get(method, 0.0))
+        self.server.calls.append((method, params, self.client_address[1],
+                                  self.headers.get("Authorization")))
+        if params.get("_async"):
+            self.server.jobs.append(method)
+            status, result = 200, {"jobid": len(self.server.jobs)}
+        elif method == "job/status" and method not in self.server.responses:
+            output = self.server.responses.get(self.server.jobs[params["jobid"] - 1], (200, {}))
+            status, result = 200, {"finished": True, "success": output[0] == 200,
+                                   "error": output[1].get("error"), "output": output[1]}
+        else:
+            status, result = self.server.responses.get(method, (200, {}))
+        body = json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):   # pylint: disable=arguments-differ
+        """Suppress the logging."""
+
+
+class FakeRcServer(ThreadingHTTPServer):
+    """Fake rclone remote control server recording all calls."""
+
+    def __init__(self):
+        """Construct a new instance listening on a free port."""
+        super().__init__(("127.0.0.1", 0), FakeRcHandler)
+        self.calls = []
+        self.responses = {}
+        self.jobs = []
+        self.delays = {}
+        self.thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        """Get the URL of the server."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def stop(self):
+        """Stop the server."""
+        self.shutdown()
+        self.server_close()
+
+
+# -----------------------------------------------------------------------------
+# Test Classes
+# -----------------------------------------------------------------------------
+class RcClientTest(TestCase):
+    """Test the :class:`syncer_mods.rclone_rc.RcClient` class."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.server = FakeRcServer()
+        self.client = RcClient(self.server.url, "user", "secret", timeout=5.0)
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.client.close()
+        self.server.stop()
+
+    def test_connection_is_reused(self):
+        """RcClient: Subsequent calls use the same connection."""
+        self.client.call("core/noop")
+        self.client.call("core/noop")
+        self.assertEqual(len(self.server.calls), 2)
+        self.assertEqual(self.server.calls[0][2], self.server.calls[1][2])
+
+    def test_authentication(self):
+        """RcClient: Basic authentication header is sent."""
+        self.client.call("core/noop", {"key": "value"})
+        self.assertEqual(self.server.calls[0][1], {"key": "value"})
+        self.assertEqual(self.server.calls[0][3], "Basic dXNlcjpzZWNyZXQ=")
+
+    def test_error(self):
+        """RcClient: Error response raises an RcError."""
+        self.server.responses["operations/stat"] = (500, {"error": "something failed"})
+        with self.assertRaisesRegex(RcError, "something failed") as context:
+            self.client.call("operations/stat")
+        self.assertEqual(context.exception.status, 500)
+
+        copied = pickle.loads(pickle.dumps(context.exception))
+        self.assertEqual((copied.method, copied.status), ("operations/stat", 500))
+        self.assertEqual(str(copied), str(context.exception))
+
+    def test_watchdog_timeout(self):
+        """RcClient: The socket timeout is limited by the timeout of the watchdog."""
+        self.server.delays["operations/stat"] = 1.0
+        WATCHDOG.step_timeout = 0.2
+        try:
+            self.assertRaisesRegex(SynchronizerError, "did not finish within 0.2 seconds",
+                                   self.client.call, "operations/stat")
+        finally:
+            WATCHDOG.step_timeout = None
+
+    def test_job(self):
+        """RcClient: A job is polled until it finished and its errors are reported."""
+        self.server.responses["operations/hashsum"] = (200, {"hashsum": ["digest  file"]})
+        self.assertEqual(self.client.call_job("operations/hashsum", {"fs": "remote:"}),
+                         {"hashsum": ["digest  file"]})
+        self.assertEqual(self.server.calls[0][1], {"fs": "remote:", "_async": True})
+        self.assertEqual(self.server.calls[1][:2], ("job/status", {"jobid": 1}))
+
+        self.server.responses["operations/copyfile"] = (500, {"error": "failed"})
+        self.assertRaisesRegex(RcError, "operations/copyfile failed: failed",
+                               self.client.call_job, "operations/copyfile")
+
+    def test_job_timeout(self):
+        """RcClient: A job exceeding the timeout of the watchdog is stopped."""
+        self.server.responses["job/status"] = (200, {"finished": False})
+        WATCHDOG.step_timeout = 0.2
+        try:
+            self.assertRaisesRegex(SynchronizerError, "did not finish within 0.2 seconds",
+                                   self.client.call_job, "operations/copyfile")
+        finally:
+            WATCHDOG.step_timeout = None
+        self.assertEqual(self.server.calls[-1][:2], ("job/stop", {"jobid": 1}))
+
+    def test_job_cancel(self):
+        """RcClient: A job is stopped if the synchronization is cancelled."""
+        self.server.responses["job/status"] = (200, {"finished": False})
+        timer = threading.Timer(0.2, WATCHDOG.cancel)
+        timer.start()
+        try:
+            self.assertRaises(SyncCancelledError, self.client.call_job, "operations/copyfile")
+        finally:
+            timer.join()
+            WATCHDOG.reset()
+        self.assertEqual(self.server.calls[-1][:2], ("job/stop", {"jobid": 1}))
+
+    def test_unreachable(self):
+        """RcClient: Unreachable daemon raises a SynchronizerError."""
+        url = self.server.url
+        self.server.stop()
+        self.client.close()
+        self.client = RcClient(url, timeout=1.0)
+        self.assertRaisesRegex(SynchronizerError, "Can't reach the rclone remote control daemon",
+                               self.client.call, "core/noop")
+
+
+class RcTransportTest(TestCase):
+    """Test the :class:`syncer_mods.rclone_rc.RcTransport` class."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.server = FakeRcServer()
+        self.transport = RcTransport("rclone", RcClient(self.server.url, timeout=5.0))
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.transport.close()
+        self.server.stop()
+
+    def test_stat(self):
+        """RcTransport: Stat of the remote file."""
+        self.server.responses["operations/stat"] = (200, {"item": {
+            "Path": "file", "Name": "file", "Size": 42, "ModTime": "2022-04-10T08:03:16.000Z",
+            "IsDir": False, "Hashes": {"md5": "1" * 32}}})
+        remote_stat = self.transport.stat("remote:dir/file")
+        self.assertEqual(remote_stat.size, 42)
+        self.assertEqual(remote_stat.modtime, datetime(2022, 4, 10, 8, 3, 16, tzinfo=timezone.utc))
+        self.assertEqual(remote_stat.md5, "1" * 32)
+        self.assertEqual(self.server.calls[0][0], "operations/stat")
+        self.assertEqual(self.server.calls[0][1]["fs"], "remote:dir")
+        self.assertEqual(self.server.calls[0][1]["remote"], "file")
+
+    def test_stat_hash_type(self):
+        """RcTransport: Stat requests the given hash type."""
+        self.server.responses["operations/stat"] = (200, {"item": {
+            "Path": "file", "Name": "file", "Size": 42, "ModTime": "2022-04-10T08:03:16.000Z",
+            "IsDir": False, "Hashes": {"SHA-1": "3" * 40}}})
+        self.assertEqual(self.transport.stat("remote:file", "sha1").get_hash("sha1"), "3" * 40)
+        self.assertEqual(self.server.calls[0][1]["opt"]["hashTypes"], ["sha1"])
+
+    def test_get_hash_types(self):
+        """RcTransport: Supported hash types are determined using operations/fsinfo."""
+        self.server.responses["operations/fsinfo"] = (200, {"Hashes": ["QuickXorHash", "sha1"]})
+        self.assertEqual(self.transport.get_hash_types("remote:dir"), ["quickxor", "sha1"])
+        self.assertEqual(self.server.calls[0][:2], ("operations/fsinfo", {"fs": "remote:dir"}))
+
+    def test_stat_hashsum_fallback(self):
+        """RcTransport: Stat without hash uses operations/hashsum."""
+        self.server.responses["operations/stat"] = (200, {"item": {
+            "Path": "file", "Name": "file", "Size": 42, "ModTime": "2022-04-10T08:03:16.000Z",
+            "IsDir": False}})
+        self.server.responses["operations/hashsum"] = (200, {"hashType": "md5",
+                                                             "hashsum": ["2" * 32 + "  file"]})
+        self.assertEqual(self.transport.stat("remote:file").md5, "2" * 32)
+        self.assertEqual(self.server.calls[1][1]["fs"], "remote:")
+
+    def test_stat_missing_file(self):
+        """RcTransport: Stat of a missing remote file."""
+        self.server.responses["operations/stat"] = (200, {"item": None})
+        self.assertRaisesRegex(SynchronizerError, "Remote file .* does not exist!",
+                               self.transport.stat, "remote:file")
+
+    def test_upload_and_download(self):
+        """RcTransport: Upload and download use operations/copyfile."""
+        self.transport.upload("/local/dir/file", "remote:dir/file")
+        self.transport.download("remote:dir/file", "/local/dir/file")
+        self.assertEqual(self.server.calls[0][:2],
+                         ("operations/copyfile", {"srcFs": "/local/dir", "srcRemote": "file",
+                                                  "dstFs": "remote:dir", "dstRemote": "file",
+                                                  "_async": True}))
+        self.assertEqual(self.server.calls[1][:2], ("job/status", {"jobid": 1}))
+        self.assertEqual(self.server.calls[2][:2],
+                         ("operations/copyfile", {"srcFs": "remote:dir", "srcRemote": "file",
+                                                  "dstFs": "/local/dir", "dstRemote": "file",
+                                                  "_async": True}))
+
+    def test_transfer_params(self):
+        """RcTransport: The transfer parameters of the remote are passed as _config."""
+        self.transport.set_transfer_params("remote", TransferParams(4, 32, 8, 16))
+        self.transport.upload("/local/dir/file", "remote:dir/file")
+        self.transport.upload("/local/dir/file", "other:dir/file")
+        self.assertEqual(self.server.calls[0][1]["_config"],
+                         {"MultiThreadStreams": 4, "BufferSize": 32 * 1024 * 1024,
+                          "Checkers": 16})
+        self.assertNotIn("_config", self.server.calls[2][1])
+        self.assertEqual(self.transport.fallback.transfer_params["remote"],
+                         TransferParams(4, 32, 8, 16))
+
+    def test_fallback(self):
+        """RcTransport: Fall back to rclone calls if the daemon can't be started."""
+        transport = RcTransport("does_not_exist")
+        self.assertRaisesRegex(SynchronizerError, "Specified rclone binary .* does not exist!",
+                               transport.stat, "remote:file")
+
+    def test_fallback_retry(self):
+        """RcTransport: The start of the daemon is tried again after some time only."""
+        transport = RcTransport("does_not_exist")
+        with mock.patch.object(transport.daemon, "start",
+                               side_effect=SynchronizerError("Daemon did not start!")) as start:
+            for _ in range(3):
+                self.assertRaises(SynchronizerError, transport.stat, "remote:file")
+            self.assertEqual(start.call_count, 1)
+            with mock.patch("syncer_mods.rclone_rc.time.monotonic",
+                            return_value=time.monotonic() + DAEMON_RETRY_SECS):
+                self.assertRaises(SynchronizerError, transport.stat, "remote:file")
+            self.assertEqual(start.call_count, 2)
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
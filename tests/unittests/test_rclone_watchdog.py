@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.rclone module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import subprocess
+import sys
+import threading
+import time
+from unittest import TestCase
+
+from syncer_mods.rclone import ProcessWatchdog, SyncCancelledError, SynchronizerError
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+SLEEP_CMD = [sys.executable, "-c", "import time; time.sleep(10)"]
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class ProcessWatchdogTest(TestCase):
+    """Test the :class:`syncer_mods.rclone.ProcessWatchdog` class."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.watchdog = ProcessWatchdog()
+
+    def _run(self):
+        """Run a sleeping process under the watchdog and return the duration."""
+        start = time.monotonic()
+        with subprocess.Popen(SLEEP_CMD) as process:
+            with self.watchdog.watch(process):
+                process.wait()
+        return time.monotonic() - start
+
+    def test_finished_process(self):
+        """ProcessWatchdog: A process finishing in time is not affected."""
+        self.watchdog.step_timeout = 10.0
+        with subprocess.Popen([sys.executable, "-c", "pass"]) as process:
+            with self.watchdog.watch(process):
+                process.wait()
+        self.assertEqual(process.returncode, 0)
+
+    def test_step_timeout(self):
+        """ProcessWatchdog: A process exceeding the step timeout is killed."""
+        self.watchdog.step_timeout = 0.3
+        start = time.monotonic()
+        self.assertRaisesRegex(SynchronizerError, "RClone did not finish within 0.3 seconds!",
+                               self._run)
+        self.assertLess(time.monotonic() - start, 5.0)
+
+    def test_deadline(self):
+        """ProcessWatchdog: The deadline limits the timeout of the calling thread only."""
+        self.watchdog.step_timeout = 100.0
+        with self.watchdog.deadline(time.monotonic() + 0.3):
+            self.assertLessEqual(self.watchdog.get_timeout(), 0.3)
+            self.assertRaises(SynchronizerError, self._run)
+        self.assertEqual(self.watchdog.get_timeout(), 100.0)
+
+        with self.watchdog.deadline(time.monotonic() - 1.0):
+            self.assertRaisesRegex(SynchronizerError, "exceeded its deadline",
+                                   self.watchdog.check)
+            start = time.monotonic()
+            self.assertRaisesRegex(SynchronizerError, "exceeded its deadline", self._run)
+            self.assertLess(time.monotonic() - start, 5.0)
+
+    def test_cancel(self):
+        """ProcessWatchdog: Cancel kills running and new processes until reset."""
+        timer = threading.Timer(0.3, self.watchdog.cancel)
+        timer.start()
+        self.assertRaisesRegex(SyncCancelledError, "Synchronization was cancelled!", self._run)
+        timer.join()
+        self.assertRaises(SyncCancelledError, self.watchdog.check)
+        self.assertRaises(SyncCancelledError, self._run)
+
+        self.watchdog.reset()
+        self.watchdog.check()
+        self.assertEqual(self.watchdog._kill_funcs, {})  # pylint: disable=W0212
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
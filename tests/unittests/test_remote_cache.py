@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.remote_cache module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+from datetime import datetime, timezone
+from unittest import TestCase
+
+import mock
+
+from syncer_mods.rclone import RemoteStat
+from syncer_mods.remote_cache import RemoteStatCache
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+REMOTE_STAT = RemoteStat(4, datetime(2022, 4, 10, tzinfo=timezone.utc), {"md5": "1" * 32})
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class RemoteStatCacheTest(TestCase):
+    """Test the :class:`syncer_mods.remote_cache.RemoteStatCache` class."""
+
+    def test_ttl(self):
+        """RemoteStatCache: Entries expire after the time to live."""
+        cache = RemoteStatCache(ttl_secs=10.0)
+        with mock.patch("syncer_mods.remote_cache.time.monotonic", return_value=100.0):
+            cache.store("remote:file", REMOTE_STAT)
+        with mock.patch("syncer_mods.remote_cache.time.monotonic", return_value=109.9):
+            self.assertEqual(cache.lookup("remote:file"), REMOTE_STAT)
+            self.assertIsNone(cache.lookup("remote:other"))
+        with mock.patch("syncer_mods.remote_cache.time.monotonic", return_value=110.0):
+            self.assertIsNone(cache.lookup("remote:file"))
+
+    def test_hash_type(self):
+        """RemoteStatCache: Entries are valid only for the hash type they were stored with."""
+        cache = RemoteStatCache(ttl_secs=10.0)
+        cache.store("remote:file", REMOTE_STAT, "md5")
+        self.assertIsNone(cache.lookup("remote:file", "sha1"))
+        self.assertEqual(cache.lookup("remote:file", "md5"), REMOTE_STAT)
+
+    def test_invalidate(self):
+        """RemoteStatCache: Invalidated entries are removed."""
+        cache = RemoteStatCache(ttl_secs=10.0)
+        cache.store("remote:file", REMOTE_STAT)
+        cache.invalidate("remote:file")
+        cache.invalidate("remote:other")
+        self.assertIsNone(cache.lookup("remote:file"))
+
+    def test_disabled(self):
+        """RemoteStatCache: A time to live of 0 disables the cache."""
+        cache = RemoteStatCache()
+        cache.store("remote:file", REMOTE_STAT)
+        self.assertIsNone(cache.lookup("remote:file"))
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
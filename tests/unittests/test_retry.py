@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.retry module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import pickle
+from unittest import TestCase
+
+import mock
+
+from syncer_mods.rclone import SynchronizerError, get_exit_code_error
+from syncer_mods.retry import CircuitBreaker, get_backoff_delay
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class RetryTest(TestCase):
+    """Test the syncer_mods.retry module."""
+
+    def test_backoff_delay(self):
+        """get_backoff_delay: The delay grows exponentially up to the limit."""
+        with mock.patch("random.uniform", side_effect=lambda low, high: high):
+            self.assertEqual([get_backoff_delay(retry, 1.0, 10.0) for retry in range(5)],
+                             [1.0, 2.0, 4.0, 8.0, 10.0])
+        for retry in range(10):
+            self.assertTrue(0.0 <= get_backoff_delay(retry, 0.5) <= 30.0)
+
+    def test_circuit_breaker(self):
+        """CircuitBreaker: The circuit opens after consecutive failures of a remote."""
+        breaker = CircuitBreaker(threshold=2, reset_secs=60.0)
+        breaker.record_failure("gdrive")
+        breaker.record_success("gdrive")
+        breaker.record_failure("gdrive")
+        breaker.check("gdrive")
+
+        breaker.record_failure("gdrive")
+        self.assertRaisesRegex(SynchronizerError,
+                               "Remote gdrive failed 2 times in a row, skipping it for 60 seconds!",
+                               breaker.check, "gdrive")
+        breaker.check("other")
+
+        with mock.patch("time.monotonic", return_value=10.0 ** 9):
+            breaker.check("gdrive")
+            breaker.record_failure("gdrive")
+            self.assertRaises(SynchronizerError, breaker.check, "gdrive")
+            breaker.record_success("gdrive")
+            breaker.check("gdrive")
+
+    def test_disabled_circuit_breaker(self):
+        """CircuitBreaker: A threshold of 0 disables the circuit breaker."""
+        breaker = CircuitBreaker(threshold=0)
+        for _ in range(10):
+            breaker.record_failure("gdrive")
+        breaker.check("gdrive")
+
+    def test_exit_code_error(self):
+        """RcloneExitError: The exit code and the message survive pickling."""
+        error = pickle.loads(pickle.dumps(get_exit_code_error(5)))
+        self.assertEqual(error.returncode, 5)
+        self.assertRegex(str(error), "^RClone returned exit code 5!")
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
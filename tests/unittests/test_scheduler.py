@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.scheduler module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import sys
+from unittest import TestCase
+
+from PyQt5.QtTest import QSignalSpy
+from PyQt5.QtWidgets import QApplication
+
+from syncer_mods.scheduler import SyncScheduler
+from syncer_mods.settings import SyncProfile
+from syncer_mods.sync_interval import format_interval, get_next_interval
+from syncer_mods.synchronizer import SyncResult
+
+
+# -----------------------------------------------------------------------------
+# Test Classes
+# -----------------------------------------------------------------------------
+class GetNextIntervalTest(TestCase):
+    """Test the :mod:`syncer_mods.sync_interval` functions."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.profile = SyncProfile("file", "remote:")
+
+    def test_changed(self):
+        """get_next_interval: Interval is halved if a file was transferred."""
+        results = [SyncResult(self.profile), SyncResult(self.profile, "local")]
+        self.assertEqual(get_next_interval(600.0, results, 60.0, 3600.0), 300.0)
+        self.assertEqual(get_next_interval(100.0, results, 60.0, 3600.0), 60.0)
+
+    def test_unchanged(self):
+        """get_next_interval: Interval is doubled if all files are unchanged."""
+        results = [SyncResult(self.profile)]
+        self.assertEqual(get_next_interval(600.0, results, 60.0, 3600.0), 1200.0)
+        self.assertEqual(get_next_interval(3000.0, results, 60.0, 3600.0), 3600.0)
+
+    def test_error(self):
+        """get_next_interval: Interval is doubled on errors."""
+        results = [SyncResult(self.profile, "local"), SyncResult(self.profile, error="Failed")]
+        self.assertEqual(get_next_interval(600.0, results, 60.0, 3600.0), 1200.0)
+        self.assertEqual(get_next_interval(600.0, [], 60.0, 3600.0), 1200.0)
+
+    def test_format_interval(self):
+        """format_interval: Seconds, minutes and hours."""
+        self.assertEqual(format_interval(45.0), "45 s")
+        self.assertEqual(format_interval(300.0), "5 min")
+        self.assertEqual(format_interval(9000.0), "2.5 h")
+
+
+class SyncSchedulerTest(TestCase):
+    """Test the :class:`syncer_mods.scheduler.SyncScheduler` class."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.app = QApplication(sys.argv)
+
+    def tearDown(self):
+        """Clean up after a test."""
+        del self.app
+
+    def test_inactive(self):
+        """SyncScheduler: Inactive scheduler ignores results."""
+        scheduler = SyncScheduler(60.0, 3600.0)
+        scheduler.update([])
+        self.assertFalse(scheduler.is_active())
+        self.assertEqual(scheduler.get_description(), "")
+
+    def test_update(self):
+        """SyncScheduler: Results adapt the interval and the description."""
+        scheduler = SyncScheduler(60.0, 3600.0)
+        scheduler.start()
+        scheduler.update([SyncResult(SyncProfile("file", "remote:"))])
+        self.assertEqual(scheduler.interval_secs, 120.0)
+        self.assertTrue(scheduler.timer.isActive())
+        self.assertIn("(interval 2 min)", scheduler.get_description())
+        scheduler.stop()
+        self.assertFalse(scheduler.timer.isActive())
+
+    def test_due(self):
+        """SyncScheduler: Signal due is emitted after the interval."""
+        scheduler = SyncScheduler(0.05, 1.0)
+        spy = QSignalSpy(scheduler.due)
+        scheduler.start()
+        self.assertTrue(spy.wait(2000))
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.settings module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from syncer_mods.settings import Settings, SyncProfile, get_default_settings
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class JsonSettingsTest(TestCase):
+    """Test the :class:`syncer_mods.settings.Settings` class with a JSON file."""
+
+    def test_defaults(self):
+        """Settings: Missing JSON file provides the defaults."""
+        with TemporaryDirectory() as tmp_dir:
+            settings = Settings(os.path.join(tmp_dir, "settings.json"))
+            self.assertEqual(settings.settings, get_default_settings())
+
+    def test_save_and_load(self):
+        """Settings: Values are stored in the JSON file."""
+        with TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "settings.json")
+            settings = Settings(filename)
+            settings.set_value("remote_dir", "remote:dir")
+            settings.set_value("profiles", [{"local_file": "other", "remote_dir": "other:"}])
+
+            settings = Settings(filename)
+            self.assertEqual(settings.get_profiles(),
+                             [SyncProfile("localFile", "remote:dir"),
+                              SyncProfile("other", "other:")])
+            self.assertEqual(os.listdir(tmp_dir), ["settings.json"])
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -33,6 +33,22 @@ class SettingsMock:
         self.settings = {"rclone": "rclone_bin",
                          "local_file": "local_file_path",
                          "remote_dir": "remote_dir",
+                         "transport": "subprocess",
+                         "storage_mode": "file",
+                         "watch_local_file": False,
+                         "watch_debounce_secs": 5,
+                         "watch_quiet_secs": 30,
+                         "periodic_sync": False,
+                         "periodic_sync_min_minutes": 1,
+                         "periodic_sync_max_minutes": 60,
+                         "transfer_profile": "default",
+                         "transfer_autotune": False,
+                         "multi_thread_streams": 4,
+                         "buffer_size_mib": 16,
+                         "upload_chunk_size_mib": 8,
+                         "checkers": 8,
+                         "profiles": [{"local_file": "second_file_path",
+                                       "remote_dir": "second_remote_dir"}],
                          "autostart": False,
                          "sync_on_start": True}
 
@@ -69,6 +85,24 @@ class SettingsDialogTest(TestCase):
         self.assertEqual(self.form.gui.rclonePath.text(), "rclone_bin")
         self.assertEqual(self.form.gui.remoteDir.text(), "remote_dir")
         self.assertEqual(self.form.gui.localFilename.text(), "local_file_path")
+        self.assertFalse(self.form.gui.rcDaemonCheckBox.isChecked())
+        self.assertFalse(self.form.gui.chunkedStorageCheckBox.isChecked())
+        self.assertFalse(self.form.gui.watchCheckBox.isChecked())
+        self.assertEqual(self.form.gui.watchDebounceSpinBox.value(), 5)
+        self.assertEqual(self.form.gui.watchQuietSpinBox.value(), 30)
+        self.assertFalse(self.form.gui.periodicCheckBox.isChecked())
+        self.assertEqual(self.form.gui.periodicMinSpinBox.value(), 1)
+        self.assertEqual(self.form.gui.periodicMaxSpinBox.value(), 60)
+        self.assertEqual(self.form.gui.transferProfileComboBox.currentIndex(), 0)
+        self.assertFalse(self.form.gui.autotuneCheckBox.isChecked())
+        self.assertEqual(self.form.gui.multiThreadStreamsSpinBox.value(), 4)
+        self.assertEqual(self.form.gui.bufferSizeSpinBox.value(), 16)
+        self.assertEqual(self.form.gui.uploadChunkSizeSpinBox.value(), 8)
+        self.assertEqual(self.form.gui.checkersSpinBox.value(), 8)
+        self.assertFalse(self.form.gui.checkersSpinBox.isEnabled())
+        self.assertEqual(self.form.gui.profilesTable.rowCount(), 1)
+        self.assertEqual(self.form.gui.profilesTable.item(0, 0).text(), "second_remote_dir")
+        self.assertEqual(self.form.gui.profilesTable.item(0, 1).text(), "second_file_path")
         self.assertFalse(self.form.gui.autostartCheckBox.isChecked())
         self.assertTrue(self.form.gui.snychronizeOnStartCheckBox.isChecked())
 
@@ -79,6 +113,21 @@ class SettingsDialogTest(TestCase):
         self.form.gui.rclonePath.setText("aaa")
         self.form.gui.remoteDir.setText("bbb")
         self.form.gui.localFilename.setText("ccc")
+        self.form.gui.rcDaemonCheckBox.setChecked(True)
+        self.form.gui.chunkedStorageCheckBox.setChecked(True)
+        self.form.gui.watchCheckBox.setChecked(True)
+        self.form.gui.watchDebounceSpinBox.setValue(10)
+        self.form.gui.periodicCheckBox.setChecked(True)
+        self.form.gui.periodicMinSpinBox.setValue(5)
+        self.form.gui.periodicMaxSpinBox.setValue(2)
+        self.form.gui.transferProfileComboBox.setCurrentIndex(4)
+        self.assertTrue(self.form.gui.checkersSpinBox.isEnabled())
+        self.form.gui.autotuneCheckBox.setChecked(True)
+        self.form.gui.multiThreadStreamsSpinBox.setValue(2)
+        self.form.gui.bufferSizeSpinBox.setValue(0)
+        self.form.gui.uploadChunkSizeSpinBox.setValue(64)
+        self.form.gui.checkersSpinBox.setValue(16)
+        self.form.gui.profilesTable.item(0, 1).setText("ddd")
         self.form.gui.autostartCheckBox.setChecked(True)
         self.form.gui.snychronizeOnStartCheckBox.setChecked(False)
 
@@ -89,6 +138,22 @@ class SettingsDialogTest(TestCase):
         self.assertEqual(settings.get_value("rclone"), "aaa")
         self.assertEqual(settings.get_value("remote_dir"), "bbb")
         self.assertEqual(settings.get_value("local_file"), "ccc")
+        self.assertEqual(settings.get_value("transport"), "rcd")
+        self.assertEqual(settings.get_value("storage_mode"), "chunked")
+        self.assertEqual(settings.get_value("watch_local_file"), True)
+        self.assertEqual(settings.get_value("watch_debounce_secs"), 10)
+        self.assertEqual(settings.get_value("watch_quiet_secs"), 30)
+        self.assertEqual(settings.get_value("periodic_sync"), True)
+        self.assertEqual(settings.get_value("periodic_sync_min_minutes"), 5)
+        self.assertEqual(settings.get_value("periodic_sync_max_minutes"), 5)
+        self.assertEqual(settings.get_value("transfer_profile"), "custom")
+        self.assertEqual(settings.get_value("transfer_autotune"), True)
+        self.assertEqual(settings.get_value("multi_thread_streams"), 2)
+        self.assertEqual(settings.get_value("buffer_size_mib"), 0)
+        self.assertEqual(settings.get_value("upload_chunk_size_mib"), 64)
+        self.assertEqual(settings.get_value("checkers"), 16)
+        self.assertEqual(settings.get_value("profiles"), [{"local_file": "ddd",
+                                                           "remote_dir": "second_remote_dir"}])
         self.assertEqual(settings.get_value("autostart"), True)
         self.assertEqual(settings.get_value("sync_on_start"), False)
 
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.sync_state module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+import time
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from syncer_mods.sync_state import SyncState, get_changed_side, get_local_key
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class SyncStateTest(TestCase):
+    """Test the syncer_mods.sync_state module."""
+
+    def test_get_changed_side(self):
+        """get_changed_side: A change of a single side or of both sides is detected."""
+        self.assertEqual(get_changed_side("base", "base", "new"), "remote")
+        self.assertEqual(get_changed_side("base", "new", "base"), "local")
+        self.assertEqual(get_changed_side("base", "new", "other"), "both")
+        self.assertIsNone(get_changed_side("base", "base", "base"))
+        self.assertIsNone(get_changed_side(None, "new", "other"))
+        self.assertIsNone(get_changed_side("base", "new", None))
+        self.assertIsNone(get_changed_side("base", None, "new"))
+
+    def test_get_local_key(self):
+        """get_local_key: Recently modified and missing files have no key."""
+        with TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "file")
+            self.assertIsNone(get_local_key(filename))
+            with open(filename, 'wb') as file_handle:
+                file_handle.write(b'data')
+            self.assertIsNone(get_local_key(filename))
+            mtime = time.time() - 60.0
+            os.utime(filename, (mtime, mtime))
+            self.assertIsNotNone(get_local_key(filename))
+
+    def test_persistence(self):
+        """SyncState: The base is saved and loaded."""
+        with TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "state.json")
+            state = SyncState(filename)
+            self.assertIsNone(state.get_base("file", "remote:file"))
+            state.set_base("file", "remote:file", {"md5": "abc"})
+            state.save()
+            self.assertEqual(SyncState(filename).get_base("file", "remote:file"), "abc")
+            self.assertIsNone(SyncState(filename).get_base("file", "other:file"))
+
+            state.set_base("file", "remote:file", {"sha1": "def"}, "key")
+            state.save()
+            self.assertEqual(SyncState(filename).get_local_key("file", "remote:file"), "key")
+            self.assertEqual(SyncState(filename).get_base("file", "remote:file", "sha1"), "def")
+            self.assertIsNone(SyncState(filename).get_base("file", "remote:file"))
+
+            with open(filename, 'w', encoding='UTF-8') as file_handle:
+                file_handle.write("[broken")
+            self.assertEqual(SyncState(filename).entries, {})
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
@@ -0,0 +1,607 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.synchronizer module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import mock
+
+from syncer_mods.rclone import RemoteStat, SynchronizerError
+from syncer_mods.settings import SyncProfile
+from syncer_mods.synchronizer import SyncListener, Synchronizer, md5_of_file
+from syncer_mods.transfer import TRANSFER_PROFILES
+
+
+# -----------------------------------------------------------------------------
+# Settings
+# -----------------------------------------------------------------------------
+# md5 of the content written by TransportMock.download for remote:file
+REMOTE_MD5 = hashlib.md5(b'remote:file').hexdigest()
+
+
+# -----------------------------------------------------------------------------
+# Mock Classes
+# -----------------------------------------------------------------------------
+class SettingsMock:
+    """Mock of :class:`syncer_mods.settings.Settings` class."""
+
+    def __init__(self, profiles, max_workers=4, max_workers_per_remote=2):
+        """Construct a new instance."""
+        self.profiles = profiles
+        self.settings = {"rclone": "rclone",
+                         "transport": "subprocess",
+                         "storage_mode": "file",
+                         "upload_mode": "copy",
+                         "download_mode": "copy",
+                         "transfer_profile": "default",
+                         "transfer_autotune": False,
+                         "chunk_size": 1024,
+                         "backup_count": 2,
+                         "hash_cache_size": 16,
+                         "hash_block_size": 4096,
+                         "hash_strategy": "auto",
+                         "local_fingerprint": False,
+                         "fingerprint_segment_size": 4,
+                         "precheck_samples": 0,
+                         "max_workers": max_workers,
+                         "max_workers_per_remote": max_workers_per_remote,
+                         "metrics_file": "",
+                         "metrics_format": "jsonl",
+                         "journal_max_entries": 100,
+                         "step_timeout_secs": 0,
+                         "sync_timeout_secs": 0,
+                         "retry_count": 0,
+                         "retry_delay_secs": 0.0,
+                         "circuit_breaker_threshold": 0,
+                         "circuit_breaker_reset_secs": 0,
+                         "remote_cache_ttl_secs": 0}
+
+    def get_value(self, key):
+        """Get a value."""
+        return self.settings[key]
+
+    def get_profiles(self):
+        """Get the profiles."""
+        return self.profiles
+
+
+class ListenerMock(SyncListener):
+    """Listener recording the messages."""
+
+    def __init__(self):
+        """Construct a new instance."""
+        self.messages = []
+
+    def on_finished(self, message):
+        """Record a message."""
+        self.messages.append(("finished", message))
+
+    def on_error(self, message):
+        """Record an error message."""
+        self.messages.append(("error", message))
+
+
+class TransportMock:
+    """Transport serving remote files from a dictionary."""
+
+    def __init__(self, remote_files, delay=0.0):
+        """Construct a new instance.
+
+        Args:
+            remote_files (dict): Maps the remote file to a RemoteStat object or an exception.
+            delay (float):       Delay of each stat call in seconds.
+        """
+        self.remote_files = remote_files
+        self.delay = delay
+        self.uploads = []
+        self.downloads = []
+        self.transfer_params = {}
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_hash_types(_remote_dir):
+        """Get the supported hash types."""
+        return ["md5"]
+
+    def set_transfer_params(self, remote_name, params):
+        """Record the transfer parameters."""
+        self.transfer_params[remote_name] = params
+
+    def stat(self, remote_file, _hash_type="md5"):
+        """Get the stat of a remote file."""
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        remote_stat = self.remote_files[remote_file]
+        if isinstance(remote_stat, Exception):
+            raise remote_stat
+        return remote_stat
+
+    def upload(self, local_file, remote_file):
+        """Record an upload."""
+        self.uploads.append((local_file, remote_file))
+
+    def download(self, remote_file, local_file):
+        """Record a download and write the remote file name into the local file."""
+        self.downloads.append((remote_file, local_file))
+        with open(local_file, 'w', encoding="UTF-8") as file_handle:
+            file_handle.write(remote_file)
+
+    def download_stream(self, remote_file, local_file, _block_size, _hash_type="md5"):
+        """Record a download and return the md5 of the written data."""
+        self.download(remote_file, local_file)
+        return md5_of_file(local_file)
+
+    def close(self):
+        """Do nothing."""
+
+
+# -----------------------------------------------------------------------------
+# Test Class
+# -----------------------------------------------------------------------------
+class SynchronizerTestCase(TestCase):
+    """Base class of the tests of the :class:`syncer_mods.synchronizer.Synchronizer` class."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.env_patcher = mock.patch.dict(os.environ,
+                                           {"XDG_CACHE_HOME": os.path.join(self.tmp_dir.name,
+                                                                           "cache")})
+        self.env_patcher.start()
+        self.listener = ListenerMock()
+        self.messages = self.listener.messages
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.env_patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def _create_file(self, name, content):
+        """Create a local file modified one hour ago."""
+        filename = os.path.join(self.tmp_dir.name, name)
+        with open(filename, 'wb') as file_handle:
+            file_handle.write(content)
+        mtime = time.time() - 3600.0
+        os.utime(filename, (mtime, mtime))
+        return filename
+
+    def _run(self, settings, transport, dry_run=False):
+        """Run a new synchronizer and return it."""
+        synchronizer = Synchronizer(settings, self.listener)
+        self._run_synchronizer(synchronizer, transport, dry_run)
+        return synchronizer
+
+    def _run_synchronizer(self, synchronizer, transport, dry_run=False):
+        """Run the synchronizer with the given transport."""
+        with mock.patch.object(synchronizer, "_get_transport", return_value=transport):
+            synchronizer.run(dry_run)
+        self.assertEqual(len(self.messages), 1)
+
+
+class SynchronizerTest(SynchronizerTestCase):
+    """Test the :class:`syncer_mods.synchronizer.Synchronizer` class."""
+
+    def test_single_file_in_sync(self):
+        """Synchronizer: Single file already synchronized."""
+        local_file = self._create_file("file", b'data')
+        transport = TransportMock({"remote:file": RemoteStat(4, datetime.now(tz=timezone.utc),
+                                                             {"md5": md5_of_file(local_file)})})
+        self._run(SettingsMock([SyncProfile(local_file, "remote:")]), transport)
+        self.assertEqual(self.messages[0], ("finished", "Files are already synchronized"))
+
+    def test_multiple_files(self):
+        """Synchronizer: Multiple files are synchronized and the status is aggregated."""
+        file_a = self._create_file("file_a", b'data a')
+        file_b = self._create_file("file_b", b'data b')
+        old_time = datetime.now(tz=timezone.utc) - timedelta(days=1)
+        transport = TransportMock({"remote:file_a": RemoteStat(6, old_time, {"md5": "0" * 32}),
+                                   "other:dir/file_b": RemoteStat(6, old_time,
+                                                                  {"md5": md5_of_file(file_b)})})
+        synchronizer = self._run(SettingsMock([SyncProfile(file_a, "remote:"),
+                                               SyncProfile(file_b, "other:dir")]), transport)
+        self.assertEqual(self.messages[0],
+                         ("finished", "file_a: Synchronized local to remote\n"
+                                      "file_b: Files are already synchronized"))
+        self.assertEqual(transport.uploads, [(file_a, "remote:file_a")])
+        self.assertEqual([result.direction for result in synchronizer.last_results],
+                         ["local", None])
+
+    def test_error_of_one_file(self):
+        """Synchronizer: An error of one file is reported while others are synchronized."""
+        file_a = self._create_file("file_a", b'data a')
+        file_b = self._create_file("file_b", b'data b')
+        transport = TransportMock({"remote:file_a": SynchronizerError("Remote file is broken!"),
+                                   "remote:file_b": RemoteStat(6, datetime.now(tz=timezone.utc),
+                                                               {"md5": md5_of_file(file_b)})})
+        self._run(SettingsMock([SyncProfile(file_a, "remote:"),
+                                SyncProfile(file_b, "remote:")]), transport)
+        self.assertEqual(self.messages[0],
+                         ("error", "file_a: Remote file is broken!\n"
+                                   "file_b: Files are already synchronized"))
+
+    def test_per_remote_limit(self):
+        """Synchronizer: Concurrent accesses to a remote are limited."""
+        files = [self._create_file(f"file{idx}", b'data') for idx in range(4)]
+        now = datetime.now(tz=timezone.utc)
+        remote_stat = RemoteStat(4, now, {"md5": md5_of_file(files[0])})
+        transport = TransportMock({f"remote:file{idx}": remote_stat for idx in range(4)},
+                                  delay=0.05)
+        self._run(SettingsMock([SyncProfile(filename, "remote:") for filename in files],
+                               max_workers=4, max_workers_per_remote=2), transport)
+        self.assertEqual(self.messages[0][0], "finished")
+        self.assertEqual(transport.max_active, 2)
+
+    def test_shared_local_file(self):
+        """Synchronizer: Profiles sharing a local file are synchronized one after another."""
+        local_file = self._create_file("file", b'old data')
+        now = datetime.now(tz=timezone.utc)
+        transport = TransportMock({"a:file": RemoteStat(6, now, {"md5": md5_of_file(local_file)}),
+                                   "b:file": RemoteStat(6, now, {"md5": md5_of_file(local_file)})},
+                                  delay=0.1)
+        self._run(SettingsMock([SyncProfile(local_file, "a:"), SyncProfile(local_file, "b:")],
+                               max_workers=2), transport)
+        self.assertEqual(self.messages[0][0], "finished")
+        self.assertEqual(transport.max_active, 1)
+
+    def test_download_tmp_file(self):
+        """Synchronizer: The download uses a unique temporary file and keeps the file mode."""
+        local_file = self._create_file("file", b'old data')
+        os.chmod(local_file, 0o640)
+        transport = TransportMock({"remote:file": RemoteStat(11, datetime.now(tz=timezone.utc),
+                                                             {"md5": "0" * 32})})
+        self._run(SettingsMock([SyncProfile(local_file, "remote:")]), transport)
+        tmp_file = transport.downloads[0][1]
+        self.assertTrue(os.path.basename(tmp_file).startswith(".file."))
+        self.assertFalse(os.path.exists(tmp_file))
+        self.assertEqual(os.stat(local_file).st_mode & 0o777, 0o640)
+
+    def test_overlapping_stat_and_hash(self):
+        """Synchronizer: The local file is hashed while the remote file is queried."""
+        local_file = self._create_file("file", b'data')
+        digest = md5_of_file(local_file)
+        transport = TransportMock({"remote:file": RemoteStat(4, datetime.now(tz=timezone.utc),
+                                                             {"md5": digest})}, delay=0.3)
+        synchronizer = Synchronizer(SettingsMock([SyncProfile(local_file, "remote:")]),
+                                    self.listener)
+        with mock.patch.object(synchronizer, "_hash_file",
+                               side_effect=lambda *_args: time.sleep(0.3) or {"md5": digest}):
+            self._run_synchronizer(synchronizer, transport)
+        result = synchronizer.last_results[0]
+        self.assertEqual(self.messages[0], ("finished", "Files are already synchronized"))
+        self.assertGreaterEqual(result.metrics.timings["local_hash"], 0.3)
+        self.assertGreaterEqual(result.metrics.timings["remote_stat"], 0.3)
+        self.assertLess(result.duration_secs, 0.55)
+
+    def test_remote_error_stops_hashing(self):
+        """Synchronizer: An error of the remote aborts the hashing of the local file."""
+        local_file = self._create_file("file", b'data')
+        transport = TransportMock({"remote:file": SynchronizerError("Remote file is broken!")})
+
+        def slow_hash(_filename, _hash_types, _block_size, _strategy, check=None):
+            for _ in range(100):
+                if check is not None:
+                    check()
+                time.sleep(0.01)
+            return {"md5": md5_of_file(local_file)}
+
+        synchronizer = Synchronizer(SettingsMock([SyncProfile(local_file, "remote:")]),
+                                    self.listener)
+        with mock.patch("syncer_mods.synchronizer.hash_file_multi", side_effect=slow_hash):
+            self._run_synchronizer(synchronizer, transport)
+        self.assertEqual(self.messages[0], ("error", "Remote file is broken!"))
+        self.assertLess(synchronizer.last_results[0].duration_secs, 0.5)
+        self.assertIsNone(synchronizer.hash_cache.lookup(local_file))
+
+    def test_dry_run(self):
+        """Synchronizer: Dry run does not transfer any file."""
+        local_file = self._create_file("file", b'data')
+        old_time = datetime.now(tz=timezone.utc) - timedelta(days=1)
+        transport = TransportMock({"remote:file": RemoteStat(4, old_time, {"md5": "0" * 32})})
+        synchronizer = self._run(SettingsMock([SyncProfile(local_file, "remote:")]), transport,
+                                 dry_run=True)
+        self.assertEqual(self.messages[0], ("finished", "Local file is newer"))
+        self.assertEqual(synchronizer.last_results[0].direction, "local")
+        self.assertEqual(transport.uploads, [])
+
+    def test_download_with_backup(self):
+        """Synchronizer: Download replaces the local file and keeps a backup."""
+        local_file = self._create_file("file", b'old data')
+        transport = TransportMock({"remote:file": RemoteStat(11, datetime.now(tz=timezone.utc),
+                                                             {"md5": "0" * 32})})
+        self._run(SettingsMock([SyncProfile(local_file, "remote:")]), transport)
+        self.assertEqual(self.messages[0], ("finished", "Synchronized remote to local"))
+        with open(local_file, 'rb') as file_handle:
+            self.assertEqual(file_handle.read(), b'remote:file')
+        with open(local_file + ".bak", 'rb') as file_handle:
+            self.assertEqual(file_handle.read(), b'old data')
+        self.assertNotIn(os.path.basename(transport.downloads[0][1]), ["file", "file.bak"])
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["cache", "file", "file.bak"])
+
+    def test_streaming_download(self):
+        """Synchronizer: Streamed downloads are verified before replacing the local file."""
+        local_file = self._create_file("file", b'old data')
+        settings = SettingsMock([SyncProfile(local_file, "remote:")])
+        settings.settings["download_mode"] = "stream"
+        now = datetime.now(tz=timezone.utc)
+        self._run(settings, TransportMock({"remote:file": RemoteStat(11, now,
+                                                                     {"md5": "0" * 32})}))
+        self.assertEqual(self.messages[0],
+                         ("error", "Verification of downloaded file remote:file failed!"))
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["cache", "file"])
+
+        self.messages.clear()
+        self._run(settings, TransportMock({"remote:file": RemoteStat(11, now,
+                                                                     {"md5": REMOTE_MD5})}))
+        self.assertEqual(self.messages[0], ("finished", "Synchronized remote to local"))
+        self.assertEqual(md5_of_file(local_file), REMOTE_MD5)
+
+    def test_three_way_sync(self):
+        """Synchronizer: The changed side is detected without comparing modification times."""
+        local_file = self._create_file("file", b'data')
+        os.utime(local_file)
+        settings = SettingsMock([SyncProfile(local_file, "remote:")])
+        now = datetime.now(tz=timezone.utc)
+        self._run(settings, TransportMock({"remote:file": RemoteStat(
+            4, now, {"md5": md5_of_file(local_file)})}))
+        self.assertEqual(self.messages[0], ("finished", "Files are already synchronized"))
+
+        # The remote file changed while the modification times are too close to decide
+        self.messages.clear()
+        synchronizer = self._run(settings, TransportMock({"remote:file": RemoteStat(
+            11, now, {"md5": REMOTE_MD5})}))
+        self.assertEqual(self.messages[0], ("finished", "Synchronized remote to local"))
+        self.assertNotIn("modtime", synchronizer.last_results[0].metrics.timings)
+        self.assertEqual(synchronizer.sync_state.get_base(local_file, "remote:file"), REMOTE_MD5)
+
+    def test_conflict(self):
+        """Synchronizer: A change of both files is reported as a conflict."""
+        local_file = self._create_file("file", b'data')
+        settings = SettingsMock([SyncProfile(local_file, "remote:")])
+        yesterday = datetime.now(tz=timezone.utc) - timedelta(days=1)
+        self._run(settings, TransportMock({"remote:file": RemoteStat(
+            4, yesterday, {"md5": md5_of_file(local_file)})}))
+        self.assertEqual(self.messages[0], ("finished", "Files are already synchronized"))
+
+        # The newer local file would win the comparison of the modification times
+        with open(local_file, 'wb') as file_handle:
+            file_handle.write(b'local change')
+        self.messages.clear()
+        transport = TransportMock({"remote:file": RemoteStat(11, yesterday,
+                                                             {"md5": REMOTE_MD5})})
+        self._run(settings, transport)
+        self.assertEqual(self.messages[0][0], "error")
+        self.assertIn("changed since the last synchronization", self.messages[0][1])
+        self.assertEqual((transport.uploads, transport.downloads), ([], []))
+        with open(local_file, 'rb') as file_handle:
+            self.assertEqual(file_handle.read(), b'local change')
+
+    def test_never_synchronized(self):
+        """Synchronizer: The modification times decide if the files were never synchronized."""
+        local_file = self._create_file("file", b'data')
+        settings = SettingsMock([SyncProfile(local_file, "remote:")])
+        transport = TransportMock({"remote:file": RemoteStat(
+            11, datetime.now(tz=timezone.utc) - timedelta(days=1), {"md5": REMOTE_MD5})})
+        synchronizer = self._run(settings, transport)
+        self.assertEqual(self.messages[0], ("finished", "Synchronized local to remote"))
+        self.assertEqual(transport.uploads, [(local_file, "remote:file")])
+        self.assertIn("modtime", synchronizer.last_results[0].metrics.timings)
+
+    def test_local_fingerprint(self):
+        """Synchronizer: A touched local file is not hashed if its fingerprint is unchanged."""
+        local_file = self._create_file("file", b'data of the file')
+        digest = md5_of_file(local_file)
+        settings = SettingsMock([SyncProfile(local_file, "remote:")])
+        settings.settings["local_fingerprint"] = True
+        transport = TransportMock({"remote:file": RemoteStat(16, datetime.now(tz=timezone.utc),
+                                                             {"md5": digest})})
+        synchronizer = self._run(settings, transport)
+        self.assertIsNotNone(synchronizer.sync_state.get_base(local_file, "remote:file", "tree"))
+
+        os.utime(local_file, (time.time() - 60.0, time.time() - 60.0))
+        self.messages.clear()
+        synchronizer = Synchronizer(settings, self.listener)
+        with mock.patch.object(synchronizer, "_hash_file") as hash_file_mock:
+            self._run_synchronizer(synchronizer, transport)
+        hash_file_mock.assert_not_called()
+        self.assertEqual(self.messages[0], ("finished", "Files are already synchronized"))
+        self.assertEqual(synchronizer.last_results[0].metrics.local_md5, digest)
+        self.assertIn("local_fingerprint", synchronizer.last_results[0].metrics.timings)
+
+        self._create_file("file", b'data of the File')
+        self.messages.clear()
+        synchronizer = self._run(settings, transport)
+        self.assertEqual(synchronizer.last_results[0].metrics.local_md5,
+                         md5_of_file(local_file))
+        self.assertEqual(self.messages[0], ("finished", "Synchronized local to remote"))
+
+    def test_remote_cache(self):
+        """Synchronizer: The remote metadata is cached and updated after an upload."""
+        local_file = self._create_file("file", b'data')
+        settings = SettingsMock([SyncProfile(local_file, "remote:")])
+        settings.settings["remote_cache_ttl_secs"] = 60
+        transport = TransportMock({"remote:file": RemoteStat(
+            11, datetime.now(tz=timezone.utc) - timedelta(days=1), {"md5": REMOTE_MD5})})
+        synchronizer = Synchronizer(settings, self.listener)
+        self._run_synchronizer(synchronizer, transport)
+        self.assertEqual(self.messages[0], ("finished", "Synchronized local to remote"))
+        metrics = synchronizer.last_results[0].metrics
+        self.assertEqual((metrics.remote_cache_hits, metrics.remote_cache_misses), (0, 1))
+
+        self.messages.clear()
+        with mock.patch.object(transport, "stat") as stat_mock:
+            self._run_synchronizer(synchronizer, transport)
+        stat_mock.assert_not_called()
+        self.assertEqual(self.messages[0], ("finished", "Files are already synchronized"))
+        record = synchronizer.last_results[0].get_record()
+        self.assertEqual((record["remote_cache_hits"], record["remote_cache_misses"]), (1, 0))
+
+        synchronizer.remote_cache.invalidate("remote:file")
+        self.messages.clear()
+        self._run_synchronizer(synchronizer, transport)
+        metrics = synchronizer.last_results[0].metrics
+        self.assertEqual((metrics.remote_cache_hits, metrics.remote_cache_misses), (0, 1))
+
+    def test_remote_cache_conflict(self):
+        """Synchronizer: A remote modification within the cache lifetime is not overwritten."""
+        local_file = self._create_file("file", b'data')
+        settings = SettingsMock([SyncProfile(local_file, "remote:")])
+        settings.settings["remote_cache_ttl_secs"] = 60
+        transport = TransportMock({"remote:file": RemoteStat(
+            11, datetime.now(tz=timezone.utc) - timedelta(days=1), {"md5": REMOTE_MD5})})
+        synchronizer = Synchronizer(settings, self.listener)
+        self._run_synchronizer(synchronizer, transport)
+        self.assertEqual(self.messages[0], ("finished", "Synchronized local to remote"))
+
+        # Another client modifies the remote file, then the local file is saved
+        transport.remote_files["remote:file"] = RemoteStat(11, datetime.now(tz=timezone.utc),
+                                                           {"md5": REMOTE_MD5})
+        with open(local_file, 'wb') as file_handle:
+            file_handle.write(b'local edit')
+        self.messages.clear()
+        self._run_synchronizer(synchronizer, transport)
+        self.assertEqual(self.messages[0][0], "error")
+        self.assertIn("changed since the last synchronization", self.messages[0][1])
+        self.assertEqual(len(transport.uploads), 1)
+        metrics = synchronizer.last_results[0].metrics
+        self.assertEqual((metrics.remote_cache_hits, metrics.remote_md5), (1, REMOTE_MD5))
+
+    def test_transfer_autotune(self):
+        """Synchronizer: The transfer profile of a remote is tuned by the throughput."""
+        local_file = self._create_file("file", b'data')
+        settings = SettingsMock([SyncProfile(local_file, "remote:")])
+        settings.settings["transfer_profile"] = "balanced"
+        transport = TransportMock({"remote:file": RemoteStat(
+            11, datetime.now(tz=timezone.utc) - timedelta(days=1), {"md5": REMOTE_MD5})})
+        synchronizer = self._run(settings, transport)
+        self.assertEqual(transport.transfer_params, {"remote": TRANSFER_PROFILES["balanced"]})
+        self.assertEqual(synchronizer.last_results[0].get_record()["transfer_profile"], "balanced")
+        self.assertFalse(os.path.exists(synchronizer.transfer_tuner.filename))
+
+        # Forget the base, so the local file is uploaded again
+        settings.settings["transfer_autotune"] = True
+        os.remove(synchronizer.sync_state.filename)
+        self.messages.clear()
+        with mock.patch("syncer_mods.transfer.MIN_TUNING_BYTES", 0):
+            synchronizer = self._run(settings, transport)
+        self.assertEqual(self.messages[0], ("finished", "Synchronized local to remote"))
+        self.assertIn("balanced", synchronizer.transfer_tuner.entries["remote"])
+        self.assertTrue(os.path.exists(synchronizer.transfer_tuner.filename))
+
+        # The next synchronization tries the neighbour using more resources
+        os.remove(synchronizer.sync_state.filename)
+        self.messages.clear()
+        synchronizer = self._run(settings, transport)
+        self.assertEqual(transport.transfer_params, {"remote": TRANSFER_PROFILES["large_files"]})
+        self.assertEqual(synchronizer.last_results[0].metrics.transfer_profile, "large_files")
+
+    def test_metrics(self):
+        """Synchronizer: Timings and transferred bytes are exported and journaled."""
+        local_file = self._create_file("file", b'old data')
+        metrics_file = os.path.join(self.tmp_dir.name, "metrics.jsonl")
+        settings = SettingsMock([SyncProfile(local_file, "remote:")])
+        settings.settings["metrics_file"] = metrics_file
+        transport = TransportMock({"remote:file": RemoteStat(11, datetime.now(tz=timezone.utc),
+                                                             {"md5": REMOTE_MD5})})
+        synchronizer = self._run(settings, transport)
+        result = synchronizer.last_results[0]
+        self.assertEqual(sorted(result.metrics.timings),
+                         ["backup", "local_hash", "modtime", "remote_stat", "transfer"])
+        self.assertEqual(result.metrics.bytes_transferred, 11)
+        self.assertGreaterEqual(result.duration_secs, max(result.metrics.timings.values()))
+
+        self.messages.clear()
+        self._run(settings, transport)
+        with open(metrics_file, 'r', encoding="UTF-8") as file_handle:
+            records = [json.loads(line) for line in file_handle]
+        self.assertEqual([record["direction"] for record in records], ["remote", None])
+        self.assertEqual(records[0]["bytes_transferred"], 11)
+        self.assertEqual(records[0]["local_file"], local_file)
+        entries = Synchronizer(settings).journal.get_entries()
+        self.assertEqual([entry["direction"] for entry in entries], [None, "remote"])
+        self.assertEqual(entries[1]["remote_md5"], REMOTE_MD5)
+
+
+class SynchronizerChunkedStorageTest(SynchronizerTestCase):
+    """Test the :class:`syncer_mods.synchronizer.Synchronizer` class with chunked storage."""
+
+    def test_chunked_storage(self):
+        """Synchronizer: Chunked storage uploads the file if the remote manifest is missing."""
+        local_file = self._create_file("file", b'data')
+        settings = SettingsMock([SyncProfile(local_file, "remote:")])
+        settings.settings["storage_mode"] = "chunked"
+        with mock.patch("syncer_mods.synchronizer.ChunkStore") as chunk_store_mock:
+            chunk_store_mock.return_value.get_manifest.return_value = None
+            chunk_store_mock.return_value.upload.return_value = 4
+            self._run(settings, TransportMock({}))
+        self.assertEqual(chunk_store_mock.call_args[0][:3], ("rclone", "remote:file", 1024))
+        chunk_store_mock.return_value.set_transfer_params.assert_called_once_with(
+            TRANSFER_PROFILES["default"])
+        chunk_store_mock.return_value.upload.assert_called_once_with(local_file, None)
+        self.assertEqual(self.messages[0], ("finished", "Synchronized local to remote"))
+
+    def test_chunked_storage_local_md5(self):
+        """Synchronizer: The md5 of a file synchronized before is computed by chunking it."""
+        local_file = self._create_file("file", b'data')
+        settings = SettingsMock([SyncProfile(local_file, "remote:")])
+        settings.settings["storage_mode"] = "chunked"
+        with mock.patch("syncer_mods.synchronizer.ChunkStore") as chunk_store_mock, \
+                mock.patch("syncer_mods.synchronizer.load_local_manifest"):
+            chunk_store_mock.return_value.get_manifest.return_value = None
+            chunk_store_mock.return_value.get_local_md5.return_value = "chunked-md5"
+            chunk_store_mock.return_value.upload.return_value = 4
+            synchronizer = self._run(settings, TransportMock({}))
+        chunk_store_mock.return_value.get_local_md5.assert_called_once_with(local_file)
+        self.assertEqual(synchronizer.last_results[0].metrics.local_md5, "chunked-md5")
+
+    def test_chunked_storage_retry(self):
+        """Synchronizer: The rclone calls of the chunked storage are retried and guarded."""
+        local_file = self._create_file("file", b'data')
+        settings = SettingsMock([SyncProfile(local_file, "remote:")])
+        settings.settings.update({"storage_mode": "chunked", "retry_count": 1,
+                                  "circuit_breaker_threshold": 2,
+                                  "circuit_breaker_reset_secs": 60})
+        with mock.patch("syncer_mods.chunk_store.check_output",
+                        side_effect=[subprocess.CalledProcessError(5, "cat"), ""]), \
+                mock.patch("syncer_mods.chunk_store.check_call") as check_call_mock:
+            synchronizer = self._run(settings, TransportMock({}))
+        self.assertEqual(self.messages[0], ("finished", "Synchronized local to remote"))
+        self.assertEqual(synchronizer.last_results[0].metrics.retries, 1)
+        self.assertEqual(check_call_mock.call_count, 2)
+
+        # Two further failures open the circuit of the remote
+        with mock.patch("syncer_mods.chunk_store.check_output",
+                        side_effect=subprocess.CalledProcessError(7, "cat")) as check_output_mock:
+            for _ in range(3):
+                self.messages.clear()
+                self._run_synchronizer(synchronizer, TransportMock({}))
+        self.assertEqual(check_output_mock.call_count, 2)
+        self.assertEqual(self.messages[0][0], "error")
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------
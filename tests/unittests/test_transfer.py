@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 by Clemens Rabe <clemens.rabe@clemensrabe.de>
+# All rights reserved.
+# This file is part of syncer (https://github.com/seeraven/syncer)
+# and is released under the "BSD 3-Clause License". Please see the LICENSE file
+# that is included as part of this package.
+#
+"""Unit tests of the syncer_mods.transfer module."""
+
+
+# -----------------------------------------------------------------------------
+# Module Import
+# -----------------------------------------------------------------------------
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import mock
+
+from syncer_mods.transfer import (MIN_TUNING_BYTES, TRANSFER_PROFILES, TUNING_MAX_AGE_SECS,
+                                  TransferParams, TransferTuner, get_transfer_params)
+
+
+# -----------------------------------------------------------------------------
+# Settings Mock Class
+# -----------------------------------------------------------------------------
+class SettingsMock:
+    """Mock of :class:`syncer_mods.settings.Settings` class."""
+
+    def __init__(self):
+        """Construct a new instance."""
+        self.settings = {"multi_thread_streams": 2,
+                         "buffer_size_mib": 0,
+                         "upload_chunk_size_mib": 16,
+                         "checkers": 3}
+
+    def get_value(self, key):
+        """Get a value."""
+        return self.settings[key]
+
+
+# -----------------------------------------------------------------------------
+# Test Classes
+# -----------------------------------------------------------------------------
+class TransferParamsTest(TestCase):
+    """Test the :class:`syncer_mods.transfer.TransferParams` class."""
+
+    def test_rclone_flags(self):
+        """TransferParams: The flags contain only the parameters that are set."""
+        self.assertEqual(TransferParams().get_rclone_flags(), [])
+        self.assertEqual(TransferParams(4, 32, 8, 16).get_rclone_flags(),
+                         ["--multi-thread-streams", "4", "--buffer-size", "32M",
+                          "--drive-chunk-size", "8M", "--s3-chunk-size", "8M",
+                          "--checkers", "16"])
+        self.assertEqual(TransferParams(buffer_size_mib=1).get_rclone_flags(),
+                         ["--buffer-size", "1M"])
+
+    def test_rc_config(self):
+        """TransferParams: The rc configuration contains the global options only."""
+        self.assertEqual(TransferParams().get_rc_config(), {})
+        self.assertEqual(TransferParams(4, 32, 8, 16).get_rc_config(),
+                         {"MultiThreadStreams": 4, "BufferSize": 32 * 1024 * 1024,
+                          "Checkers": 16})
+
+    def test_get_transfer_params(self):
+        """get_transfer_params: The custom profile uses the settings."""
+        settings = SettingsMock()
+        self.assertEqual(get_transfer_params("custom", settings), TransferParams(2, 0, 16, 3))
+        self.assertEqual(get_transfer_params("balanced", settings),
+                         TRANSFER_PROFILES["balanced"])
+        self.assertEqual(get_transfer_params("unknown", settings), TransferParams())
+
+
+class TransferTunerTest(TestCase):
+    """Test the :class:`syncer_mods.transfer.TransferTuner` class."""
+
+    def setUp(self):
+        """Set up a new test."""
+        self.tmp_dir = TemporaryDirectory()   # pylint: disable=consider-using-with
+        self.filename = os.path.join(self.tmp_dir.name, "tuning", "transfer_tuning.json")
+
+    def tearDown(self):
+        """Clean up after a test."""
+        self.tmp_dir.cleanup()
+
+    def test_start_profile(self):
+        """TransferTuner: An unmeasured remote uses the start profile."""
+        tuner = TransferTuner(self.filename)
+        self.assertEqual(tuner.get_profile("remote", "balanced"), "balanced")
+        self.assertEqual(tuner.get_profile("remote", "custom"), "default")
+
+    def test_climb(self):
+        """TransferTuner: The neighbours of the fastest profile are tried and the best is kept."""
+        tuner = TransferTuner(self.filename)
+        tuner.record("remote", "default", MIN_TUNING_BYTES, 1.0)
+        self.assertEqual(tuner.get_profile("remote", "default"), "balanced")
+        tuner.record("remote", "balanced", MIN_TUNING_BYTES, 0.5)
+        self.assertEqual(tuner.get_profile("remote", "default"), "large_files")
+        tuner.record("remote", "large_files", MIN_TUNING_BYTES, 0.8)
+        self.assertEqual(tuner.get_profile("remote", "default"), "balanced")
+        self.assertEqual(tuner.get_profile("other", "default"), "default")
+
+        # The lower neighbour is tried if there is no upper one
+        tuner.record("other", "large_files", MIN_TUNING_BYTES, 1.0)
+        self.assertEqual(tuner.get_profile("other", "default"), "balanced")
+        tuner.record("other", "balanced", MIN_TUNING_BYTES, 2.0)
+        self.assertEqual(tuner.get_profile("other", "default"), "large_files")
+
+    def test_small_transfers(self):
+        """TransferTuner: Small or instant transfers are ignored."""
+        tuner = TransferTuner(self.filename)
+        tuner.record("remote", "default", MIN_TUNING_BYTES - 1, 1.0)
+        tuner.record("remote", "default", MIN_TUNING_BYTES, 0.0)
+        self.assertEqual(tuner.entries, {})
+        tuner.save()
+        self.assertFalse(os.path.exists(self.filename))
+
+    def test_moving_average(self):
+        """TransferTuner: The throughput is a moving average until it expires."""
+        tuner = TransferTuner(self.filename)
+        with mock.patch("syncer_mods.transfer.time.time", return_value=1000.0):
+            tuner.record("remote", "default", 100 * MIN_TUNING_BYTES, 100.0)
+            tuner.record("remote", "default", 100 * MIN_TUNING_BYTES, 10.0)
+        self.assertAlmostEqual(tuner.entries["remote"]["default"]["bytes_per_sec"],
+                               (0.7 + 0.3 * 10.0) * MIN_TUNING_BYTES)
+
+        with mock.patch("syncer_mods.transfer.time.time",
+                        return_value=1001.0 + TUNING_MAX_AGE_SECS):
+            self.assertEqual(tuner.get_profile("remote", "balanced"), "balanced")
+            tuner.record("remote", "default", 100 * MIN_TUNING_BYTES, 100.0)
+        self.assertAlmostEqual(tuner.entries["remote"]["default"]["bytes_per_sec"],
+                               MIN_TUNING_BYTES)
+
+    def test_persistence(self):
+        """TransferTuner: The state is saved and loaded."""
+        tuner = TransferTuner(self.filename)
+        tuner.record("remote", "balanced", MIN_TUNING_BYTES, 1.0)
+        tuner.save()
+        self.assertEqual(TransferTuner(self.filename).entries, tuner.entries)
+
+        with open(self.filename, 'w', encoding='UTF-8') as file_handle:
+            file_handle.write('{"remote": {"balanced": {"time": 1.0}}}')
+        self.assertEqual(TransferTuner(self.filename).entries, {})
+
+
+# -----------------------------------------------------------------------------
+# EOF
+# -----------------------------------------------------------------------------